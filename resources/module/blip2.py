@@ -3,6 +3,8 @@ import torch
 from PIL import Image
 from transformers import AutoProcessor, Blip2ForConditionalGeneration
 
+__stateless__ = True
+
 
 def generated_text_from_image_url(url: str):
     image = Image.open(requests.get(url, stream=True).raw).convert("RGB")
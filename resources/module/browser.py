@@ -2,6 +2,8 @@ import requests
 import tiktoken
 from bs4 import BeautifulSoup
 
+__stateless__ = True
+
 
 def num_tokens(text: str) -> int:
     """Return the number of tokens in a string."""
@@ -1,5 +1,7 @@
 from termcolor import colored
 
+__stateless__ = True
+
 
 def query(sql: str):
     print(colored(f"SQL: {sql}", "yellow"))
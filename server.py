@@ -9,7 +9,7 @@ from flask import Flask, jsonify, render_template, request
 sys.path.append(os.path.join(os.path.dirname(__file__), "src"))
 
 from config.llm_config import llm_engine_configs, llm_models  # noqa: E402
-from slashgpt import ChatConfigWithManifests, ChatHistoryFileStorage, ChatSession, PythonRuntime, print_error  # noqa: E402
+from slashgpt import ChatConfigWithManifests, ChatHistoryFileStorage, ChatSession, PythonRuntime, RetentionSweeper, print_error  # noqa: E402
 
 load_dotenv()
 
@@ -66,7 +66,7 @@ def modules():
 def manifests_list(manifests):
     config = ChatConfigWithManifests(current_dir, current_dir + "/manifests/" + manifests, llm_models, llm_engine_configs)
 
-    return jsonify({"manifests": config.manifests})
+    return jsonify({"manifests": dict(config.manifests)})
 
 
 @app.route("/llms/<manifests>")
@@ -121,6 +121,8 @@ def talk(manifests, agent, session_id=None):
     config = ChatConfigWithManifests(current_dir, current_dir + "/manifests/" + manifests, llm_models, llm_engine_configs)
     config.verbose = True
     m = config.manifests[agent]
+    # Keeps (or starts) the sweeper of the stored sessions of the agent, if its manifest has a retention policy
+    RetentionSweeper.start_for_manifest(ChatHistoryFileStorage, agent, m)
 
     message = request.json["message"]
     llm = request.json.get("llm")
@@ -67,7 +67,7 @@ class ChatSlashConfig(ChatConfigWithManifests):
         return sorted(self.manifests.keys())
 
     def help_list(self):
-        return (f"/{(key+'         ')[:12]} {self.manifests.get(key).get('title')}" for key in self.__get_manifests_keys())
+        return (f"/{(key+'         ')[:12]} {self.manifests.summary(key).get('title')}" for key in self.__get_manifests_keys())
 
 
 """
@@ -79,6 +79,7 @@ class SlashGPT:
     def __init__(self, config: ChatSlashConfig, manifests_manager: dict, agent_name: str):
         self.manifests_manager = manifests_manager
         self.exit = False
+        self.streaming = False
         self.app = ChatApplication(config, self._callback, runtime=PythonRuntime(config.base_path + "/output/notebooks"))
         self.app.switch_session(agent_name)
 
@@ -241,7 +242,14 @@ class SlashGPT:
         if len(commands) == 1:
             files = self.app.session.history.session_list()
             for file in files:
-                print(str(file["id"]) + ": " + file["name"])
+                print(str(file["id"]) + ": " + (file.get("title") or file["name"]))
+            return
+        elif commands[1] == "search" and len(commands) > 2:
+            hits = self.app.session.history.search(" ".join(commands[2:]))
+            if not hits:
+                print("no matches")
+            for hit in hits:
+                print(f"{hit['id']}: {hit.get('title') or hit['session_id']}\n    {hit['role']}: {' '.join(hit['snippet'].split())}")
             return
         else:
             log = self.app.session.history.get_session_data(commands[1])
@@ -257,6 +265,7 @@ class SlashGPT:
         print("/import: list all histories")
         print("/import {num}: import history")
         print("/import {num} show: show history")
+        print("/import search {terms}: search histories")
 
     def switch_manifests(self, key: str):
         m = self.manifests_manager[key]
@@ -275,8 +284,19 @@ class SlashGPT:
                 self.talk(m)
 
     def _callback(self, callback_type, data):
+        if callback_type == "token":
+            if not self.streaming:
+                self.streaming = True
+                print_bot(self.app.session.botname(), "", end="")
+            print(data, end="", flush=True)
+            return
+
+        # Any other event ends the streamed message (e.g. the content before a function call)
+        streamed = self.__end_streaming()
+
         if callback_type == "bot":
-            print_bot(self.app.session.botname(), data)
+            if not streamed:  # a streamed message has been displayed token by token
+                print_bot(self.app.session.botname(), data)
 
             if self.app.config.audio:
                 play_text(data, self.app.config.audio)
@@ -322,6 +342,15 @@ class SlashGPT:
                 else:
                     self.query_llm(question)
 
+    def __end_streaming(self):
+        if not self.streaming:
+            return False
+        self.streaming = False
+        print()
+        return True
+
     def query_llm(self, question: str):
         self.app.session.append_user_question(question)
         self.app.process_llm()
+        # The turn may end with a streamed message without any event after it
+        self.__end_streaming()
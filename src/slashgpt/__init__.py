@@ -3,6 +3,7 @@
 """
 
 from .chat_app import ChatApplication
+from .chat_batch import BatchResult, ChatBatchRunner
 from .chat_config import ChatConfig
 from .chat_config_with_manifests import ChatConfigWithManifests
 from .chat_history import ChatHistory
@@ -22,6 +23,8 @@ from .history.storage.file import ChatHistoryFileStorage
 
 # from .history.storage.log import *
 from .history.storage.memory import ChatHistoryMemoryStorage
+from .history.storage.retention import RetentionPolicy, RetentionSweeper
+from .history.storage.sqlite import ChatHistorySQLiteStorage
 
 # from .llms.default_config import *
 from .llms.engine.base import LLMEngineBase
@@ -40,6 +43,8 @@ from .utils.print import print_bot, print_debug, print_error, print_function, pr
 
 __all__ = [
     "ChatApplication",
+    "ChatBatchRunner",
+    "BatchResult",
     "ChatConfig",
     "ChatConfigWithManifests",
     "ChatHistory",
@@ -63,6 +68,9 @@ __all__ = [
     "ChatHistoryAbstractStorage",
     "ChatHistoryFileStorage",
     "ChatHistoryMemoryStorage",
+    "ChatHistorySQLiteStorage",
+    "RetentionPolicy",
+    "RetentionSweeper",
     # llm
     "LLMEngineBase",
     "LLMEngineHosted",
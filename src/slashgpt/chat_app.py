@@ -1,8 +1,9 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Optional
+from typing import TYPE_CHECKING, Dict, Optional
 
 from slashgpt.chat_session import ChatSession
+from slashgpt.history.storage.retention import RetentionSweeper
 from slashgpt.utils.print import print_error, print_warning
 
 if TYPE_CHECKING:
@@ -27,6 +28,8 @@ class ChatApplication:
         """Callback function"""
         self.session: Optional[ChatSession] = None
         """Active session, initially None"""
+        self.sweepers: Dict[str, Optional[RetentionSweeper]] = {}
+        """Retention sweepers of the agents activated so far (None if the agent has no retention policy)"""
 
     def switch_session(
         self,
@@ -61,6 +64,7 @@ class ChatApplication:
                     memory=memory,
                     history_engine=history_engine,
                 )
+                self.__start_retention(self.session)
                 if self.config.verbose:
                     self._callback(
                         "info",
@@ -81,10 +85,18 @@ class ChatApplication:
         print_warning("No agent_name was spacified")
         self.session = ChatSession(self.config, default_llm_model=self.llm_model, history_engine=history_engine)
 
+    def __start_retention(self, session: ChatSession):
+        # Once per agent for the application. The sweeper creates its own storage, instead of holding that of the session.
+        if session.agent_name in self.sweepers:
+            return
+        storage_class = type(session.history.repository)
+        self.sweepers[session.agent_name] = RetentionSweeper.start_for_manifest(storage_class, session.agent_name, session.manifest)
+
     def _noop(self, callback_type, data):
         pass
 
-    def _process_event(self, callback_type, data):
+    def _handle_event(self, callback_type, data):
+        """Passes the event to the callback and processes the emit actions. Returns True if the LLM needs to be called."""
         self._callback(callback_type, data)
 
         if callback_type == "emit":
@@ -101,9 +113,16 @@ class ChatApplication:
                     message_to_append = action_data.get("message")
                     if message_to_append:
                         self.session.append_user_question(message_to_append)
-                        self.process_llm()
-                    elif action_data.get("initiate"):
-                        self.process_llm()
+                    return bool(message_to_append or action_data.get("initiate"))
+        return False
+
+    def _process_event(self, callback_type, data):
+        if self._handle_event(callback_type, data):
+            self.process_llm()
+
+    async def _aprocess_event(self, callback_type, data):
+        if self._handle_event(callback_type, data):
+            await self.aprocess_llm()
 
     def process_llm(self):
         """It calls the LLM with the current context (system prompt and messages)
@@ -115,3 +134,13 @@ class ChatApplication:
             self.switch_session(self.session.agent_name)
             if self.config.verbose:
                 raise
+
+    async def aprocess_llm(self):
+        """Asynchronous version of process_llm"""
+        try:
+            await self.session.acall_loop(self._aprocess_event, self.runtime)
+        except Exception as e:
+            print_error(f"Exception: Restarting the chat :{e}")
+            self.switch_session(self.session.agent_name)
+            if self.config.verbose:
+                raise
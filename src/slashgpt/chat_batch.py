@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
+
+from slashgpt.llms.model import LlmModel
+from slashgpt.llms.retry import is_retryable_error, retry_after_of, retry_delay
+from slashgpt.manifest import Manifest
+from slashgpt.utils.print import print_warning
+
+if TYPE_CHECKING:
+    from slashgpt.chat_config import ChatConfig
+
+
+class BatchResult:
+    """It represents the result of one job of ChatBatchRunner"""
+
+    def __init__(self, index: int):
+        self.index: int = index
+        """Position of the job in the input (int)"""
+        self.role: Optional[str] = None
+        """Role of the response (str, optional)"""
+        self.res: Optional[str] = None
+        """Message from the LLM (str, optional)"""
+        self.function_call = None
+        """Function call generated by the LLM (FunctionCall, optional)"""
+        self.token_usage: Optional[int] = None
+        """Number of tokens reported by the engine (int, optional)"""
+        self.latency: float = 0.0
+        """Seconds spent on the job, including retries and rate-limit waits (float)"""
+        self.attempts: int = 0
+        """Number of calls to the engine (int)"""
+        self.error: Optional[Exception] = None
+        """The last exception, if the job failed (Exception, optional)"""
+
+    def __repr__(self):
+        return f"BatchResult(index={self.index}, res={self.res!r}, token_usage={self.token_usage}, latency={self.latency:.3f}, error={self.error!r})"
+
+
+class RateLimiter:
+    """Sliding-window limiter for requests per period and tokens per period"""
+
+    def __init__(self, rpm: Optional[int] = None, tpm: Optional[int] = None, period: float = 60.0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.period = period
+        self.__events: deque = deque()  # [timestamp, tokens, in_window]
+        self.__tokens = 0
+        self.__lock = asyncio.Lock()
+
+    def __expire(self, now: float):
+        while self.__events and self.__events[0][0] <= now - self.period:
+            event = self.__events.popleft()
+            self.__tokens -= event[1]
+            event[2] = False
+
+    async def acquire(self, tokens: int = 0):
+        """Waits until a request with the estimated number of tokens fits in the budgets.
+        Returns the record of the request, which can be passed to adjust()."""
+        if self.rpm is None and self.tpm is None:
+            return None
+        async with self.__lock:
+            while True:
+                now = time.monotonic()
+                self.__expire(now)
+                requests_ok = self.rpm is None or len(self.__events) < self.rpm
+                # A single request larger than the budget is let through once the window is empty
+                tokens_ok = self.tpm is None or self.__tokens + tokens <= self.tpm or not self.__events
+                if requests_ok and tokens_ok:
+                    event = [now, tokens, True]
+                    self.__events.append(event)
+                    self.__tokens += tokens
+                    return event
+                await asyncio.sleep(max(self.__events[0][0] + self.period - now, 0.001))
+
+    def adjust(self, event: Optional[list], actual_tokens: int):
+        """Replaces the estimated tokens of the request with the actual usage"""
+        if event is not None and event[2]:
+            self.__tokens += actual_tokens - event[1]
+            event[1] = actual_tokens
+
+
+class ChatBatchRunner:
+    """
+    Runs many (manifest, messages) jobs concurrently through the configured LLM engines,
+    keeping per-engine concurrency caps and request/token budgets, and retrying transient errors.
+    """
+
+    def __init__(
+        self,
+        config: ChatConfig,
+        limits: Optional[dict] = None,
+        max_concurrency: int = 16,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+        token_estimator: Optional[Callable[[LlmModel, List[dict]], int]] = None,
+    ):
+        """
+        Args:
+
+            config (ChatConfig): Chat configuration (LLM models and engines)
+            limits (dict, optional): limits for each engine name, e.g.
+                {"openai-gpt": {"concurrency": 8, "rpm": 3500, "tpm": 90000}}
+            max_concurrency (int): maximum number of jobs in flight (across all engines)
+            max_retries (int): maximum number of retries for a job
+            backoff (float): base delay (seconds) of the exponential backoff
+            token_estimator (function, optional): estimates the tokens of a request for the tpm budget
+        """
+        self.config = config
+        self.limits: dict = limits or {}
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.token_estimator = token_estimator or self.__estimate_tokens
+
+    @classmethod
+    def __estimate_tokens(cls, llm_model: LlmModel, messages: List[dict]):
+        return sum(llm_model.num_tokens(message.get("content") or "") for message in messages)
+
+    @classmethod
+    def is_retryable(cls, error: Exception):
+        """Returns True if the error is a rate limit, a transient server error or a connection failure (see llms.retry)"""
+        return is_retryable_error(error)
+
+    def __prepare(self, job: Tuple[dict, List[dict]]):
+        (manifest_data, messages) = job
+        manifest = Manifest(manifest_data or {}, self.config.base_path)
+        llm_model = self.config.get_llm_model_from_manifest(manifest) if manifest.model() else self.config.get_default_llm_model()
+        messages = list(messages)
+        if not messages or messages[0].get("role") != "system":
+            prompt = manifest.prompt_data(getattr(self.config, "manifests", {}))
+            if prompt:
+                messages.insert(0, {"role": "system", "content": prompt})
+        return (manifest, llm_model, messages)
+
+    def run(self, jobs: List[Tuple[dict, List[dict]]]) -> List[BatchResult]:
+        """Runs the jobs and returns the results in the input order
+
+        Args:
+
+            jobs (list): list of (manifest, messages), where messages is a list of {"role", "content"}
+        """
+        return asyncio.run(self.arun(jobs))
+
+    async def arun(self, jobs: List[Tuple[dict, List[dict]]]) -> List[BatchResult]:
+        """Asynchronous version of run"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        engine_semaphores: dict = {}
+        limiters: dict = {}
+
+        def engine_state(engine_name: str):
+            if engine_name not in limiters:
+                limit = self.limits.get(engine_name, {})
+                engine_semaphores[engine_name] = asyncio.Semaphore(limit.get("concurrency") or self.max_concurrency)
+                limiters[engine_name] = RateLimiter(limit.get("rpm"), limit.get("tpm"), limit.get("period", 60.0))
+            return (engine_semaphores[engine_name], limiters[engine_name])
+
+        async def run_job(index: int, job: Tuple[dict, List[dict]]):
+            result = BatchResult(index)
+            start = time.perf_counter()
+            try:
+                (manifest, llm_model, messages) = self.__prepare(job)
+                (engine_semaphore, limiter) = engine_state(llm_model.engine_name())
+                estimated_tokens = self.token_estimator(llm_model, messages) if limiter.tpm else 0
+                async with semaphore, engine_semaphore:
+                    for attempt in range(self.max_retries + 1):
+                        event = await limiter.acquire(estimated_tokens)
+                        result.attempts += 1
+                        try:
+                            (role, res, function_call, token_usage) = await llm_model.agenerate_response(messages, manifest, self.config.verbose)
+                        except Exception as e:
+                            result.error = e
+                            if attempt == self.max_retries or not self.is_retryable(e):
+                                break
+                            if self.config.verbose:
+                                print_warning(f"ChatBatchRunner: job {index} failed ({e}), retrying")
+                            await asyncio.sleep(retry_delay(attempt, self.backoff, retry_after_of(e)))
+                            continue
+                        if token_usage:
+                            limiter.adjust(event, token_usage)
+                        (result.role, result.res, result.function_call, result.token_usage) = (role, res, function_call, token_usage)
+                        result.error = None
+                        break
+            except Exception as e:
+                result.error = e
+            result.latency = time.perf_counter() - start
+            return result
+
+        return list(await asyncio.gather(*(run_job(index, job) for index, job in enumerate(jobs))))
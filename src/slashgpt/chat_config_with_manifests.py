@@ -1,12 +1,7 @@
-import json
-import os
-import re
 from typing import Optional
 
-import yaml
-
 from slashgpt.chat_config import ChatConfig
-from slashgpt.utils.print import print_error
+from slashgpt.manifest_registry import ManifestRegistry, ManifestSet
 
 
 class ChatConfigWithManifests(ChatConfig):
@@ -25,30 +20,11 @@ class ChatConfigWithManifests(ChatConfig):
             llm_engine_configs (dict, optional): collection of custom LLM engine definitions
         """
         super().__init__(base_path, llm_models, llm_engine_configs)
-        self.manifests: dict = self.__load_manifests(path_manifests)
-        """Set of manifests loaded from the specified folder"""
+        self.manifests: ManifestSet = ManifestRegistry.get(path_manifests).snapshot()
+        """Set of manifests loaded from the specified folder (read-only, shared with other configs)"""
         self.path_manifests: str = path_manifests
         """Location of the folder where manifests were loaded"""
 
-    @classmethod
-    def __load_manifests(cls, path: str):
-        manifests = {}
-        files = os.listdir(path)
-        for file in files:
-            if re.search(r"\.json$", file):
-                with open(f"{path}/{file}", "r", encoding="utf-8") as f:  # encoding add for Win
-                    try:
-                        manifests[file.split(".")[0]] = json.load(f)
-                    except json.JSONDecodeError:
-                        print_error(file + " is broken")
-            elif re.search(r"\.yml$", file):
-                with open(f"{path}/{file}", "r", encoding="utf-8") as f:  # encoding add for Win
-                    try:
-                        manifests[file.split(".")[0]] = yaml.safe_load(f)
-                    except Exception:
-                        print_error(file + " is broken")
-        return manifests
-
     def switch_manifests(self, path: str):
         """Switch the set of manifests
 
@@ -60,8 +36,8 @@ class ChatConfigWithManifests(ChatConfig):
         self.reload()
 
     def reload(self):
-        """Reload manifest files"""
-        self.manifests = self.__load_manifests(self.path_manifests)
+        """Reload manifest files (only those modified since they were loaded are parsed again)"""
+        self.manifests = ManifestRegistry.get(self.path_manifests).snapshot(force=True)
 
     def has_manifest(self, key: str):
         """Check if a manifest file with a specified name exits
@@ -1,14 +1,40 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, List
+import bisect
+from typing import TYPE_CHECKING, Callable, List, Optional, Sequence, Set
+
+from slashgpt.llms import tokenizer
 
 if TYPE_CHECKING:
     from slashgpt.history.storage.abstract import ChatHistoryAbstractStorage
 
+# The chat completion API adds a few tokens per message for its own formatting
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_NAME = 1
+
 
 class ChatHistory:
-    def __init__(self, repository: ChatHistoryAbstractStorage):
+    def __init__(self, repository: ChatHistoryAbstractStorage, token_counter: Optional[Callable[[str], int]] = None):
         self.repository: ChatHistoryAbstractStorage = repository
+        self.__token_counter: Callable[[str], int] = token_counter or self.__default_token_counter
+        # Token counts of messages, memoized in the same order as the repository
+        self.__token_counts: List[int] = []
+        self.__modified_indices: Set[int] = set()
+        self.__total_tokens = 0
+        # API-shaped messages (message_dict), cached in the same order as the repository
+        self.__views: List[dict] = []
+        self.__preset_indices: List[int] = []
+        self.__modified_views: Set[int] = set()
+        self.__revision = repository.revision()
+
+    @classmethod
+    def __default_token_counter(cls, text: str):
+        return tokenizer.num_tokens(text, "gpt-3.5-turbo-0613")
+
+    def set_token_counter(self, token_counter: Callable[[str], int]):
+        """Set the function to count tokens (e.g. that of the LLM model), which resets the memoized counts"""
+        self.__token_counter = token_counter
+        self.__reset_token_counts()
 
     def append_message(self, data: dict):
         self.repository.append(data)
@@ -21,6 +47,14 @@ class ChatHistory:
 
     def set_message(self, index: int, data: dict):
         self.repository.set(index, data)
+        if index < 0:
+            index += self.repository.len()
+        if index < len(self.__views):
+            self.__modified_views.add(index)
+        if index < len(self.__token_counts):
+            self.__total_tokens -= self.__token_counts[index]
+            self.__token_counts[index] = 0
+            self.__modified_indices.add(index)
 
     def len_messages(self):
         return self.repository.len()
@@ -29,6 +63,14 @@ class ChatHistory:
         return self.message_dict(self.repository.last())
 
     def pop_message(self):
+        if len(self.__views) == self.repository.len() and self.__views:
+            self.__views.pop()
+            self.__modified_views.discard(len(self.__views))
+            if self.__preset_indices and self.__preset_indices[-1] == len(self.__views):
+                self.__preset_indices.pop()
+        if len(self.__token_counts) == self.repository.len() and self.__token_counts:
+            self.__total_tokens -= self.__token_counts.pop()
+            self.__modified_indices.discard(len(self.__token_counts))
         return self.repository.pop()
 
     def message_dict(self, x: dict):
@@ -36,24 +78,114 @@ class ChatHistory:
             return {"role": x.get("role"), "content": x.get("content"), "name": x.get("name")}
         return {"role": x.get("role"), "content": x.get("content")}
 
+    def __check_revision(self):
+        revision = self.repository.revision()
+        if revision != self.__revision:
+            # Modified by another process. Discard the caches.
+            self.__revision = revision
+            self.__reset_views()
+            self.__reset_token_counts()
+
+    def __update_views(self):
+        self.__check_revision()
+        length = self.repository.len()
+        if len(self.__views) > length:
+            # The repository was modified directly. Start over.
+            self.__reset_views()
+        for index in self.__modified_views:
+            self.__views[index] = self.message_dict(self.repository.get(index))
+            position = bisect.bisect_left(self.__preset_indices, index)
+            was_preset = position < len(self.__preset_indices) and self.__preset_indices[position] == index
+            if self.repository.get_data(index, "preset"):
+                if not was_preset:
+                    self.__preset_indices.insert(position, index)
+            elif was_preset:
+                del self.__preset_indices[position]
+        self.__modified_views = set()
+        # Only the messages appended since the last call are mapped
+        for index in range(len(self.__views), length):
+            self.__views.append(self.message_dict(self.repository.get(index)))
+            if self.repository.get_data(index, "preset"):
+                self.__preset_indices.append(index)
+
+    def __reset_views(self):
+        self.__views = []
+        self.__preset_indices = []
+        self.__modified_views = set()
+
+    def messages_view(self) -> Sequence[dict]:
+        """Returns the cached messages (the same as messages()) without copying them.
+        It is read-only: neither the list nor the messages may be modified."""
+        self.__update_views()
+        return self.__views
+
     def messages(self):
-        return list(map(self.message_dict, self.repository.messages()))
+        return list(self.messages_view())
 
     def preset_messages(self):
-        return list(map(self.message_dict, self.repository.preset_messages()))
+        views = self.messages_view()
+        return [views[index] for index in self.__preset_indices]
 
     def nonpreset_messages(self):
-        return list(map(self.message_dict, self.repository.nonpreset_messages()))
+        views = self.messages_view()
+        presets = set(self.__preset_indices)
+        return [message for index, message in enumerate(views) if index not in presets]
 
     def restore(self, data: List[dict]):
+        self.__reset_token_counts()
+        self.__reset_views()
         return self.repository.restore(data)
 
-    def session_list(self):
-        return self.repository.session_list()
+    def __reset_token_counts(self):
+        self.__token_counts = []
+        self.__modified_indices = set()
+        self.__total_tokens = 0
+
+    def __count_message_tokens(self, data: dict):
+        count = TOKENS_PER_MESSAGE + self.__token_counter(data.get("content") or "")
+        name = data.get("name")
+        if name:
+            count += TOKENS_PER_NAME + self.__token_counter(str(name))
+        return count
+
+    def __update_token_counts(self):
+        self.__check_revision()
+        length = self.repository.len()
+        if len(self.__token_counts) > length:
+            # The repository was modified directly. Start over.
+            self.__reset_token_counts()
+        for index in self.__modified_indices:
+            count = self.__count_message_tokens(self.repository.get(index))
+            self.__token_counts[index] = count
+            self.__total_tokens += count
+        self.__modified_indices = set()
+        for index in range(len(self.__token_counts), length):
+            count = self.__count_message_tokens(self.repository.get(index))
+            self.__token_counts.append(count)
+            self.__total_tokens += count
+
+    def message_tokens(self, index: int):
+        """Returns the number of tokens of the specified message (memoized)"""
+        self.__update_token_counts()
+        return self.__token_counts[index]
+
+    def num_tokens(self):
+        """Returns the number of tokens of messages(). Only messages added or modified
+        since the last call are counted."""
+        self.__update_token_counts()
+        return self.__total_tokens
+
+    def session_list(self, offset: int = 0, limit: Optional[int] = None):
+        return self.repository.session_list(offset, limit)
 
     def get_session_data(self, id: str):
         return self.repository.get_session_data(id)
 
+    def search(self, query: str, limit: int = 20) -> List[dict]:
+        """Returns the stored messages (of all the sessions of the agent) matching all the terms in the query,
+        the best match first. Each hit is a dict with session_id, id, title, seq, role, snippet and score."""
+        return self.repository.search(query, limit)
+
     def md(self, names: dict = {}):
         def to_md(data):
             name = names.get(data["role"]) or data["role"]
@@ -61,4 +193,4 @@ class ChatHistory:
                 return ""
             return ("\n").join(["## " + name, "", data["content"].replace("\n", ""), ""])
 
-        return ("\n").join(list(map(to_md, self.messages())))
+        return ("\n").join(list(map(to_md, self.messages_view())))
@@ -1,7 +1,9 @@
+import asyncio
+import inspect
 import random
 import re
 import uuid
-from typing import Callable, List, Optional
+from typing import Awaitable, Callable, List, Optional, Union
 
 from slashgpt.chat_config import ChatConfig
 from slashgpt.chat_history import ChatHistory
@@ -9,6 +11,7 @@ from slashgpt.dbs.db_base import VectorDBBase
 from slashgpt.function.jupyter_runtime import PythonRuntime
 from slashgpt.history.storage.abstract import ChatHistoryAbstractStorage
 from slashgpt.history.storage.memory import ChatHistoryMemoryStorage
+from slashgpt.history.window import HistoryWindow
 from slashgpt.llms.model import LlmModel
 from slashgpt.manifest import Manifest
 from slashgpt.utils.print import print_debug, print_error, print_info
@@ -51,6 +54,8 @@ class ChatSession:
         """Specified user id or randomly generated uuid (str)"""
         self.history: ChatHistory = ChatHistory(history_engine or ChatHistoryMemoryStorage(self.user_id, agent_name))
         """Chat history (ChatHistory)"""
+        self.history_window: HistoryWindow = HistoryWindow.factory(self.manifest)
+        """Policy which selects the messages sent to the LLM (HistoryWindow)"""
         self.memory: Optional[dict] = memory
         """Short term memory (dict, optional)"""
 
@@ -90,6 +95,7 @@ class ChatSession:
         """Set the LLM model"""
         if llm_model.check_api_key():
             self.llm_model = llm_model
+            self.history.set_token_counter(llm_model.num_tokens)
         else:
             print_error("You need to set " + llm_model.get("api_key") + " to use this model. ")
         if self.config.verbose:
@@ -117,7 +123,7 @@ class ChatSession:
         message = self.manifest.format_question(message)
         self.append_message("user", message, False)
         if self.vector_db:
-            articles = self.vector_db.fetch_related_articles(self.history.messages(), self.llm_model)
+            articles = self.vector_db.fetch_related_articles(self.history.messages_view(), self.llm_model)
             assert self.history.get_message_prop(0, "role") == "system", "Missing system message"
             self.history.set_message(
                 0,
@@ -155,19 +161,26 @@ class ChatSession:
         """Title of the AI agent specified in the manifest"""
         return self.manifest.title()
 
-    def call_llm(self):
+    def call_llm(self, on_token: Optional[Callable[[str], None]] = None):
         """
         Let the LLM generate a responce based on the messasges in this session.
         The application typically calls call_loop method instead.
 
+        Args:
+
+            on_token (function, optional): called with each text delta, if the manifest enables streaming
+
         Returns:
 
             role (str): "assistent"
             res (str): message
             function_call (dict): json representing the function call (optional)
         """
-        messages = self.history.messages()
-        (role, res, function_call, token_usage) = self.llm_model.generate_response(messages, self.manifest, self.config.verbose)
+        messages = self.history_window.messages(self.history, self.llm_model, self.config.verbose)
+        if on_token and self.manifest.stream():
+            (role, res, function_call, token_usage) = self.llm_model.generate_response_stream(messages, self.manifest, self.config.verbose, on_token)
+        else:
+            (role, res, function_call, token_usage) = self.llm_model.generate_response(messages, self.manifest, self.config.verbose)
 
         if self.config.verbose and function_call is not None:
             print_info(function_call)
@@ -177,12 +190,33 @@ class ChatSession:
 
         return (res, function_call, token_usage)
 
-    def call_loop(self, callback: Callable[[str, tuple[str, dict]], None], runtime: PythonRuntime = None):
+    async def acall_llm(self):
+        """
+        Asynchronous version of call_llm, which lets many sessions share one event loop.
+
+        Returns:
+
+            the same tuple as call_llm
+        """
+        messages = await self.history_window.amessages(self.history, self.llm_model, self.config.verbose)
+        (role, res, function_call, token_usage) = await self.llm_model.agenerate_response(messages, self.manifest, self.config.verbose)
+
+        if self.config.verbose and function_call is not None:
+            print_info(function_call)
+
+        if role and res:
+            self.append_message(role, res, False)
+
+        return (res, function_call, token_usage)
+
+    def call_loop(self, callback: Callable[[str, Union[str, tuple[str, dict]]], None], runtime: PythonRuntime = None):
         """
         Calls the LLM and process the response (functions calls).
         It may call itself recursively if ncessary.
+        If the manifest enables streaming, each text delta is sent as a "token" event
+        before the whole message is sent as a "bot" event.
         """
-        (res, function_call, _) = self.call_llm()
+        (res, function_call, _) = self.call_llm(lambda token: callback("token", token))
 
         if res:
             callback("bot", res)
@@ -209,3 +243,40 @@ class ChatSession:
 
                 if should_call_llm:
                     self.call_loop(callback, runtime)
+
+    async def acall_loop(self, callback: Callable[[str, tuple[str, dict]], Optional[Awaitable[None]]], runtime: PythonRuntime = None):
+        """
+        Asynchronous version of call_loop.
+        The callback may be a coroutine function, and function calls are processed in a worker thread.
+        """
+
+        async def notify(callback_type: str, data):
+            result = callback(callback_type, data)
+            if inspect.isawaitable(result):
+                await result
+
+        (res, function_call, _) = await self.acall_llm()
+
+        if res:
+            await notify("bot", res)
+
+        if function_call:
+            (action_data, action_method) = function_call.get_emit_data(self.config.verbose)
+            if action_method:
+                await notify("emit", (action_method, action_data))
+            else:
+                (
+                    function_message,
+                    function_name,
+                    should_call_llm,
+                ) = await asyncio.to_thread(
+                    function_call.process_function_call,
+                    self.history,
+                    runtime,
+                    self.config.verbose,
+                )
+                if function_message:
+                    await notify("function", (function_name, function_message))
+
+                if should_call_llm:
+                    await self.acall_loop(callback, runtime)
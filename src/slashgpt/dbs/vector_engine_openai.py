@@ -23,10 +23,12 @@ class VectorEngineOpenAI(VectorEngine):
     def results_to_articles(self, results: List[str], query: str, messages: List[dict], llm_model: LlmModel) -> str:
         articles = ""
         count = 0
-        message = self.__join_messages(messages)
+        # Count the query and messages once (memoized per message), then add articles incrementally
+        num_tokens = llm_model.num_tokens(query) + sum(llm_model.num_tokens(message["content"] or "") + 1 for message in messages)
         for article in results:
             article_with_section = f'{article}\n"""'
-            if llm_model.is_within_budget(articles + article_with_section + query + message, self.__verbose):
+            num_tokens += llm_model.num_tokens(article_with_section)
+            if llm_model.is_within_token_budget(num_tokens):
                 count += 1
                 articles += article_with_section
             else:
@@ -34,6 +36,3 @@ class VectorEngineOpenAI(VectorEngine):
         if self.__verbose:
             print_debug(f"Articles:{count}")
         return articles
-
-    def __join_messages(self, messages: List[dict]) -> str:
-        return "\n".join(map(lambda x: x["content"], messages))
@@ -4,6 +4,7 @@ import re
 from urllib.parse import quote_plus, urlparse
 
 from slashgpt.function.network import graphQLRequest, http_request, isLoadedGQL
+from slashgpt.utils.file_cache import read_text
 from slashgpt.utils.print import print_debug, print_error, print_function
 from slashgpt.utils.utils import CallType
 
@@ -106,13 +107,12 @@ class FunctionAction:
         self, base_dir: str, template_file_name: str, mime_type: str, message_template: str, arguments: dict, verbose: bool
     ) -> str:
         _mime_type = mime_type or ""
-        with open(f"{base_dir}/{template_file_name}", "r") as f:
-            template = f.read()
-            if verbose:
-                print_debug(template)
-            data = template.format(**arguments)
-            dataURL = f"data:{_mime_type};charset=utf-8,{quote_plus(data)}"
-            return message_template.format(url=dataURL)
+        template = read_text(f"{base_dir}/{template_file_name}")
+        if verbose:
+            print_debug(template)
+        data = template.format(**arguments)
+        dataURL = f"data:{_mime_type};charset=utf-8,{quote_plus(data)}"
+        return message_template.format(url=dataURL)
 
     def __get_appkey_value(self) -> str | None:
         appkey = self.__get("appkey")
@@ -1,5 +1,10 @@
+from __future__ import annotations
+
 from abc import ABCMeta, abstractmethod
-from typing import List
+from typing import TYPE_CHECKING, List, Optional
+
+if TYPE_CHECKING:
+    from slashgpt.history.storage.retention import RetentionPolicy
 
 
 class ChatHistoryAbstractStorage(metaclass=ABCMeta):
@@ -44,9 +49,24 @@ class ChatHistoryAbstractStorage(metaclass=ABCMeta):
         pass
 
     @abstractmethod
-    def session_list(self):
+    def session_list(self, offset: int = 0, limit: Optional[int] = None):
+        """Returns the sessions of the agent in the order of creation, skipping offset sessions and up to limit (None: all)"""
         pass
 
     @abstractmethod
     def get_session_data(self, id: str):
         pass
+
+    def revision(self) -> int:
+        """Changes when the messages are modified other than through this object (e.g. by another process)"""
+        return 0
+
+    def sweep(self, policy: RetentionPolicy, limit: int) -> int:
+        """Deletes up to limit stored sessions exceeding the retention policy, and returns the number of them
+        (the storage does not support retention if it is not overridden)"""
+        return 0
+
+    def search(self, query: str, limit: int) -> List[dict]:
+        """Returns the stored messages matching the query, the best match first
+        (the storage does not support search if it is not overridden)"""
+        return []
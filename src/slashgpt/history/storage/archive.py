@@ -0,0 +1,66 @@
+import glob
+import json
+import os
+import zlib
+from typing import List, Tuple
+
+SEGMENT_SIZE = 64 * 1024 * 1024
+
+
+class SessionArchive:
+    """
+    Cold storage of sessions ({directory}/.archive/segment-NNNNNN.z).
+    Each session is compressed independently and appended to the current segment,
+    so that it can be read back with a single seek given its (segment, offset, length).
+    """
+
+    def __init__(self, directory: str, segment_size: int = SEGMENT_SIZE):
+        self.directory = f"{directory}/.archive"
+        self.segment_size = segment_size
+
+    def __current_segment(self):
+        segments = sorted(glob.glob(f"{self.directory}/segment-*.z"))
+        if not segments:
+            return "segment-000000.z"
+        if os.path.getsize(segments[-1]) < self.segment_size:
+            return os.path.basename(segments[-1])
+        # Numbered after the last one, because older segments may have been removed
+        last = int(os.path.basename(segments[-1])[len("segment-") : -len(".z")])
+        return f"segment-{last + 1:06d}.z"
+
+    def write(self, documents: List[dict]) -> List[Tuple[str, int, int]]:
+        """Appends the documents and returns their locations (segment, offset, length)"""
+        os.makedirs(self.directory, exist_ok=True)
+        locations = []
+        segment = self.__current_segment()
+        f = open(f"{self.directory}/{segment}", "ab")
+        try:
+            for document in documents:
+                if f.tell() >= self.segment_size:
+                    f.flush()
+                    os.fsync(f.fileno())
+                    f.close()
+                    segment = self.__current_segment()
+                    f = open(f"{self.directory}/{segment}", "ab")
+                data = zlib.compress(json.dumps(document, ensure_ascii=False).encode("utf-8"), 9)
+                locations.append((segment, f.tell(), len(data)))
+                f.write(data)
+            # The locations are recorded only after the data is on disk
+            f.flush()
+            os.fsync(f.fileno())
+        finally:
+            f.close()
+        return locations
+
+    def read(self, segment: str, offset: int, length: int) -> dict:
+        """Returns the document at the location"""
+        with open(f"{self.directory}/{os.path.basename(segment)}", "rb") as f:
+            f.seek(offset)
+            return json.loads(zlib.decompress(f.read(length)).decode("utf-8"))
+
+    def remove(self, segment: str):
+        """Removes the segment, unless it is the last one (which may still be written)"""
+        segments = sorted(glob.glob(f"{self.directory}/segment-*.z"))
+        path = f"{self.directory}/{os.path.basename(segment)}"
+        if segments and path != segments[-1] and os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,426 @@
+import contextlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, ContextManager, List, Optional
+
+from slashgpt.history.storage import search
+from slashgpt.history.storage.archive import SessionArchive
+from slashgpt.history.storage.layout import SessionLayout
+from slashgpt.history.storage.retention import SWEEP_BATCH_SIZE, RetentionPolicy
+from slashgpt.history.storage.search import SessionSearchIndex
+from slashgpt.history.storage.sqlite import get_connection
+from slashgpt.utils.print import print_warning
+
+CATALOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS catalog (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL UNIQUE,
+    uid TEXT,
+    path TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    size INTEGER NOT NULL DEFAULT 0,
+    title TEXT,
+    archive_segment TEXT,
+    archive_offset INTEGER,
+    archive_length INTEGER
+);
+CREATE INDEX IF NOT EXISTS catalog_created_at ON catalog (created_at);
+CREATE INDEX IF NOT EXISTS catalog_updated_at ON catalog (updated_at);
+CREATE INDEX IF NOT EXISTS catalog_uid ON catalog (uid, updated_at);
+"""
+SCHEMA = CATALOG_SCHEMA + search.SCHEMA
+
+COLUMNS = (
+    "id",
+    "session_id",
+    "uid",
+    "path",
+    "created_at",
+    "updated_at",
+    "message_count",
+    "size",
+    "title",
+    "archive_segment",
+    "archive_offset",
+    "archive_length",
+)
+ARCHIVE_COLUMNS = ("archive_segment TEXT", "archive_offset INTEGER", "archive_length INTEGER")
+ARCHIVE_BATCH_SIZE = 1000
+ORDERS = ("created_at", "updated_at")
+TITLE_LENGTH = 80
+
+
+def title_of(message: dict) -> Optional[str]:
+    """Returns the title of a session starting with the message, if it is a message from the user"""
+    content = message.get("content")
+    if message.get("role") == "user" and content:
+        return " ".join(content.split())[:TITLE_LENGTH]
+    return None
+
+
+class SessionCatalog:
+    """
+    Persistent catalog of the sessions of an agent ({base_dir}/{agent_name}/.catalog.sqlite3).
+    Storages update it on each write, so that sessions can be listed (sorted by time, paginated)
+    and looked up by id without scanning the directory.
+    Each session gets a sequential id, which does not change when other sessions are added.
+    Idle sessions can be moved to the compressed archive (SessionArchive), and they are read back transparently.
+    Session files created before the catalog are indexed in the background, and the methods reading the catalog wait for it.
+    """
+
+    __catalogs: dict = {}
+    __lock = threading.Lock()
+
+    def __init__(self, base_dir: str, agent_name: str):
+        self.directory = os.path.abspath(f"{base_dir}/{agent_name}")
+        self.db_path = f"{self.directory}/.catalog.sqlite3"
+        self.archive_storage = SessionArchive(self.directory)
+        """Compressed archive of idle sessions (SessionArchive)"""
+        self.layout = SessionLayout(self.directory)
+        """Placement of the session files (SessionLayout)"""
+        self.search_index = SessionSearchIndex(self.__connection)
+        """Full-text index of the messages (SessionSearchIndex)"""
+        self.__indexed = threading.Event()
+        self.__indexed.set()
+
+    @classmethod
+    def get(cls, base_dir: str, agent_name: str, load: Callable[[str], List[dict]]):
+        """Returns the shared catalog of the agent. When the catalog is created in an existing directory,
+        the session files in it are indexed in the background (see wait_indexed), reading their messages with load(path)."""
+        key = (os.path.abspath(base_dir), agent_name)
+        with cls.__lock:
+            catalog = cls.__catalogs.get(key)
+            if catalog is None:
+                catalog = SessionCatalog(base_dir, agent_name)
+                is_new = not os.path.exists(catalog.db_path)
+                catalog.__migrate()
+                try:
+                    created = catalog.search_index.create()
+                except sqlite3.OperationalError as e:
+                    # e.g. SQLite built without FTS5 or the trigram tokenizer: the sessions are stored, but not searched
+                    print_warning(f"SessionCatalog: full-text search is disabled ({e})")
+                    catalog.search_index.enabled = False
+                    created = False
+                if is_new:
+                    # The files written after the catalog are added by their storages
+                    before = os.path.getmtime(catalog.db_path)
+                    catalog.__index_in_background(lambda: catalog.index_files(load, before))
+                elif created:
+                    # The catalog was created by an older version without the search index
+                    catalog.__index_in_background(lambda: catalog.index_messages(load))
+                cls.__catalogs[key] = catalog
+            return catalog
+
+    def __index_in_background(self, index: Callable[[], None]):
+        # Storages are created on the first message of a session, which should not wait for a directory with many files
+        def run():
+            try:
+                index()
+            except Exception as e:
+                print_warning(f"SessionCatalog: failed to index {self.directory}: {e}")
+            finally:
+                self.__indexed.set()
+
+        self.__indexed.clear()
+        threading.Thread(target=run, name="slashgpt-catalog-indexer", daemon=True).start()
+
+    def wait_indexed(self, timeout: Optional[float] = None) -> bool:
+        """Waits until the session files existing when the catalog was created are indexed. Returns False on timeout."""
+        return self.__indexed.wait(timeout)
+
+    def __connection(self):
+        return get_connection(self.db_path, SCHEMA)
+
+    def __migrate(self):
+        # Add the columns missing in catalogs created by older versions
+        with self.__connection() as connection:
+            columns = [row[1] for row in connection.execute("PRAGMA table_info(catalog)")]
+            for column in ARCHIVE_COLUMNS:
+                if column.split()[0] not in columns:
+                    connection.execute(f"ALTER TABLE catalog ADD COLUMN {column}")
+
+    def index_files(self, load: Callable[[str], List[dict]], before: Optional[float] = None):
+        """Adds the session files in the directory (those modified at or before the time, if specified), which are not in the catalog yet"""
+        # Storages may write the catalog meanwhile, so the entries are only added, and those added by them are kept
+        for path in sorted(self.layout.session_files(), key=os.path.getmtime):
+            session_id = os.path.basename(path).split(".json")[0]
+            if path.endswith(".tmp") or (before is not None and os.path.getmtime(path) > before) or self.find(session_id):
+                continue
+            try:
+                messages = load(path)
+            except Exception as e:
+                print_warning(f"SessionCatalog: failed to index {path}: {e}")
+                continue
+            title = next((title for title in map(title_of, messages) if title), None)
+            mtime = os.path.getmtime(path)
+            with self.__connection() as connection:
+                cursor = connection.execute(
+                    """INSERT INTO catalog (session_id, path, created_at, updated_at, message_count, size, title)
+                    SELECT ?, ?, ?, ?, ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM catalog WHERE session_id = ?)""",
+                    (session_id, path, mtime, mtime, len(messages), os.path.getsize(path), title, session_id),
+                )
+            if cursor.rowcount > 0:
+                self.search_index.index(session_id, 0, messages)
+
+    def index_messages(self, load: Callable[[str], List[dict]]):
+        """Adds the messages of all the sessions in the catalog to the search index"""
+        for entry in self.__list():
+            try:
+                if entry["archive_segment"]:
+                    messages = self.read_archived(entry)["messages"]
+                else:
+                    messages = load(entry["path"])
+            except Exception as e:
+                print_warning(f"SessionCatalog: failed to index {entry['path']}: {e}")
+                continue
+            self.search_index.index(entry["session_id"], 0, messages)
+
+    def search(self, query: str, limit: int = 20) -> List[dict]:
+        """Returns the messages matching all the terms in the query, the best match first (see SessionSearchIndex.search).
+        Each hit has the id and the title of the session as well."""
+        self.wait_indexed()
+        hits = self.search_index.search(query, limit)
+        for hit in hits:
+            entry = self.find(hit["session_id"]) or {}
+            hit["id"] = entry.get("id")
+            hit["title"] = entry.get("title")
+        return hits
+
+    def session_directory(self, session_id: str) -> str:
+        """Returns the directory of the session file: that of the existing file, or that in the current layout.
+        The file is looked up in both layouts, so it does not wait for the files being indexed."""
+        directory = self.layout.find_directory(session_id)
+        if directory:
+            return directory
+        entry = self.find(session_id)
+        if entry:
+            return os.path.dirname(entry["path"])
+        return self.layout.directory_of(session_id)
+
+    def relayout(self, sharded: bool, lock: Optional[Callable[[str], ContextManager]] = None) -> int:
+        """Switches the layout, and moves the existing session files into it (holding lock(session_id) for each).
+        Returns the number of moved files."""
+        self.wait_indexed()
+        self.layout.set_sharded(sharded)
+        moved = 0
+        for path in self.layout.session_files():
+            if path.endswith(".tmp"):
+                continue
+            file_name = os.path.basename(path)
+            session_id = file_name.split(".json")[0]
+            directory = self.layout.directory_of(session_id)
+            if os.path.dirname(path) == directory:
+                continue
+            os.makedirs(directory, exist_ok=True)
+            with lock(session_id) if lock else contextlib.nullcontext():
+                os.replace(path, f"{directory}/{file_name}")
+                with self.__connection() as connection:
+                    connection.execute(
+                        "UPDATE catalog SET path = ? WHERE session_id = ? AND path = ?",
+                        (f"{directory}/{file_name}", session_id, path),
+                    )
+            moved += 1
+        return moved
+
+    def update(
+        self,
+        session_id: str,
+        uid: Optional[str],
+        path: str,
+        message_count: int,
+        size: int,
+        title: Optional[str] = None,
+        now: Optional[float] = None,
+    ):
+        """Adds or updates the session (the uid and the title are kept once they are set). An archived session becomes active again."""
+        now = now or time.time()
+        with self.__connection() as connection:
+            # Update first, because an upsert would consume an id even if the session exists
+            cursor = connection.execute(
+                """UPDATE catalog SET uid = COALESCE(uid, ?), path = ?, updated_at = ?, message_count = ?, size = ?,
+                title = COALESCE(title, ?), archive_segment = NULL, archive_offset = NULL, archive_length = NULL WHERE session_id = ?""",
+                (uid, path, now, message_count, size, title, session_id),
+            )
+            if cursor.rowcount == 0:
+                connection.execute(
+                    "INSERT INTO catalog (session_id, uid, path, created_at, updated_at, message_count, size, title) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (session_id, uid, path, now, now, message_count, size, title),
+                )
+
+    def archive(
+        self,
+        idle_seconds: float,
+        load: Callable[[str], List[dict]],
+        lock: Optional[Callable[[str], ContextManager]] = None,
+        now: Optional[float] = None,
+    ) -> int:
+        """Moves the sessions not updated for idle_seconds into the compressed archive,
+        reading their messages with load(path), and deletes their files. Returns the number of archived sessions.
+        Each file is deleted holding lock(session_id), and kept if it was modified after it was read."""
+        self.wait_indexed()
+        cutoff = (now or time.time()) - idle_seconds
+        connection = self.__connection()
+        rows = connection.execute(
+            "SELECT session_id, path FROM catalog WHERE archive_segment IS NULL AND updated_at < ? ORDER BY updated_at",
+            (cutoff,),
+        ).fetchall()
+        archived = 0
+        for start in range(0, len(rows), ARCHIVE_BATCH_SIZE):
+            sessions = []
+            for session_id, path in rows[start : start + ARCHIVE_BATCH_SIZE]:
+                try:
+                    stat = os.stat(path)
+                    sessions.append((session_id, path, stat, {"messages": load(path)}))
+                except FileNotFoundError:
+                    # The file was removed. Drop the entry as well.
+                    self.remove(session_id)
+                except Exception as e:
+                    print_warning(f"SessionCatalog: failed to archive {path}: {e}")
+            # The files are deleted only after the archive is written
+            locations = self.archive_storage.write([document for (_, _, _, document) in sessions])
+            for (session_id, path, stat, _), location in zip(sessions, locations):
+                with lock(session_id) if lock else contextlib.nullcontext():
+                    if self.__archive_session(session_id, path, stat, location, cutoff):
+                        archived += 1
+        return archived
+
+    def __archive_session(self, session_id: str, path: str, stat: os.stat_result, location: tuple, cutoff: float) -> bool:
+        try:
+            current = os.stat(path)
+        except FileNotFoundError:
+            return False
+        if (current.st_ino, current.st_size, current.st_mtime_ns) != (stat.st_ino, stat.st_size, stat.st_mtime_ns):
+            # Modified while it was being archived
+            return False
+        with self.__connection() as connection:
+            cursor = connection.execute(
+                "UPDATE catalog SET archive_segment = ?, archive_offset = ?, archive_length = ? WHERE session_id = ? AND updated_at < ?",
+                (*location, session_id, cutoff),
+            )
+        if cursor.rowcount == 0:
+            return False
+        os.remove(path)
+        return True
+
+    def read_archived(self, entry: dict) -> dict:
+        """Returns the archived session ({"messages": [...]}) of the entry"""
+        return self.archive_storage.read(entry["archive_segment"], entry["archive_offset"], entry["archive_length"])
+
+    def expired(self, policy: RetentionPolicy, limit: int, now: Optional[float] = None) -> List[dict]:
+        """Returns up to limit entries exceeding the policy, from the catalog (oldest first)"""
+        self.wait_indexed()
+        columns = ", ".join(COLUMNS)
+        connection = self.__connection()
+        if policy.max_age is not None:
+            rows = connection.execute(
+                f"SELECT {columns} FROM catalog WHERE updated_at < ? ORDER BY updated_at LIMIT ?",
+                ((now or time.time()) - policy.max_age, limit),
+            ).fetchall()
+            if rows:
+                return [self.__row(row) for row in rows]
+        if policy.max_sessions_per_user is not None:
+            rows = connection.execute(
+                f"""SELECT {columns} FROM (
+                    SELECT *, ROW_NUMBER() OVER (PARTITION BY uid ORDER BY updated_at DESC, id DESC) AS rank FROM catalog
+                ) WHERE rank > ? ORDER BY updated_at LIMIT ?""",
+                (policy.max_sessions_per_user, limit),
+            ).fetchall()
+            if rows:
+                return [self.__row(row) for row in rows]
+        if policy.max_bytes is not None:
+            # Archived sessions take their compressed size
+            bytes_of = "CASE WHEN archive_segment IS NULL THEN size ELSE archive_length END"
+            excess = connection.execute(f"SELECT COALESCE(SUM({bytes_of}), 0) FROM catalog").fetchone()[0] - policy.max_bytes
+            entries: List[dict] = []
+            if excess > 0:
+                for row in connection.execute(f"SELECT {columns}, {bytes_of} FROM catalog ORDER BY updated_at, id LIMIT ?", (limit,)):
+                    entries.append(self.__row(row[:-1]))
+                    excess -= row[-1]
+                    if excess <= 0:
+                        break
+            return entries
+        return []
+
+    def sweep(
+        self,
+        policy: RetentionPolicy,
+        lock: Optional[Callable[[str], ContextManager]] = None,
+        limit: int = SWEEP_BATCH_SIZE,
+        now: Optional[float] = None,
+    ) -> List[dict]:
+        """Deletes up to limit sessions exceeding the policy (their entries and files, holding lock(session_id) for each),
+        and the archive segments no longer referenced. Returns the deleted entries."""
+        entries = self.expired(policy, limit, now)
+        segments = set()
+        for entry in entries:
+            with lock(entry["session_id"]) if lock else contextlib.nullcontext():
+                self.remove(entry["session_id"])
+                if entry["archive_segment"]:
+                    segments.add(entry["archive_segment"])
+                else:
+                    try:
+                        os.remove(entry["path"])
+                    except FileNotFoundError:
+                        pass
+        for segment in segments:
+            if self.__connection().execute("SELECT 1 FROM catalog WHERE archive_segment = ? LIMIT 1", (segment,)).fetchone() is None:
+                self.archive_storage.remove(segment)
+        return entries
+
+    def remove(self, session_id: str):
+        """Removes the session from the catalog and the search index (the file is not deleted)"""
+        with self.__connection() as connection:
+            connection.execute("DELETE FROM catalog WHERE session_id = ?", (session_id,))
+        self.search_index.truncate(session_id, 0)
+
+    def __row(self, row):
+        return dict(zip(COLUMNS, row)) if row else None
+
+    def find(self, session_id: str) -> Optional[dict]:
+        """Returns the entry of the session (dict), or None"""
+        row = self.__connection().execute(f"SELECT {', '.join(COLUMNS)} FROM catalog WHERE session_id = ?", (session_id,)).fetchone()
+        return self.__row(row)
+
+    def find_by_id(self, id: int) -> Optional[dict]:
+        """Returns the entry with the sequential id (dict), or None"""
+        self.wait_indexed()
+        row = self.__connection().execute(f"SELECT {', '.join(COLUMNS)} FROM catalog WHERE id = ?", (id,)).fetchone()
+        return self.__row(row)
+
+    def lookup(self, id: str) -> Optional[dict]:
+        """Returns the entry specified by the sequential id or the session id"""
+        if id.isdecimal():
+            return self.find_by_id(int(id))
+        return self.find(id)
+
+    def list(self, offset: int = 0, limit: Optional[int] = None, order: str = "created_at", descending: bool = False) -> List[dict]:
+        """Returns the entries sorted by time
+
+        Args:
+
+            offset (int): number of entries to skip
+            limit (int, optional): maximum number of entries (None: all)
+            order (str): "created_at" or "updated_at"
+            descending (bool): True to list the newest first
+        """
+        if order not in ORDERS:
+            raise ValueError(f"Invalid order: {order}")
+        self.wait_indexed()
+        return self.__list(offset, limit, order, descending)
+
+    def __list(self, offset: int = 0, limit: Optional[int] = None, order: str = "created_at", descending: bool = False) -> List[dict]:
+        direction = "DESC" if descending else "ASC"
+        rows = self.__connection().execute(
+            f"SELECT {', '.join(COLUMNS)} FROM catalog ORDER BY {order} {direction}, id {direction} LIMIT ? OFFSET ?",
+            (-1 if limit is None else limit, offset),
+        )
+        return [self.__row(row) for row in rows]
+
+    def count(self) -> int:
+        """Returns the number of sessions"""
+        self.wait_indexed()
+        return self.__connection().execute("SELECT COUNT(*) FROM catalog").fetchone()[0]
@@ -1,16 +1,95 @@
-import glob
 import json
 import os
 import uuid
-from typing import List
+from contextlib import contextmanager
+from types import ModuleType
+from typing import List, Optional
 
 from slashgpt.history.storage.abstract import ChatHistoryAbstractStorage
+from slashgpt.history.storage.catalog import SessionCatalog, title_of
+from slashgpt.history.storage.layout import shard_of
 from slashgpt.history.storage.log import create_log_dir
+from slashgpt.history.storage.retention import SWEEP_BATCH_SIZE, RetentionPolicy
 from slashgpt.utils.print import print_warning
 
+fcntl: Optional[ModuleType]
+try:
+    import fcntl
+except ImportError:
+    # Windows: sessions are not locked across processes
+    fcntl = None
+
+# Compact the journal when it grows past this size and twice its size after the last compaction,
+# so that compaction costs amortized O(1) per operation.
+COMPACTION_THRESHOLD = 1024 * 1024
+
+
+@contextmanager
+def session_lock(directory: str, session_id: str, remove: bool = False):
+    """Holds the lock of the session across processes ({directory}/.locks/{shard}/{session_id}.lock).
+    Yields the descriptor of the lock file, which holds the generation of the journal (incremented on each compaction).
+    With remove=True, the lock file is deleted before the lock is released (when the session is deleted)."""
+    lock_dir = f"{directory}/.locks/{shard_of(session_id)}"
+    path = f"{lock_dir}/{session_id}.lock"
+    while True:
+        os.makedirs(lock_dir, exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        if not fcntl:
+            break
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        # The file may have been deleted (and created again by another process) while this one was waiting for it.
+        # Only the lock of the file at the path counts, so the lock is taken again on that file.
+        try:
+            if os.fstat(fd).st_ino == os.stat(path).st_ino:
+                break
+        except FileNotFoundError:
+            pass
+        os.close(fd)
+    try:
+        yield fd
+        if remove:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    finally:
+        # Closing the descriptor releases the lock
+        os.close(fd)
+
+
+def read_generation(fd: int) -> int:
+    os.lseek(fd, 0, os.SEEK_SET)
+    data = os.read(fd, 32)
+    return int(data) if data.strip() else 0
+
+
+def write_generation(fd: int, generation: int):
+    os.lseek(fd, 0, os.SEEK_SET)
+    os.ftruncate(fd, 0)
+    os.write(fd, str(generation).encode())
+
 
 class ChatHistoryFileStorage(ChatHistoryAbstractStorage):
-    def __init__(self, uid: str, agent_name: str, session_id: str = ""):
+    """
+    Stores each session as an append-only journal (filememory/<agent>/<session>.jsonl),
+    with one json line per append/set/pop operation. The journal is replayed when the session is loaded,
+    and compacted into a single snapshot line once it grows large. Sessions saved as .json are still loaded.
+    Idle sessions can be moved to the compressed archive of the catalog with archive().
+
+    Several processes (e.g. server workers) may write the same session. Each write holds the lock of the session
+    and first applies the operations other processes appended to the journal since this one last read it,
+    so no write is lost. Reads return the messages as of the last load or write.
+    """
+
+    def __init__(self, uid: str, agent_name: str, session_id: str = "", sharded: bool = False):
+        """
+        Args:
+
+            uid (str): user id
+            agent_name (str): agent name
+            session_id (str, optional): id of the session to load (a new session if it is empty)
+            sharded (bool, optional): True to place the sessions of the agent in shard subdirectories (see SessionLayout)
+        """
         self.__messages: List[dict] = []
         self.base_dir = "filememory"
 
@@ -19,31 +98,201 @@ class ChatHistoryFileStorage(ChatHistoryAbstractStorage):
 
         # self.time = datetime.now()
 
+        self.__journal_size = 0
+        self.__compacted_size = 0
+        self.__generation: Optional[int] = None
+        self.__revision = 0
+        self.__legacy = False
+        self.__archived = False
+
         create_log_dir(self.base_dir, agent_name)
+        self.catalog = SessionCatalog.get(self.base_dir, agent_name, self.read_session)
+        """Catalog of the sessions of the agent (SessionCatalog)"""
+        if sharded and not self.catalog.layout.sharded:
+            self.catalog.layout.set_sharded(True)
         if session_id == "":
             self.session_id = str(uuid.uuid4())
+            self.__directory = self.catalog.layout.directory_of(self.session_id)
         else:
             self.session_id = session_id
+            self.__directory = self.catalog.session_directory(session_id)
+        os.makedirs(self.__directory, exist_ok=True)
+        if session_id != "":
             self.__load_session()
 
     def _data(self):
         return {"messages": self.__messages}
 
-    def __save_session(self):
-        with open(f"{self.base_dir}/{self.agent_name}/{self.session_id}.json", "w") as f:
-            json.dump(self._data(), f, ensure_ascii=False, indent=2)
+    def __path(self, extension: str = "jsonl"):
+        return f"{self.__directory}/{self.session_id}.{extension}"
+
+    @classmethod
+    def replay(cls, path: str) -> List[dict]:
+        """Returns the messages recorded in the journal file"""
+        messages: List[dict] = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # The last line may be incomplete if the process crashed while writing it
+                    print_warning(f"Skipping a broken record in {path}")
+                    continue
+                cls.__apply(messages, record)
+        return messages
+
+    @classmethod
+    def read_session(cls, path: str) -> List[dict]:
+        """Returns the messages of the session file (journal or legacy json)"""
+        if path.endswith(".jsonl"):
+            return cls.replay(path)
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("messages") or []
+
+    @classmethod
+    def __apply(cls, messages: List[dict], record: dict):
+        op = record.get("op")
+        if op == "append":
+            messages.append(record["data"])
+        elif op == "set":
+            messages[record["index"]] = record["data"]
+        elif op == "pop":
+            if messages:
+                messages.pop()
+        elif op == "restore":
+            messages[:] = record["messages"]
 
     def __load_session(self):
+        with self.__locked():
+            pass
+
+    @contextmanager
+    def __locked(self):
+        with session_lock(self.catalog.directory, self.session_id) as fd:
+            self.__sync(fd)
+            yield fd
+
+    def __sync(self, fd: int):
+        """Brings the messages up to date with the journal, reading only the part written since the last sync"""
+        generation = read_generation(fd)
+        loaded = self.__generation is not None
+        replaced = generation != self.__generation
+        self.__generation = generation
         try:
-            with open(f"{self.base_dir}/{self.agent_name}/{self.session_id}.json", "r") as f:
+            f = open(self.__path(), "rb")
+        except FileNotFoundError:
+            directory = self.catalog.session_directory(self.session_id)
+            if directory != self.__directory:
+                # Moved into another layout
+                self.__directory = directory
+                os.makedirs(directory, exist_ok=True)
+                self.__generation = None
+                self.__sync(fd)
+            elif replaced or self.__journal_size:
+                # A new session, a legacy one, or one archived by another process
+                if loaded:
+                    self.__revision += 1
+                self.__load_fallback()
+            return
+        with f:
+            if replaced:
+                # The journal was compacted, restored or edited by another process (or is read for the first time)
+                if loaded:
+                    self.__revision += 1
+                self.__messages = []
+                self.__journal_size = 0
+                self.__legacy = self.__archived = False
+            f.seek(self.__journal_size)
+            data = f.read()
+        if not data:
+            return
+        if replaced:
+            self.__compacted_size = len(data)
+        else:
+            self.__revision += 1
+        self.__journal_size += len(data)
+        for line in data.splitlines():
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                print_warning(f"Skipping a broken record in {self.__path()}")
+                continue
+            self.__apply(self.__messages, record)
+
+    def __load_fallback(self):
+        self.__journal_size = 0
+        try:
+            with open(self.__path("json"), "r", encoding="utf-8") as f:
                 data = json.load(f)
                 self.__messages = data.get("messages")
+                self.__legacy = True
         except FileNotFoundError:
-            self.__messages = []
+            entry = self.catalog.find(self.session_id)
+            if entry and entry["archive_segment"]:
+                # The journal is written again from a snapshot on the next write
+                self.__messages = self.catalog.read_archived(entry)["messages"]
+                self.__archived = True
+            else:
+                self.__messages = []
+
+    def revision(self) -> int:
+        """Incremented when the messages are updated with the operations written by other processes"""
+        return self.__revision
+
+    def __write(self, fd: int, record: dict, title: Optional[str] = None):
+        if self.__legacy or self.__archived:
+            # Convert the legacy file into a journal, or write the journal of an archived session again
+            # (the snapshot includes this change)
+            self.__compact(fd)
+        else:
+            line = json.dumps(record, ensure_ascii=False) + "\n"
+            with open(self.__path(), "a", encoding="utf-8") as f:
+                f.write(line)
+            self.__journal_size += len(line.encode("utf-8"))
+            if self.__journal_size > max(COMPACTION_THRESHOLD, self.__compacted_size * 2):
+                self.__compact(fd)
+        self.__update_catalog(title)
+        self.__update_search_index(record)
+
+    def __update_search_index(self, record: dict):
+        op = record.get("op")
+        if op == "append":
+            self.catalog.search_index.index(self.session_id, len(self.__messages) - 1, [record["data"]])
+        elif op == "set":
+            self.catalog.search_index.index(self.session_id, record["index"], [record["data"]])
+        elif op == "pop":
+            self.catalog.search_index.truncate(self.session_id, len(self.__messages))
+        elif op == "restore":
+            self.catalog.search_index.truncate(self.session_id, 0)
+            self.catalog.search_index.index(self.session_id, 0, record["messages"])
+
+    def __update_catalog(self, title: Optional[str]):
+        self.catalog.update(self.session_id, self.uid, self.__path(), len(self.__messages), self.__journal_size, title)
+
+    def __compact(self, fd: int):
+        """Replaces the journal with a single snapshot of the messages"""
+        path = self.__path()
+        # Other processes replay the whole journal when the generation changes.
+        # It is incremented first, so that they never read the new journal from a stale offset.
+        self.__generation = (self.__generation or 0) + 1
+        write_generation(fd, self.__generation)
+        line = json.dumps({"op": "restore", "messages": self.__messages}, ensure_ascii=False) + "\n"
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+        self.__journal_size = self.__compacted_size = len(line.encode("utf-8"))
+        if self.__legacy:
+            os.remove(self.__path("json"))
+            self.__legacy = False
+        self.__archived = False
 
     def append(self, data: dict):
-        self.__messages.append(data)
-        self.__save_session()
+        with self.__locked() as fd:
+            self.__messages.append(data)
+            self.__write(fd, {"op": "append", "data": data}, title_of(data))
 
     def get(self, index: int):
         return self.__messages[index]
@@ -54,8 +303,12 @@ class ChatHistoryFileStorage(ChatHistoryAbstractStorage):
             return m.get(name)
 
     def set(self, index: int, data: dict):
-        if self.__messages[index]:
-            self.__messages[index] = data
+        with self.__locked() as fd:
+            if self.__messages[index]:
+                self.__messages[index] = data
+                if index < 0:
+                    index += len(self.__messages)
+                self.__write(fd, {"op": "set", "index": index, "data": data})
 
     def len(self):
         return len(self.__messages)
@@ -65,8 +318,11 @@ class ChatHistoryFileStorage(ChatHistoryAbstractStorage):
             return self.__messages[self.len() - 1]
 
     def pop(self):
-        if self.len() > 0:
-            return self.__messages.pop()
+        with self.__locked() as fd:
+            if self.len() > 0:
+                message = self.__messages.pop()
+                self.__write(fd, {"op": "pop"})
+                return message
 
     def messages(self):
         return self.__messages
@@ -78,20 +334,45 @@ class ChatHistoryFileStorage(ChatHistoryAbstractStorage):
         return filter(lambda x: not x.get("preset"), self.__messages)
 
     def restore(self, data: List[dict]):
-        self.__messages = data
+        with self.__locked() as fd:
+            self.__messages = data
+            self.__compact(fd)
+            self.__update_catalog(next((title for title in map(title_of, data) if title), None))
+            self.__update_search_index({"op": "restore", "messages": data})
 
-    def session_list(self):
-        history_path = f"./{self.base_dir}/{self.agent_name}"
-        files = glob.glob(f"{history_path}/*")
-        return list(map(lambda x: {"name": x[1], "id": x[0]}, enumerate(files)))
+    def session_list(self, offset: int = 0, limit: Optional[int] = None):
+        """Returns the sessions of the agent in the order of creation (from the catalog)"""
+        return [{**entry, "name": entry["path"]} for entry in self.catalog.list(offset, limit)]
 
     def get_session_data(self, id: str):
-        files = self.session_list()
-        if id.isdecimal() and len(files) > int(id):
-            file_name = files[int(id)]["name"]
-            if not os.path.exists(file_name):
-                print_warning(f"No log named {file_name}")
-                return
-            with open(file_name, "r", encoding="utf-8") as f:
-                log = json.load(f)
-                return log
+        """Returns the session specified by the id in session_list or the session id"""
+        entry = self.catalog.lookup(id)
+        if entry is None:
+            return
+        if entry["archive_segment"]:
+            return self.catalog.read_archived(entry)
+        file_name = entry["path"]
+        if not os.path.exists(file_name):
+            print_warning(f"No log named {file_name}")
+            return
+        return {"messages": self.read_session(file_name)}
+
+    def archive(self, max_idle_seconds: float) -> int:
+        """Moves the sessions of the agent not updated for max_idle_seconds into the compressed archive.
+        Returns the number of archived sessions."""
+        return self.catalog.archive(max_idle_seconds, self.read_session, lambda session_id: session_lock(self.catalog.directory, session_id))
+
+    def sweep(self, policy: RetentionPolicy, limit: int = SWEEP_BATCH_SIZE) -> int:
+        """Deletes up to limit sessions of the agent exceeding the retention policy. Returns the number of deleted sessions."""
+        # The lock files are deleted while they are held (see session_lock)
+        entries = self.catalog.sweep(policy, lambda session_id: session_lock(self.catalog.directory, session_id, remove=True), limit)
+        return len(entries)
+
+    def search(self, query: str, limit: int = 20) -> List[dict]:
+        """Returns the messages of the sessions of the agent matching all the terms in the query, the best match first.
+        Each hit is a dict with session_id, id, title, seq, role, snippet and score."""
+        return self.catalog.search(query, limit)
+
+    def relayout(self, sharded: bool) -> int:
+        """Moves the session files of the agent into the sharded (or flat) layout. Returns the number of moved files."""
+        return self.catalog.relayout(sharded, lambda session_id: session_lock(self.catalog.directory, session_id))
@@ -0,0 +1,64 @@
+import glob
+import hashlib
+import os
+from typing import List, Optional
+
+LAYOUT_FILE = ".layout"
+SHARDED = "sharded"
+FLAT = "flat"
+
+
+def shard_of(session_id: str) -> str:
+    """Returns the shard of the session (the first two hex digits of the md5 of its id)"""
+    return hashlib.md5(session_id.encode("utf-8")).hexdigest()[:2]
+
+
+class SessionLayout:
+    """
+    Placement of the session files of an agent, which is recorded in {directory}/.layout.
+
+    - flat: {directory}/{session_id}.json(l)
+    - sharded: {directory}/{shard}/{session_id}.json(l), where shard is shard_of(session_id) (256 subdirectories)
+
+    Directories holding hundreds of thousands of files are slow to look up and list, so large deployments should use
+    the sharded layout. Existing trees are converted with SessionCatalog.relayout (tools/history/migrate_layout.py).
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.sharded = self.__read() == SHARDED
+        """True if new sessions are placed in the shard subdirectories (bool)"""
+
+    def __read(self):
+        try:
+            with open(f"{self.directory}/{LAYOUT_FILE}", "r") as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return FLAT
+
+    def set_sharded(self, sharded: bool):
+        """Records the layout for new sessions (the existing files are not moved)"""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(f"{self.directory}/{LAYOUT_FILE}", "w") as f:
+            f.write(SHARDED if sharded else FLAT)
+        self.sharded = sharded
+
+    def directory_of(self, session_id: str) -> str:
+        """Returns the directory of the session file"""
+        if self.sharded:
+            return f"{self.directory}/{shard_of(session_id)}"
+        return self.directory
+
+    def find_directory(self, session_id: str) -> Optional[str]:
+        """Returns the directory holding the file of the session in either layout (the current one first), or None"""
+        directories = [self.directory, f"{self.directory}/{shard_of(session_id)}"]
+        if self.sharded:
+            directories.reverse()
+        for directory in directories:
+            if os.path.exists(f"{directory}/{session_id}.jsonl") or os.path.exists(f"{directory}/{session_id}.json"):
+                return directory
+        return None
+
+    def session_files(self) -> List[str]:
+        """Returns the session files in either layout"""
+        return glob.glob(f"{self.directory}/*.json*") + glob.glob(f"{self.directory}/[0-9a-f][0-9a-f]/*.json*")
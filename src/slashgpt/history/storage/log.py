@@ -1,5 +1,11 @@
+import atexit
 import json
 import os
+import threading
+from typing import Callable, Optional
+
+from slashgpt.history.storage.layout import SessionLayout
+from slashgpt.utils.print import print_error
 
 
 def create_log_dir(base_dir: str, agent_name: str):
@@ -9,7 +15,102 @@ def create_log_dir(base_dir: str, agent_name: str):
         os.makedirs(f"{base_dir}/{agent_name}")
 
 
-def save_log(base_dir: str, agent_name: str, context: dict, time):
+def log_path(base_dir: str, agent_name: str, time, layout: Optional[SessionLayout] = None):
     timeStr = time.strftime("%Y-%m-%d %H-%M-%S.%f")
-    with open(f"{base_dir}/{agent_name}/{timeStr}.json", "w") as f:
+    if layout and layout.sharded:
+        directory = layout.directory_of(timeStr)
+        os.makedirs(directory, exist_ok=True)
+        return f"{directory}/{timeStr}.json"
+    return f"{base_dir}/{agent_name}/{timeStr}.json"
+
+
+def save_log(base_dir: str, agent_name: str, context: dict, time):
+    with open(log_path(base_dir, agent_name, time), "w") as f:
         json.dump(context, f, ensure_ascii=False, indent=2)
+
+
+class LogWriter:
+    """
+    Write-behind writer of log files. Writes are queued and performed by a background thread,
+    and successive writes to the same file are coalesced into one (only the latest content is written).
+    Pending writes are flushed at interpreter exit.
+    """
+
+    def __init__(self, max_pending: int = 256):
+        """
+        Args:
+
+            max_pending (int): maximum number of files waiting to be written. write() blocks when it is full.
+        """
+        self.max_pending = max_pending
+        self.__pending: dict = {}
+        self.__condition = threading.Condition()
+        self.__thread: Optional[threading.Thread] = None
+        self.__writing = False
+        self.__closed = False
+        self.writes = 0
+        """Number of files written (int)"""
+
+    def write(self, path: str, context: dict, callback: Optional[Callable[[], None]] = None):
+        """Queues the context to be written to the path as json (the caller must not mutate it afterwards).
+        The callback is called by the writer thread after the file is written."""
+        with self.__condition:
+            if self.__closed:
+                self.__write(path, context, callback)
+                return
+            while path not in self.__pending and len(self.__pending) >= self.max_pending:
+                self.__condition.wait()
+            self.__pending[path] = (context, callback)
+            if self.__thread is None:
+                self.__thread = threading.Thread(target=self.__run, name="slashgpt-log-writer", daemon=True)
+                self.__thread.start()
+            self.__condition.notify_all()
+
+    def __run(self):
+        while True:
+            with self.__condition:
+                while not self.__pending and not self.__closed:
+                    self.__condition.wait()
+                if not self.__pending:
+                    return
+                (pending, self.__pending) = (self.__pending, {})
+                self.__writing = True
+                self.__condition.notify_all()
+            for path, (context, callback) in pending.items():
+                self.__write(path, context, callback)
+            with self.__condition:
+                self.__writing = False
+                self.__condition.notify_all()
+
+    def __write(self, path: str, context: dict, callback: Optional[Callable[[], None]]):
+        try:
+            self._write(path, context)
+            if callback:
+                callback()
+        except Exception as e:
+            print_error(f"LogWriter: failed to write {path}: {e}")
+
+    def _write(self, path: str, context: dict):
+        with open(path, "w") as f:
+            json.dump(context, f, ensure_ascii=False, indent=2)
+        self.writes += 1
+
+    def flush(self):
+        """Blocks until all the queued writes are written"""
+        with self.__condition:
+            while self.__pending or self.__writing:
+                self.__condition.wait()
+
+    def close(self):
+        """Flushes the queued writes and stops the background thread. Later writes are written synchronously."""
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify_all()
+            thread = self.__thread
+        if thread is not None:
+            thread.join()
+
+
+log_writer = LogWriter()
+"""The process-wide log writer, which is flushed at interpreter exit"""
+atexit.register(log_writer.close)
@@ -1,16 +1,25 @@
-import glob
 import json
 import os
+import threading
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
 from slashgpt.history.storage.abstract import ChatHistoryAbstractStorage
-from slashgpt.history.storage.log import create_log_dir, save_log
+from slashgpt.history.storage.catalog import SessionCatalog, title_of
+from slashgpt.history.storage.log import create_log_dir, log_path, log_writer
+from slashgpt.history.storage.retention import SWEEP_BATCH_SIZE, RetentionPolicy
 from slashgpt.utils.print import print_warning
 
 
 class ChatHistoryMemoryStorage(ChatHistoryAbstractStorage):
-    def __init__(self, uid: str, agent_name: str):
+    def __init__(self, uid: str, agent_name: str, sharded: bool = False):
+        """
+        Args:
+
+            uid (str): user id
+            agent_name (str): agent name
+            sharded (bool, optional): True to place the logs of the agent in shard subdirectories (see SessionLayout)
+        """
         self.__messages: List[dict] = []
         self.uid = uid
         self.agent_name = agent_name
@@ -19,13 +28,56 @@ class ChatHistoryMemoryStorage(ChatHistoryAbstractStorage):
         self.time = datetime.now()
         # init log dir
         create_log_dir(self.base_dir, agent_name)
+        self.catalog = SessionCatalog.get(self.base_dir, agent_name, self.read_session)
+        """Catalog of the sessions (logs) of the agent (SessionCatalog)"""
+        if sharded and not self.catalog.layout.sharded:
+            self.catalog.layout.set_sharded(True)
+        self.log_path = log_path(self.base_dir, agent_name, self.time, self.catalog.layout)
+        self.__title: Optional[str] = None
+        # Changes to the search index, made by the writer thread after the next write of the log
+        self.__index_operations: List[tuple] = []
+        self.__index_lock = threading.Lock()
+
+    @classmethod
+    def read_session(cls, path: str) -> List[dict]:
+        """Returns the messages of the log file"""
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("messages") or []
+
+    def __update_catalog(self, messages: List[dict], title: Optional[str]):
+        path = os.path.abspath(self.log_path)
+        session_id = os.path.basename(path)[: -len(".json")]
+        self.catalog.update(session_id, self.uid, path, len(messages), os.path.getsize(path), title)
+        # Successive writes are coalesced (only the last callback is called), so apply all the changes queued so far
+        with self.__index_lock:
+            (operations, self.__index_operations) = (self.__index_operations, [])
+        for operation in operations:
+            if operation[0] == "truncate":
+                self.catalog.search_index.truncate(session_id, operation[1])
+            else:
+                self.catalog.search_index.index(session_id, operation[1], operation[2])
+
+    def __queue_index(self, *operation):
+        with self.__index_lock:
+            self.__index_operations.append(operation)
+
+    def flush(self):
+        """Blocks until the log is written (it is written by a background thread)"""
+        log_writer.flush()
 
     def _data(self):
         return {"messages": self.__messages}
 
     def append(self, data: dict):
         self.__messages.append(data)
-        save_log(self.base_dir, self.agent_name, self._data(), self.time)
+        self.__queue_index("index", self.len() - 1, [data])
+        # The log is written behind by a background thread. Pass a copy, which is not modified by later appends.
+        # The catalog is updated by the writer thread as well.
+        messages = list(self.__messages)
+        if self.__title is None:
+            self.__title = title_of(data)
+        title = self.__title
+        log_writer.write(self.log_path, {"messages": messages}, lambda: self.__update_catalog(messages, title))
 
     def get(self, index: int):
         return self.__messages[index]
@@ -38,6 +90,7 @@ class ChatHistoryMemoryStorage(ChatHistoryAbstractStorage):
     def set(self, index: int, data: dict):
         if self.__messages[index]:
             self.__messages[index] = data
+            self.__queue_index("index", index if index >= 0 else index + self.len(), [data])
 
     def len(self):
         return len(self.__messages)
@@ -48,7 +101,9 @@ class ChatHistoryMemoryStorage(ChatHistoryAbstractStorage):
 
     def pop(self):
         if self.len() > 0:
-            return self.__messages.pop()
+            message = self.__messages.pop()
+            self.__queue_index("truncate", self.len())
+            return message
 
     def messages(self):
         return self.__messages
@@ -61,19 +116,49 @@ class ChatHistoryMemoryStorage(ChatHistoryAbstractStorage):
 
     def restore(self, data: List[dict]):
         self.__messages = data
+        self.__queue_index("truncate", 0)
+        self.__queue_index("index", 0, list(data))
 
-    def session_list(self):
-        history_path = f"./{self.base_dir}/{self.agent_name}"
-        files = glob.glob(f"{history_path}/*")
-        return list(map(lambda x: {"name": x[1], "id": x[0]}, enumerate(files)))
+    def session_list(self, offset: int = 0, limit: Optional[int] = None):
+        """Returns the sessions (logs) of the agent in the order of creation (from the catalog)"""
+        log_writer.flush()
+        return [{**entry, "name": entry["path"]} for entry in self.catalog.list(offset, limit)]
 
     def get_session_data(self, id: str):
-        files = self.session_list()
-        if id.isdecimal() and len(files) > int(id):
-            file_name = files[int(id)]["name"]
-            if not os.path.exists(file_name):
-                print_warning(f"No log named {file_name}")
-                return
-            with open(file_name, "r", encoding="utf-8") as f:
-                log = json.load(f)
-                return log
+        """Returns the log specified by the id in session_list or the session id"""
+        log_writer.flush()
+        entry = self.catalog.lookup(id)
+        if entry is None:
+            return
+        if entry["archive_segment"]:
+            return self.catalog.read_archived(entry)
+        file_name = entry["path"]
+        if not os.path.exists(file_name):
+            print_warning(f"No log named {file_name}")
+            return
+        with open(file_name, "r", encoding="utf-8") as f:
+            log = json.load(f)
+            return log
+
+    def archive(self, max_idle_seconds: float) -> int:
+        """Moves the logs of the agent not updated for max_idle_seconds into the compressed archive.
+        Returns the number of archived logs."""
+        log_writer.flush()
+        return self.catalog.archive(max_idle_seconds, self.read_session)
+
+    def sweep(self, policy: RetentionPolicy, limit: int = SWEEP_BATCH_SIZE) -> int:
+        """Deletes up to limit logs of the agent exceeding the retention policy. Returns the number of deleted logs."""
+        log_writer.flush()
+        return len(self.catalog.sweep(policy, limit=limit))
+
+    def search(self, query: str, limit: int = 20) -> List[dict]:
+        """Returns the messages of the logs of the agent matching all the terms in the query, the best match first.
+        Each hit is a dict with session_id, id, title, seq, role, snippet and score."""
+        log_writer.flush()
+        return self.catalog.search(query, limit)
+
+    def relayout(self, sharded: bool) -> int:
+        """Moves the logs of the agent into the sharded (or flat) layout. Returns the number of moved files.
+        Logs being written by other processes are not moved safely, so it should be run while the app is stopped."""
+        log_writer.flush()
+        return self.catalog.relayout(sharded)
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import threading
+from typing import TYPE_CHECKING, Optional, Type
+
+from slashgpt.utils.print import print_error
+
+if TYPE_CHECKING:
+    from slashgpt.history.storage.abstract import ChatHistoryAbstractStorage
+
+SWEEP_INTERVAL = 60 * 60
+SWEEP_BATCH_SIZE = 1000
+
+
+class RetentionPolicy:
+    """Limits on the stored sessions of an agent. The oldest sessions (by the last update) exceeding them are deleted."""
+
+    def __init__(self, max_age: Optional[float] = None, max_sessions_per_user: Optional[int] = None, max_bytes: Optional[int] = None):
+        """
+        Args:
+
+            max_age (float, optional): seconds after the last update
+            max_sessions_per_user (int, optional): number of sessions kept for each user
+            max_bytes (int, optional): total size of the sessions of the agent
+        """
+        self.max_age = max_age
+        self.max_sessions_per_user = max_sessions_per_user
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict]) -> Optional[RetentionPolicy]:
+        """Returns the policy of the "retention" property of a manifest, or None if it has no limits"""
+        if not data:
+            return None
+        max_age_days = data.get("max_age_days")
+        policy = RetentionPolicy(
+            max_age=max_age_days * 24 * 60 * 60 if max_age_days is not None else None,
+            max_sessions_per_user=data.get("max_sessions_per_user"),
+            max_bytes=data.get("max_bytes"),
+        )
+        return None if policy.is_empty() else policy
+
+    def is_empty(self):
+        return self.max_age is None and self.max_sessions_per_user is None and self.max_bytes is None
+
+    def __eq__(self, other):
+        return isinstance(other, RetentionPolicy) and vars(self) == vars(other)
+
+    def __repr__(self):
+        return f"RetentionPolicy({vars(self)})"
+
+
+class RetentionSweeper:
+    """
+    Applies a retention policy to the sessions of an agent in a background thread.
+    Each pass creates a storage of the agent (not bound to any session), and deletes at most batch_size sessions
+    (selected from the catalog, not by scanning the directory).
+    Passes are repeated until nothing is left to delete, and then every interval seconds.
+    """
+
+    __sweepers: dict = {}
+    __lock = threading.Lock()
+
+    def __init__(
+        self,
+        storage_class: Type[ChatHistoryAbstractStorage],
+        agent_name: str,
+        policy: RetentionPolicy,
+        interval: float = SWEEP_INTERVAL,
+        batch_size: int = SWEEP_BATCH_SIZE,
+    ):
+        """
+        Args:
+
+            storage_class (class): storage of the sessions (e.g. ChatHistoryFileStorage), created with (uid, agent_name)
+            agent_name (str): agent name
+            policy (RetentionPolicy): limits on the sessions
+            interval (float, optional): seconds between the passes
+            batch_size (int, optional): maximum number of sessions deleted in a pass
+        """
+        self.storage_class = storage_class
+        self.agent_name = agent_name
+        self.policy = policy
+        self.interval = interval
+        self.batch_size = batch_size
+        self.deleted = 0
+        """Number of deleted sessions (int)"""
+        self.__stopped = threading.Event()
+        self.__thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def start_for(
+        cls, storage_class: Type[ChatHistoryAbstractStorage], agent_name: str, policy: RetentionPolicy, interval: float = SWEEP_INTERVAL
+    ) -> RetentionSweeper:
+        """Starts the sweeper of the sessions of the agent in the storage, unless it is already running with the same policy"""
+        key = (storage_class, agent_name)
+        with cls.__lock:
+            sweeper = cls.__sweepers.get(key)
+            if sweeper and sweeper.policy == policy and sweeper.is_running():
+                return sweeper
+            if sweeper:
+                sweeper.stop()
+            sweeper = RetentionSweeper(storage_class, agent_name, policy, interval)
+            sweeper.start()
+            cls.__sweepers[key] = sweeper
+            return sweeper
+
+    @classmethod
+    def start_for_manifest(
+        cls, storage_class: Type[ChatHistoryAbstractStorage], agent_name: str, manifest, interval: float = SWEEP_INTERVAL
+    ) -> Optional[RetentionSweeper]:
+        """Starts the sweeper for the "retention" property of the manifest (Manifest or dict), see start_for.
+        Returns None (and stops the running sweeper, if any) if the manifest has no limits.
+        Applications serving sessions call it when they activate an agent (e.g. ChatApplication.switch_session)."""
+        policy = RetentionPolicy.from_dict(manifest.get("retention"))
+        if policy:
+            return cls.start_for(storage_class, agent_name, policy, interval)
+        with cls.__lock:
+            sweeper = cls.__sweepers.pop((storage_class, agent_name), None)
+        if sweeper:
+            sweeper.stop()
+        return None
+
+    def sweep_once(self) -> int:
+        """Runs a pass, and returns the number of deleted sessions"""
+        storage = self.storage_class("retention", self.agent_name)
+        deleted = storage.sweep(self.policy, self.batch_size)
+        self.deleted += deleted
+        return deleted
+
+    def start(self):
+        self.__thread = threading.Thread(target=self.__run, name="slashgpt-retention-sweeper", daemon=True)
+        self.__thread.start()
+
+    def __run(self):
+        while not self.__stopped.is_set():
+            try:
+                while self.sweep_once() > 0 and not self.__stopped.is_set():
+                    pass
+            except Exception as e:
+                print_error(f"RetentionSweeper: {e}")
+            self.__stopped.wait(self.interval)
+
+    def is_running(self):
+        return self.__thread is not None and not self.__stopped.is_set()
+
+    def stop(self):
+        self.__stopped.set()
+        if self.__thread is not None and self.__thread is not threading.current_thread():
+            self.__thread.join()
@@ -0,0 +1,168 @@
+import math
+import re
+import sqlite3
+from typing import Callable, List
+
+# Part of the schema of the catalog database (the FTS5 table is created by SessionSearchIndex.create)
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_messages (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    role TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS search_messages_session ON search_messages (session_id, seq);
+"""
+
+# The trigram tokenizer matches substrings, which works for languages without spaces between words (e.g. Japanese).
+# It needs SQLite 3.34 or later, and the terms shorter than three characters are not looked up in the index.
+TRIGRAM = sqlite3.sqlite_version_info >= (3, 34, 0)
+MIN_TERM_LENGTH = 3 if TRIGRAM else 1
+SNIPPET_WIDTH = 80
+# Searches rank the most recent matches only, so that they take milliseconds however many messages match
+RANKED_CANDIDATES = 1000
+
+
+def match_query(terms: List[str]) -> str:
+    """Returns the FTS5 query matching all the terms (as phrases, so that operators in them are not interpreted)"""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def snippet(content: str, terms: List[str], width: int = SNIPPET_WIDTH) -> str:
+    """Returns the part of the content around the first match of the terms, with the matches in [brackets]"""
+    pattern = re.compile("|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True)), re.IGNORECASE)
+    match = pattern.search(content)
+    start = max(0, match.start() - width // 2) if match else 0
+    text = pattern.sub(lambda m: f"[{m.group(0)}]", content[start : start + width])
+    return ("..." if start > 0 else "") + text + ("..." if start + width < len(content) else "")
+
+
+def bm25(contents: List[str], terms: List[str], frequencies: List[float], total: int, k1: float = 1.2, b: float = 0.75) -> List[float]:
+    """Returns the BM25 scores of the contents for the terms, negated like bm25() of FTS5 (the lower, the better).
+    frequencies are the numbers of the messages containing each term, among the total messages of the index."""
+    average_length = sum(map(len, contents)) / len(contents) if contents else 1
+    scores = [0.0] * len(contents)
+    for term, df in zip(terms, frequencies):
+        idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+        for j, content in enumerate(contents):
+            tf = content.lower().count(term.lower())
+            scores[j] -= idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(content) / average_length))
+    return scores
+
+
+def estimate_frequency(count: int, oldest: int, total: int, limit: int) -> float:
+    """Returns the number of the messages containing a term, from the count of its most recent matches read
+    up to limit and the rowid of the oldest of them: exact if it is less than limit, otherwise extrapolated
+    (FTS5 reads the most recent matches without reading the others, which would take time proportional to their number)"""
+    if count < limit:
+        return count
+    return min(total, count * total / (total - oldest + 1))
+
+
+class SessionSearchIndex:
+    """
+    Full-text index (SQLite FTS5) of the messages of the sessions of an agent, stored in the database of the catalog.
+    Storages update it on each write, so that searches never read the session files.
+    Preset messages (e.g. the system prompt, which is the same in every session) are not indexed.
+    """
+
+    def __init__(self, connection: Callable[[], sqlite3.Connection]):
+        """
+        Args:
+
+            connection (function): returns the connection to the catalog database for the current thread
+        """
+        self.__connection = connection
+        self.enabled = True
+        """False if this SQLite cannot create the index (without FTS5 or the trigram tokenizer): nothing is indexed or found"""
+
+    def create(self) -> bool:
+        """Creates the index if it does not exist. Returns True if it is created.
+        Raises sqlite3.OperationalError if this SQLite cannot use the index."""
+        with self.__connection() as connection:
+            if connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'search'").fetchone():
+                connection.execute("SELECT rowid FROM search LIMIT 0")
+                return False
+            tokenize = "trigram" if TRIGRAM else "unicode61 remove_diacritics 2"
+            connection.execute(f"CREATE VIRTUAL TABLE search USING fts5(content, tokenize = '{tokenize}')")
+            return True
+
+    def index(self, session_id: str, start: int, messages: List[dict]):
+        """Indexes the messages at start, start + 1, ... of the session (replacing those indexed at the positions)"""
+        if not self.enabled:
+            return
+        with self.__connection() as connection:
+            self.__delete(connection, "session_id = ? AND seq >= ? AND seq < ?", (session_id, start, start + len(messages)))
+            for seq, message in enumerate(messages, start):
+                content = message.get("content")
+                if message.get("preset") or not isinstance(content, str) or not content:
+                    continue
+                cursor = connection.execute(
+                    "INSERT INTO search_messages (session_id, seq, role) VALUES (?, ?, ?)",
+                    (session_id, seq, message.get("role")),
+                )
+                connection.execute("INSERT INTO search (rowid, content) VALUES (?, ?)", (cursor.lastrowid, content))
+
+    def truncate(self, session_id: str, length: int):
+        """Removes the messages of the session at length and after"""
+        if not self.enabled:
+            return
+        with self.__connection() as connection:
+            self.__delete(connection, "session_id = ? AND seq >= ?", (session_id, length))
+
+    def __delete(self, connection: sqlite3.Connection, condition: str, parameters: tuple):
+        connection.execute(f"DELETE FROM search WHERE rowid IN (SELECT id FROM search_messages WHERE {condition})", parameters)
+        connection.execute(f"DELETE FROM search_messages WHERE {condition}", parameters)
+
+    def __frequency(self, connection: sqlite3.Connection, term: str, total: int) -> float:
+        (count, oldest) = connection.execute(
+            "SELECT count(*), min(rowid) FROM (SELECT rowid FROM search WHERE search MATCH ? ORDER BY rowid DESC LIMIT ?)",
+            (match_query([term]), RANKED_CANDIDATES),
+        ).fetchone()
+        return estimate_frequency(count, oldest, total, RANKED_CANDIDATES)
+
+    def search(self, query: str, limit: int = 20) -> List[dict]:
+        """Returns the messages matching all the terms (separated by spaces) in the query, the best match first
+        among the most recent RANKED_CANDIDATES matches.
+        Each hit is a dict with session_id, seq, role, snippet (the matched terms are in [brackets])
+        and score (BM25 of the terms long enough for the index, negated like bm25() of FTS5: the lower, the better)."""
+        terms = query.split()
+        if not terms or not self.enabled:
+            return []
+        indexed = [term for term in terms if len(term) >= MIN_TERM_LENGTH]
+        conditions = []
+        parameters: list = []
+        if indexed:
+            conditions.append("search MATCH ?")
+            parameters.append(match_query(indexed))
+        for term in terms:
+            if len(term) < MIN_TERM_LENGTH:
+                # Scans the matches of the other terms (or all messages, if there are none)
+                conditions.append("search.content LIKE ? ESCAPE '\\'")
+                parameters.append("%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+        connection = self.__connection()
+        # FTS5 reads its matches in the order of rowid without sorting, so only the most recent matches are read.
+        # (bm25() of FTS5 would read all the matches of the terms for their document frequencies.)
+        candidates = max(limit, RANKED_CANDIDATES)
+        rows = connection.execute(
+            f"""SELECT search.rowid, m.session_id, m.seq, m.role, search.content FROM search JOIN search_messages m ON m.id = search.rowid
+            WHERE {" AND ".join(conditions)} ORDER BY search.rowid DESC LIMIT ?""",
+            (*parameters, candidates),
+        ).fetchall()
+        if rows and indexed:
+            # Rowids grow with the messages, and the frequencies are estimated in the same unit
+            (total,) = connection.execute("SELECT max(rowid) FROM search").fetchone()
+            if len(conditions) == 1 and len(indexed) == 1:
+                # The candidates are the most recent matches of the term
+                frequencies = [estimate_frequency(len(rows), rows[-1][0], total, candidates)]
+            else:
+                frequencies = [self.__frequency(connection, term, total) for term in indexed]
+            scores = bm25([row[4] for row in rows], indexed, frequencies, total)
+        else:
+            scores = [0.0] * len(rows)
+        # sorted() is stable, so the recent ones come first among the equal scores
+        ranked = sorted(zip(rows, scores), key=lambda hit: hit[1])[:limit]
+        return [
+            {"session_id": session_id, "seq": seq, "role": role, "snippet": snippet(content, terms), "score": score}
+            for ((_, session_id, seq, role, content), score) in ranked
+        ]
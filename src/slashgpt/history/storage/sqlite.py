@@ -0,0 +1,198 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import List, Optional
+
+from slashgpt.history.storage.abstract import ChatHistoryAbstractStorage
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL UNIQUE,
+    uid TEXT NOT NULL,
+    agent_name TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_uid ON sessions (uid, agent_name, created_at, id);
+CREATE TABLE IF NOT EXISTS messages (
+    uid TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (uid, session_id, seq)
+) WITHOUT ROWID;
+"""
+
+_connections = threading.local()
+
+
+def get_connection(db_path: str, schema: str = SCHEMA) -> sqlite3.Connection:
+    """Returns the connection to the database for the current thread (connections cannot be shared across threads).
+    The schema is created when the database is opened for the first time in the thread."""
+    db_path = os.path.abspath(db_path)
+    connections = _connections.__dict__.setdefault("connections", {})
+    connection = connections.get(db_path)
+    if connection is None:
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Wait for the lock held by other processes instead of failing with "database is locked".
+        # Statements are prepared once per connection and reused by the statement cache of sqlite3.
+        connection = sqlite3.connect(db_path, timeout=30)
+        # WAL lets readers run concurrently with a writer
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        with connection:
+            connection.executescript(schema)
+        connections[db_path] = connection
+    return connection
+
+
+class ChatHistorySQLiteStorage(ChatHistoryAbstractStorage):
+    """
+    Stores sessions in a SQLite database (filememory/history.sqlite3 by default),
+    which can be shared by many processes (e.g. server workers).
+    Messages are cached in memory, and each change is written through in its own transaction.
+    The seq of an appended message is assigned in the transaction, so processes appending to the same session do not collide.
+    """
+
+    def __init__(self, uid: str, agent_name: str, session_id: str = "", db_path: str = "filememory/history.sqlite3"):
+        self.__messages: List[dict] = []
+        self.__seqs: List[int] = []  # seq of each message in the database
+        self.uid = uid
+        self.agent_name = agent_name
+        self.db_path = db_path
+        self.__has_session = False
+        if session_id == "":
+            self.session_id = str(uuid.uuid4())
+        else:
+            self.session_id = session_id
+            self.__load_session()
+
+    def __connection(self):
+        return get_connection(self.db_path)
+
+    def __load_session(self):
+        connection = self.__connection()
+        self.__has_session = connection.execute("SELECT 1 FROM sessions WHERE session_id = ?", (self.session_id,)).fetchone() is not None
+        rows = self.__query_messages(self.session_id)
+        self.__seqs = [seq for (seq, _) in rows]
+        self.__messages = [json.loads(data) for (_, data) in rows]
+
+    def __query_messages(self, session_id: str):
+        connection = self.__connection()
+        return connection.execute(
+            "SELECT seq, data FROM messages WHERE uid = ? AND session_id = ? ORDER BY seq",
+            (self.uid, session_id),
+        ).fetchall()
+
+    def __touch(self, connection: sqlite3.Connection):
+        now = time.time()
+        if self.__has_session:
+            connection.execute("UPDATE sessions SET updated_at = ? WHERE session_id = ?", (now, self.session_id))
+        else:
+            connection.execute(
+                "INSERT OR IGNORE INTO sessions (session_id, uid, agent_name, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (self.session_id, self.uid, self.agent_name, now, now),
+            )
+            self.__has_session = True
+
+    def append(self, data: dict):
+        with self.__connection() as connection:
+            # __touch writes first, so the transaction holds the write lock while the next seq is read
+            self.__touch(connection)
+            (seq,) = connection.execute(
+                "SELECT COALESCE(MAX(seq), -1) + 1 FROM messages WHERE uid = ? AND session_id = ?",
+                (self.uid, self.session_id),
+            ).fetchone()
+            connection.execute(
+                "INSERT INTO messages (uid, session_id, seq, data) VALUES (?, ?, ?, ?)",
+                (self.uid, self.session_id, seq, json.dumps(data, ensure_ascii=False)),
+            )
+        self.__messages.append(data)
+        self.__seqs.append(seq)
+
+    def get(self, index: int):
+        return self.__messages[index]
+
+    def get_data(self, index: int, name: str):
+        m = self.__messages[index]
+        if m:
+            return m.get(name)
+
+    def set(self, index: int, data: dict):
+        if self.__messages[index]:
+            if index < 0:
+                index += len(self.__messages)
+            with self.__connection() as connection:
+                self.__touch(connection)
+                connection.execute(
+                    "UPDATE messages SET data = ? WHERE uid = ? AND session_id = ? AND seq = ?",
+                    (json.dumps(data, ensure_ascii=False), self.uid, self.session_id, self.__seqs[index]),
+                )
+            self.__messages[index] = data
+
+    def len(self):
+        return len(self.__messages)
+
+    def last(self):
+        if self.len() > 0:
+            return self.__messages[self.len() - 1]
+
+    def pop(self):
+        if self.len() > 0:
+            with self.__connection() as connection:
+                self.__touch(connection)
+                connection.execute(
+                    "DELETE FROM messages WHERE uid = ? AND session_id = ? AND seq = ?",
+                    (self.uid, self.session_id, self.__seqs.pop()),
+                )
+            return self.__messages.pop()
+
+    def messages(self):
+        return self.__messages
+
+    def preset_messages(self):
+        return filter(lambda x: x.get("preset"), self.__messages)
+
+    def nonpreset_messages(self):
+        return filter(lambda x: not x.get("preset"), self.__messages)
+
+    def restore(self, data: List[dict]):
+        # Replace all the messages of the session in one transaction
+        with self.__connection() as connection:
+            self.__touch(connection)
+            connection.execute("DELETE FROM messages WHERE uid = ? AND session_id = ?", (self.uid, self.session_id))
+            connection.executemany(
+                "INSERT INTO messages (uid, session_id, seq, data) VALUES (?, ?, ?, ?)",
+                [(self.uid, self.session_id, seq, json.dumps(message, ensure_ascii=False)) for seq, message in enumerate(data)],
+            )
+        self.__messages = data
+        self.__seqs = list(range(len(data)))
+
+    def session_list(self, offset: int = 0, limit: Optional[int] = None):
+        """Returns the sessions of the agent in the order of creation"""
+        rows = self.__connection().execute(
+            "SELECT id, session_id FROM sessions WHERE uid = ? AND agent_name = ? ORDER BY created_at, id LIMIT ? OFFSET ?",
+            (self.uid, self.agent_name, -1 if limit is None else limit, offset),
+        )
+        return [{"name": session_id, "id": id} for (id, session_id) in rows]
+
+    def get_session_data(self, id: str):
+        """Returns the session specified by the id in session_list or the session id"""
+        if id.isdecimal():
+            connection = self.__connection()
+            row = connection.execute(
+                "SELECT session_id FROM sessions WHERE id = ? AND uid = ? AND agent_name = ?",
+                (int(id), self.uid, self.agent_name),
+            ).fetchone()
+            if row is None:
+                return None
+            id = row[0]
+        rows = self.__query_messages(id)
+        if rows:
+            return {"messages": [json.loads(data) for (_, data) in rows]}
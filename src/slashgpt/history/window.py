@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+from abc import ABCMeta, abstractmethod
+from typing import TYPE_CHECKING, Dict, List, Sequence, Type
+
+from slashgpt.manifest import Manifest
+from slashgpt.utils.print import print_debug
+
+if TYPE_CHECKING:
+    from slashgpt.chat_history import ChatHistory
+    from slashgpt.llms.model import LlmModel
+
+SUMMARY_PROMPT = (
+    "Summarize the conversation below in a few sentences, keeping names, numbers and decisions. Start from the previous summary if there is one."
+)
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+
+class HistoryWindow(metaclass=ABCMeta):
+    """
+    History windowing policy, which decides which messages of the history are sent to the LLM.
+    Use the factory classmethod to create the policy specified by the history_type of the manifest.
+    """
+
+    def __init__(self, manifest: Manifest):
+        self.manifest = manifest
+
+    @classmethod
+    def factory(cls, manifest: Manifest):
+        """Create the policy specified by the history_type property of the manifest"""
+        history_type = manifest.history_type()
+        window_class = history_windows.get(history_type)
+        if window_class is None:
+            raise ValueError(f"Invalid history_type: {history_type}")
+        return window_class(manifest)
+
+    @abstractmethod
+    def messages(self, history: ChatHistory, llm_model: LlmModel, verbose: bool = False) -> Sequence[dict]:
+        """Returns the messages to send to the LLM (read-only)"""
+
+    async def amessages(self, history: ChatHistory, llm_model: LlmModel, verbose: bool = False) -> Sequence[dict]:
+        """Asynchronous version of messages"""
+        return self.messages(history, llm_model, verbose)
+
+    def _max_tokens(self, llm_model: LlmModel):
+        # Leave a quarter of the context for the response by default
+        return self.manifest.get("history_max_tokens") or llm_model.max_token() * 3 // 4
+
+    @classmethod
+    def _is_preset(cls, history: ChatHistory, index: int):
+        return index == 0 and history.get_message_prop(0, "role") == "system" or bool(history.get_message_prop(index, "preset"))
+
+    @classmethod
+    def _window(cls, history: ChatHistory, max_tokens: int):
+        """Returns (presets, start), where presets are the indices of preset messages, and messages
+        after start (the non-preset ones) fit in max_tokens along with the presets. The last message is always kept."""
+        length = history.len_messages()
+        presets = [index for index in range(length) if cls._is_preset(history, index)]
+        preset_set = set(presets)
+        used = sum(history.message_tokens(index) for index in presets)
+        start = length
+        for index in range(length - 1, -1, -1):
+            if index in preset_set:
+                continue
+            used += history.message_tokens(index)
+            if used > max_tokens and start < length:
+                break
+            start = index
+        return (presets, start)
+
+
+class HistoryWindowAll(HistoryWindow):
+    """Sends all the messages (default)"""
+
+    def messages(self, history: ChatHistory, llm_model: LlmModel, verbose: bool = False) -> Sequence[dict]:
+        return history.messages_view()
+
+
+class HistoryWindowTurns(HistoryWindow):
+    """Sends the preset messages and the last N turns (a turn starts with a user message)"""
+
+    def messages(self, history: ChatHistory, llm_model: LlmModel, verbose: bool = False) -> Sequence[dict]:
+        turns = self.manifest.get("history_turns") or 10
+        length = history.len_messages()
+        start = length
+        for index in range(length - 1, -1, -1):
+            if turns == 0:
+                break
+            if history.get_message_prop(index, "role") == "user" and not self._is_preset(history, index):
+                turns -= 1
+            start = index
+        views = history.messages_view()
+        return [views[index] for index in range(length) if index >= start or self._is_preset(history, index)]
+
+
+class HistoryWindowTokens(HistoryWindow):
+    """Sends the preset messages, and as many recent messages as the token budget allows (dropping the oldest)"""
+
+    def messages(self, history: ChatHistory, llm_model: LlmModel, verbose: bool = False) -> Sequence[dict]:
+        (presets, start) = self._window(history, self._max_tokens(llm_model))
+        views = history.messages_view()
+        messages = [views[index] for index in presets if index < start]
+        if verbose and start > len(messages):
+            print_debug(f"history: dropped {start - len(messages)} messages")
+        return messages + list(views[start:])
+
+
+class HistoryWindowSummary(HistoryWindow):
+    """Same as HistoryWindowTokens, but the dropped messages are replaced with a rolling summary,
+    which is updated only when more messages drop out of the window"""
+
+    def __init__(self, manifest: Manifest):
+        super().__init__(manifest)
+        self.summary: str = ""
+        """Summary of the messages dropped so far (str)"""
+        self.summarized_until: int = 0
+        """Messages before this index are in the summary (int)"""
+
+    def __prepare(self, history: ChatHistory, llm_model: LlmModel):
+        if self.summarized_until > history.len_messages():
+            # The history has been popped or restored
+            self.summary = ""
+            self.summarized_until = 0
+        # Reserve a fixed part of the budget for the summary, so that a new summary does not move the window
+        max_tokens = self._max_tokens(llm_model)
+        (presets, start) = self._window(history, max_tokens - max_tokens // 8)
+        preset_set = set(presets)
+        dropped = [index for index in range(self.summarized_until, start) if index not in preset_set]
+        return (presets, start, dropped)
+
+    def __summary_messages(self, history: ChatHistory, dropped: List[int]):
+        conversation = "\n".join(f"{history.get_message_prop(index, 'role')}: {history.get_message_prop(index, 'content')}" for index in dropped)
+        if self.summary:
+            conversation = f"Previous summary: {self.summary}\n{conversation}"
+        return [{"role": "system", "content": SUMMARY_PROMPT}, {"role": "user", "content": conversation}]
+
+    def __update(self, res: str, start: int, dropped: List[int], verbose: bool):
+        if res:
+            self.summary = res
+            self.summarized_until = start
+            if verbose:
+                print_debug(f"history: summarized {len(dropped)} messages")
+
+    def __messages(self, history: ChatHistory, presets: List[int], start: int):
+        views = history.messages_view()
+        messages = [views[index] for index in presets if index < start]
+        if self.summary:
+            messages.append({"role": "system", "content": SUMMARY_PREFIX + self.summary})
+        return messages + list(views[start:])
+
+    def messages(self, history: ChatHistory, llm_model: LlmModel, verbose: bool = False) -> Sequence[dict]:
+        (presets, start, dropped) = self.__prepare(history, llm_model)
+        if dropped:
+            (_, res, _, _) = llm_model.generate_response(self.__summary_messages(history, dropped), Manifest({"temperature": 0}), verbose)
+            self.__update(res, start, dropped, verbose)
+        return self.__messages(history, presets, start)
+
+    async def amessages(self, history: ChatHistory, llm_model: LlmModel, verbose: bool = False) -> Sequence[dict]:
+        (presets, start, dropped) = self.__prepare(history, llm_model)
+        if dropped:
+            (_, res, _, _) = await llm_model.agenerate_response(self.__summary_messages(history, dropped), Manifest({"temperature": 0}), verbose)
+            self.__update(res, start, dropped, verbose)
+        return self.__messages(history, presets, start)
+
+
+history_windows: Dict[str, Type[HistoryWindow]] = {
+    "all": HistoryWindowAll,
+    "turns": HistoryWindowTurns,
+    "tokens": HistoryWindowTokens,
+    "summary": HistoryWindowSummary,
+}
+"""Available history windowing policies. Add a subclass of HistoryWindow to extend it."""
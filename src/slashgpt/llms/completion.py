@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import json
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
+
+from slashgpt.utils.print import print_warning
+
+if TYPE_CHECKING:
+    from slashgpt.function.function_call import FunctionCall
+    from slashgpt.manifest import Manifest
+
+Candidate = Tuple[str, Optional[str], Optional["FunctionCall"]]
+"""One of the completions returned by an engine (role, res, function_call)"""
+
+
+def _function_call_fields(function_call: FunctionCall):
+    data = function_call.data()
+    if isinstance(data, dict):
+        return (data.get("name"), data.get("arguments"))
+    # The function_call object of OpenAI's response
+    return (getattr(data, "name", None), getattr(data, "arguments", None))
+
+
+def is_valid_function_call(function_call: Optional[FunctionCall], manifest: Manifest):
+    """Returns True if the function call names one of the functions of the manifest and its arguments are json"""
+    if function_call is None:
+        return False
+    (name, arguments) = _function_call_fields(function_call)
+    names = [function.get("name") for function in manifest.functions() or []]
+    if name not in names and not manifest.get("notebook"):
+        return False
+    if isinstance(arguments, str):
+        try:
+            json.loads(arguments)
+        except ValueError:
+            return False
+    return True
+
+
+def score_first(candidate: Candidate, manifest: Manifest):
+    return 0
+
+
+def score_function_call(candidate: Candidate, manifest: Manifest):
+    return 1 if is_valid_function_call(candidate[2], manifest) else 0
+
+
+def score_longest(candidate: Candidate, manifest: Manifest):
+    return len(candidate[1] or "")
+
+
+completion_scorers: dict[str, Callable[[Candidate, Manifest], float]] = {
+    "first": score_first,
+    "function_call": score_function_call,
+    "longest": score_longest,
+}
+"""Scorers selectable with the completion_strategy property of the manifest.
+Register a function which takes (candidate, manifest) and returns a number to add a strategy."""
+
+
+def select_completion(candidates: List[Candidate], manifest: Manifest) -> Candidate:
+    """Returns the candidate with the highest score (the earliest one wins a tie)"""
+    if not candidates:
+        return ("assistant", None, None)
+    strategy = manifest.completion_strategy()
+    scorer = completion_scorers.get(strategy)
+    if scorer is None:
+        print_warning(f"Invalid completion_strategy: {strategy}")
+        scorer = score_first
+    best = candidates[0]
+    best_score = scorer(best, manifest)
+    for candidate in candidates[1:]:
+        score = scorer(candidate, manifest)
+        if score > best_score:
+            (best, best_score) = (candidate, score)
+    return best
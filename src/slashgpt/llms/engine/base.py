@@ -1,11 +1,12 @@
 from __future__ import annotations
 
+import asyncio
 from abc import ABCMeta, abstractmethod
-from typing import TYPE_CHECKING, List, Optional
-
-import tiktoken  # for counting tokens
+from typing import TYPE_CHECKING, Callable, List, Optional
 
 from slashgpt.function.function_call import FunctionCall
+from slashgpt.llms import tokenizer
+from slashgpt.llms.completion import select_completion
 from slashgpt.utils.print import print_warning
 
 if TYPE_CHECKING:
@@ -20,6 +21,92 @@ class LLMEngineBase(metaclass=ABCMeta):
     def chat_completion(self, messages: List[dict], manifest: Manifest, verbose: bool):
         pass
 
+    def chat_completions(self, messages: List[dict], manifest: Manifest, verbose: bool):
+        """
+        Returns all the completions (manifest.num_completions()) as ([(role, res, function_call)], token_usage).
+        Engines which return a single completion return a list of one.
+        """
+        (role, res, function_call, token_usage) = self.chat_completion(messages, manifest, verbose)
+        return ([(role, res, function_call)], token_usage)
+
+    async def achat_completions(self, messages: List[dict], manifest: Manifest, verbose: bool):
+        """Asynchronous version of chat_completions"""
+        (role, res, function_call, token_usage) = await self.achat_completion(messages, manifest, verbose)
+        return ([(role, res, function_call)], token_usage)
+
+    def _select_completion(self, candidates: List[tuple], token_usage: Optional[int], manifest: Manifest):
+        """Chooses one of the candidates with the completion_strategy of the manifest,
+        and returns it as (role, res, function_call, token_usage)"""
+        (role, res, function_call) = select_completion(candidates, manifest)
+        return (role, res, function_call, token_usage)
+
+    def chat_completion_stream(self, messages: List[dict], manifest: Manifest, verbose: bool):
+        """
+        Streaming version of chat_completion. It yields text deltas as they arrive,
+        and returns (role, res, function_call, token_usage) when the stream is exhausted.
+        Engines which are not able to stream yield the whole response at once.
+        """
+        (role, res, function_call, token_usage) = self.chat_completion(messages, manifest, verbose)
+        if res:
+            yield res
+        return (role, res, function_call, token_usage)
+
+    def consume_stream(self, messages: List[dict], manifest: Manifest, verbose: bool, on_token: Optional[Callable[[str], None]] = None):
+        """Runs chat_completion_stream to the end, calling on_token (if any) with each text delta,
+        and returns (role, res, function_call, token_usage)"""
+        stream = self.chat_completion_stream(messages, manifest, verbose)
+        while True:
+            try:
+                token = next(stream)
+            except StopIteration as e:
+                return e.value
+            if on_token:
+                on_token(token)
+
+    async def achat_completion(self, messages: List[dict], manifest: Manifest, verbose: bool):
+        """
+        Asynchronous version of chat_completion, which returns the same tuple.
+        Engines without a native async client run chat_completion in a worker thread.
+        """
+        return await asyncio.to_thread(self.chat_completion, messages, manifest, verbose)
+
+    async def _get_async_client(self, factory):
+        """
+        Returns the async client bound to the running event loop, creating it with factory() if necessary.
+        Async clients hold connections tied to the loop they were first used on, so we keep one per loop,
+        and close it when the loop shuts down its async generators (asyncio.run does it before closing the loop).
+        """
+        loop = asyncio.get_running_loop()
+        clients = self.__dict__.setdefault("_async_clients", {})
+        entry = clients.get(loop)
+        if entry is None:
+            client = factory()
+            closer = self.__close_with_loop(clients, loop, client)
+            entry = clients[loop] = (client, closer)
+            await closer.__anext__()
+        return entry[0]
+
+    async def __close_with_loop(self, clients: dict, loop, client):
+        try:
+            yield
+        finally:
+            clients.pop(loop, None)
+            close = getattr(client, "aclose", None) or client.close
+            await close()
+
+    async def _get_openai_async_client(self):
+        """Returns the AsyncOpenAI client (with the API key and base of the model) bound to the running event loop"""
+        return await self._get_async_client(self.__create_openai_async_client)
+
+    def __create_openai_async_client(self):
+        from openai import AsyncOpenAI
+
+        client = AsyncOpenAI(api_key=self.llm_model.get_api_key_value())
+        api_base = self.llm_model.get_api_base()
+        if api_base:
+            client.base_url = api_base
+        return client
+
     """
     Extract the Python code from the string if the agent is a code interpreter.
     Returns it in the "function call" format.
@@ -84,11 +171,30 @@ class LLMEngineBase(metaclass=ABCMeta):
     """
 
     def is_within_budget(self, text: str, verbose: bool = False):
+        return self.is_within_token_budget(self.num_tokens(text))
+
+    def is_within_token_budget(self, num_tokens: int):
         token_budget = self.llm_model.max_token() - 500
-        return self.__num_tokens(text) <= token_budget
+        return num_tokens <= token_budget
 
-    def __num_tokens(self, text: str):
+    def num_tokens(self, text: str):
         """Calculate the llm token of the text. Because this is for openai, override it if you use another language model."""
-        model_name = self.llm_model.name() if self.llm_model.name().startswith("gpt-") else "gpt-3.5-turbo-0613"
-        encoding = tiktoken.encoding_for_model(model_name)
-        return len(encoding.encode(text))
+        return tokenizer.num_tokens(text, self.llm_model.name() or "")
+
+    def _num_prompt_tokens(self, messages: List[dict], manifest: Manifest):
+        """
+        Estimate the number of tokens of prompt_from_messages from memoized per-message counts,
+        so that the cost grows with the new text only. Counting each part separately gives
+        a close (and in practice slightly high) estimate of the joined prompt.
+        """
+        count = 0
+        for message in messages:
+            content = message["content"]
+            if content:
+                count += self.num_tokens(message["role"]) + self.num_tokens(content) + 2  # ":" and "\n"
+        functions = manifest.functions()
+        if functions:
+            count += self.num_tokens(
+                f"system: Here is the definition of functions available to you to call.\n{functions}\nYou need to generate a json file with 'name' for function name and 'arguments' for argument."
+            )
+        return count + self.num_tokens("assistant:") + 1
@@ -3,9 +3,8 @@ from __future__ import annotations
 import json
 from typing import TYPE_CHECKING, List
 
-import requests
-
 from slashgpt.llms.engine.base import LLMEngineBase
+from slashgpt.llms.http_transport import HttpTransport
 from slashgpt.utils.print import print_debug, print_error
 
 if TYPE_CHECKING:
@@ -19,9 +18,10 @@ class LLMEngineHosted(LLMEngineBase):
         self.api_key = self.llm_model.get_api_key_value()
         self.header_key = self.llm_model.llm_model_data.get("header_api_key")
         self.url = self.llm_model.llm_model_data.get("url")
+        self.transport = HttpTransport(llm_model)
         return
 
-    def chat_completion(self, messages: List[dict], manifest: Manifest, verbose: bool):
+    def __request(self, messages: List[dict], manifest: Manifest, verbose: bool):
         # temperature = manifest.temperature()
         prompt = self.prompt_from_messages(messages, manifest)
 
@@ -31,15 +31,28 @@ class LLMEngineHosted(LLMEngineBase):
         # print("calling *** local", self.url)
         arguments = {"inputs": [{"name": "input-0", "data": [prompt], "datatype": "BYTES", "shape": [-1]}]}
         headers = {"Content-Type": "application/json", self.header_key: self.api_key}
-        response = requests.post(self.url, headers=headers, json=arguments)
+        return (headers, arguments)
+
+    def chat_completion(self, messages: List[dict], manifest: Manifest, verbose: bool):
+        (headers, arguments) = self.__request(messages, manifest, verbose)
+        (status_code, text) = self.transport.post(self.url, headers, arguments)
+        return self.__process_response(status_code, text, messages, manifest, verbose)
+
+    async def achat_completion(self, messages: List[dict], manifest: Manifest, verbose: bool):
+        (headers, arguments) = self.__request(messages, manifest, verbose)
+        client = await self._get_async_client(self.transport.create_async_client)
+        (status_code, text) = await self.transport.apost(client, self.url, headers, arguments)
+        return self.__process_response(status_code, text, messages, manifest, verbose)
+
+    def __process_response(self, status_code: int, text: str, messages: List[dict], manifest: Manifest, verbose: bool):
         if verbose:
-            print("***response.status_code", response.status_code)
-            print("***response.text", response.text)
+            print("***response.status_code", status_code)
+            print("***response.text", text)
 
         output = []
-        if response.status_code < 300:
+        if status_code < 300:
             # print("*** success")
-            json_data = json.loads(response.text)
+            json_data = json.loads(text)
             # print(json.dumps(json_data, indent=2))
             outputs = json_data.get("outputs")
             if outputs and isinstance(outputs, list):
@@ -58,7 +71,7 @@ class LLMEngineHosted(LLMEngineBase):
                     print(datatype, data[0])
                     output = [str(data)]
         else:
-            print_error(f"Error:{response.status_code}\n{response.text}")
+            print_error(f"Error:{status_code}\n{text}")
 
         if isinstance(output, list):
             if isinstance(output[0], list):
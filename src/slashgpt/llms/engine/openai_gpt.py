@@ -1,9 +1,8 @@
 from __future__ import annotations
 
 import sys
-from typing import TYPE_CHECKING, List
+from typing import TYPE_CHECKING, List, Optional
 
-import tiktoken  # for counting tokens
 from openai import OpenAI
 
 from slashgpt.function.function_call import FunctionCall
@@ -31,11 +30,10 @@ class LLMEngineOpenAIGPT(LLMEngineBase):
 
         return
 
-    def chat_completion(self, messages: List[dict], manifest: Manifest, verbose: bool):
+    def __params(self, messages: List[dict], manifest: Manifest, stream: bool):
         model_name = self.llm_model.name()
         temperature = manifest.temperature()
         functions = manifest.functions()
-        stream = manifest.stream()
         num_completions = manifest.num_completions()
         # LATER: logprobs is invalid with ChatCompletion API
         # logprobs = manifest.logprobs()
@@ -44,30 +42,85 @@ class LLMEngineOpenAIGPT(LLMEngineBase):
             params["functions"] = functions
             if manifest.get("function_call"):
                 params["function_call"] = dict(name=manifest.get("function_call"))
-        response = self.client.chat.completions.create(**params)
+        return params
+
+    def chat_completion(self, messages: List[dict], manifest: Manifest, verbose: bool):
+        if manifest.stream():
+            # Drain the stream for callers which do not consume tokens
+            return self.consume_stream(messages, manifest, verbose)
+
+        (candidates, token_usage) = self.chat_completions(messages, manifest, verbose)
+        return self._select_completion(candidates, token_usage, manifest)
+
+    async def achat_completion(self, messages: List[dict], manifest: Manifest, verbose: bool):
+        (candidates, token_usage) = await self.achat_completions(messages, manifest, verbose)
+        return self._select_completion(candidates, token_usage, manifest)
+
+    def chat_completions(self, messages: List[dict], manifest: Manifest, verbose: bool):
+        response = self.client.chat.completions.create(**self.__params(messages, manifest, False))
+        return self.__process_response(response, messages, manifest, verbose)
+
+    async def achat_completions(self, messages: List[dict], manifest: Manifest, verbose: bool):
+        client = await self._get_openai_async_client()
+        response = await client.chat.completions.create(**self.__params(messages, manifest, False))
+        return self.__process_response(response, messages, manifest, verbose)
+
+    def __process_response(self, response, messages: List[dict], manifest: Manifest, verbose: bool):
+        functions = manifest.functions()
         token_usage = response.usage.total_tokens
 
         if verbose:
             print_debug(f"model={dict(response)['model']}")
             print_debug(f"usage={dict(response)['usage']}")
-        answer = response.choices[0].message
-        res = answer.content
-        role = answer.role
 
-        function_call = None
-        if functions is not None and answer.function_call is not None:
-            function_call = FunctionCall(answer.function_call, manifest)
+        candidates = []
+        for choice in sorted(response.choices, key=lambda choice: choice.index):
+            answer = choice.message
+            res = answer.content
+            role = answer.role
 
-            if res and function_call is None:
-                function_call = self._extract_function_call(messages[-1], manifest, res, True)
+            function_call = None
+            if functions is not None and answer.function_call is not None:
+                function_call = FunctionCall(answer.function_call, manifest)
 
-        return (role, res, function_call, token_usage)
+                if res and function_call is None:
+                    function_call = self._extract_function_call(messages[-1], manifest, res, True)
+            candidates.append((role, res, function_call))
 
-    def __num_tokens(self, text: str):
-        model_name = self.llm_model.name()
-        encoding = tiktoken.encoding_for_model(model_name)
-        return len(encoding.encode(text))
+        return (candidates, token_usage)
+
+    def chat_completion_stream(self, messages: List[dict], manifest: Manifest, verbose: bool):
+        functions = manifest.functions()
+        response = self.client.chat.completions.create(**self.__params(messages, manifest, True))
+
+        role = "assistant"
+        contents: List[str] = []
+        function_call_data: Optional[dict] = None
+        for chunk in response:
+            # With num_completions > 1, deltas of other choices are interleaved. We only stream the first one.
+            choice = next((choice for choice in chunk.choices if choice.index == 0), None)
+            if choice is None:
+                continue
+            delta = choice.delta
+            if delta.role:
+                role = delta.role
+            if delta.content:
+                contents.append(delta.content)
+                yield delta.content
+            if delta.function_call:
+                # The name and arguments of the function call arrive in fragments as well
+                if function_call_data is None:
+                    function_call_data = {"name": "", "arguments": ""}
+                function_call_data["name"] += delta.function_call.name or ""
+                function_call_data["arguments"] += delta.function_call.arguments or ""
+
+        if verbose:
+            print_debug(f"model={self.llm_model.name()} (stream)")
+        res = "".join(contents) or None
+
+        function_call = None
+        if functions is not None and function_call_data is not None:
+            function_call = FunctionCall(function_call_data, manifest)
 
-    def is_within_budget(self, text: str, verbose: bool = False):
-        token_budget = self.llm_model.max_token() - 500
-        return self.__num_tokens(text) <= token_budget
+        # NOTE: The streaming API does not report the token usage
+        return (role, res, function_call, None)
@@ -4,7 +4,6 @@ import json
 import sys
 from typing import TYPE_CHECKING, List
 
-import tiktoken  # for counting tokens
 from openai import OpenAI
 
 from slashgpt.llms.engine.base import LLMEngineBase
@@ -31,7 +30,7 @@ class LLMEngineOpenAILegacy(LLMEngineBase):
 
         return
 
-    def chat_completion(self, messages: List[dict], manifest: Manifest, verbose: bool):
+    def __params(self, messages: List[dict], manifest: Manifest, verbose: bool):
         prompt = self.prompt_from_messages(messages, manifest)
         params = dict(
             model=self.llm_model.name(),
@@ -40,28 +39,39 @@ class LLMEngineOpenAILegacy(LLMEngineBase):
             stream=manifest.stream(),
             n=manifest.num_completions(),
             logprobs=manifest.logprobs(),
-            max_tokens=self.llm_model.max_token() - self.__num_tokens(prompt),
+            max_tokens=self.llm_model.max_token() - self._num_prompt_tokens(messages, manifest),
         )
 
         if verbose:
             print_debug(f"params={json.dumps(params, indent=2)}")
-        response = self.client.completions.create(**params)
+        return params
 
-        if verbose:
-            print_debug(f"response={response}")
+    def chat_completion(self, messages: List[dict], manifest: Manifest, verbose: bool):
+        (candidates, token_usage) = self.chat_completions(messages, manifest, verbose)
+        return self._select_completion(candidates, token_usage, manifest)
 
-        res = response.choices[0].text
-        function_call = self._extract_function_call(messages[-1], manifest, res) if manifest.functions() is not None else None
+    async def achat_completion(self, messages: List[dict], manifest: Manifest, verbose: bool):
+        (candidates, token_usage) = await self.achat_completions(messages, manifest, verbose)
+        return self._select_completion(candidates, token_usage, manifest)
 
-        role = "assistant"
+    def chat_completions(self, messages: List[dict], manifest: Manifest, verbose: bool):
+        response = self.client.completions.create(**self.__params(messages, manifest, verbose))
+        return self.__process_response(response, messages, manifest, verbose)
 
-        return (role, res, function_call, None)
+    async def achat_completions(self, messages: List[dict], manifest: Manifest, verbose: bool):
+        client = await self._get_openai_async_client()
+        response = await client.completions.create(**self.__params(messages, manifest, verbose))
+        return self.__process_response(response, messages, manifest, verbose)
 
-    def __num_tokens(self, text: str):
-        model_name = self.llm_model.name()
-        encoding = tiktoken.encoding_for_model(model_name)
-        return len(encoding.encode(text))
+    def __process_response(self, response, messages: List[dict], manifest: Manifest, verbose: bool):
+        if verbose:
+            print_debug(f"response={response}")
+
+        role = "assistant"
+        candidates = []
+        for choice in sorted(response.choices, key=lambda choice: choice.index):
+            res = choice.text
+            function_call = self._extract_function_call(messages[-1], manifest, res) if manifest.functions() is not None else None
+            candidates.append((role, res, function_call))
 
-    def is_within_budget(self, text: str, verbose: bool = False):
-        token_budget = self.llm_model.max_token() - 500
-        return self.__num_tokens(text) <= token_budget
+        return (candidates, None)
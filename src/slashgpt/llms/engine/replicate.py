@@ -8,7 +8,7 @@ except ImportError:
     print("no replicate. pip install replicate")
 
 from slashgpt.llms.engine.base import LLMEngineBase
-from slashgpt.utils.print import print_debug
+from slashgpt.utils.print import print_debug, print_warning
 
 if TYPE_CHECKING:
     from slashgpt.manifest import Manifest
@@ -19,6 +19,10 @@ default_model = "a16z-infra/llama7b-v2-chat:a845a72bb3fa3ae298143d13efa8873a2987
 
 class LLMEngineReplicate(LLMEngineBase):
     def chat_completion(self, messages: List[dict], manifest: Manifest, verbose: bool):
+        # replicate.run yields tokens anyway, so we simply drain the stream
+        return self.consume_stream(messages, manifest, verbose)
+
+    def chat_completion_stream(self, messages: List[dict], manifest: Manifest, verbose: bool):
         temperature = manifest.temperature()
 
         replicate_model = self.llm_model.get("replicate_model") or default_model
@@ -27,12 +31,39 @@ class LLMEngineReplicate(LLMEngineBase):
         if verbose:
             print_debug("calling replicate.run")
 
-        output = replicate.run(
-            replicate_model,
-            input={"prompt": prompt},
-            temperature=temperature,
-        )
-        res = "".join(output)
+        # The prediction is created explicitly (as replicate.run does), so that it can be cancelled when we stop reading
+        (model_name, version_id) = replicate_model.split(":", 1)
+        version = replicate.models.get(model_name).versions.get(version_id)
+        prediction = replicate.predictions.create(version=version, input={"prompt": prompt}, temperature=temperature)
+        # For notebook agents, stop reading as soon as the code block is closed,
+        # so that the code runs without waiting for the rest of the output
+        detect_code = manifest.get("notebook") and manifest.functions() is not None
+        chunks: List[str] = []
+        line = ""
+        fences = 0
+        completed = False
+        try:
+            for chunk in prediction.output_iterator():
+                chunks.append(chunk)
+                yield chunk
+                if detect_code:
+                    lines = (line + chunk).split("\n")
+                    line = lines.pop()  # incomplete line
+                    fences += sum(1 for completed_line in lines if completed_line[:3] == "```")
+                    if fences >= 2:
+                        if verbose:
+                            print_debug("code block closed, stop reading")
+                        break
+            else:
+                completed = True
+        finally:
+            if not completed:
+                # Stopped early (or the caller stopped reading): stop the remote generation, which is billed by time
+                try:
+                    prediction.cancel()
+                except Exception as e:
+                    print_warning(f"Failed to cancel the replicate prediction: {e}")
+        res = "".join(chunks)
         function_call = self._extract_function_call(messages[-1], manifest, res) if manifest.functions() is not None else None
 
         role = "assistant"
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from slashgpt.llms.engine.base import LLMEngineBase
+    from slashgpt.llms.model import LlmModel
+
+
+class LlmEnginePool:
+    """
+    Process-wide registry of LLM engine instances.
+    LlmModel objects with the same definition share one engine (and its API client),
+    so that TCP/TLS connections are reused across sessions.
+    """
+
+    def __init__(self):
+        self.__engines: dict = {}
+        self.__lock = threading.Lock()
+        self.hits: int = 0
+        """Number of requests served by an existing engine (int)"""
+        self.misses: int = 0
+        """Number of requests which created a new engine (int)"""
+
+    @classmethod
+    def __key(cls, engine_class: type, llm_model: LlmModel):
+        api_key = llm_model.get("api_key")
+        return (
+            engine_class,
+            llm_model.engine_name(),
+            llm_model.name(),
+            llm_model.get_api_base(),
+            api_key,
+            os.getenv(api_key, "") if api_key else "",
+            # Engines read other properties (such as max_token or url) through llm_model
+            json.dumps(llm_model.llm_model_data, sort_keys=True, default=str),
+        )
+
+    def get_engine(self, engine_class: type, llm_model: LlmModel) -> LLMEngineBase:
+        """Returns the shared engine for the model, creating it on the first request
+
+        Args:
+
+            engine_class (type): a subclass of LLMEngineBase
+            llm_model (LlmModel): the model which requests the engine
+        """
+        key = self.__key(engine_class, llm_model)
+        with self.__lock:
+            engine = self.__engines.get(key)
+            if engine is not None:
+                self.hits += 1
+                return engine
+            self.misses += 1
+            engine = engine_class(llm_model)
+            self.__engines[key] = engine
+            return engine
+
+    def stats(self):
+        """Returns the statistics of the pool (dict)"""
+        with self.__lock:
+            requests = self.hits + self.misses
+            return {
+                "engines": len(self.__engines),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests else 0.0,
+            }
+
+    def clear(self):
+        """Discards all engines and resets the statistics"""
+        with self.__lock:
+            self.__engines = {}
+            self.hits = 0
+            self.misses = 0
+
+
+engine_pool = LlmEnginePool()
+"""The process-wide engine pool used by LlmModel"""
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import threading
+import time
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from slashgpt.llms.retry import is_retryable_status, retry_delay
+from slashgpt.utils.print import print_warning
+
+if TYPE_CHECKING:
+    from slashgpt.llms.model import LlmModel
+
+
+class HttpTransport:
+    """
+    HTTP transport for self-hosted inference servers. Requests go through a keep-alive session
+    shared by all the engines talking to the same server, with timeouts, bounded retries (with jitter)
+    and optional gzip compression of the request body.
+
+    It is configured by these properties of the model definition:
+
+        timeout (number or dict, optional): seconds, or {"connect": seconds, "read": seconds} (the default is 10/120)
+        max_retries (int, optional): number of retries for connection errors, timeouts, 429 and 5xx (the default is 2)
+        retry_backoff (float, optional): base delay of the exponential backoff in seconds (the default is 0.5)
+        gzip (boolean, optional): compress the request body (the default is false)
+        pool_maxsize (int, optional): maximum number of kept-alive connections per server (the default is 10)
+    """
+
+    __sessions: dict = {}
+    __lock = threading.Lock()
+
+    def __init__(self, llm_model: LlmModel):
+        timeout = llm_model.get("timeout")
+        if isinstance(timeout, dict):
+            self.connect_timeout: float = float(timeout.get("connect", 10))
+            self.read_timeout: float = float(timeout.get("read", 120))
+        else:
+            self.connect_timeout = 10.0
+            self.read_timeout = float(timeout) if timeout else 120.0
+        max_retries = llm_model.get("max_retries")
+        self.max_retries: int = 2 if max_retries is None else int(max_retries)
+        self.retry_backoff: float = float(llm_model.get("retry_backoff") or 0.5)
+        self.gzip: bool = bool(llm_model.get("gzip"))
+        self.pool_maxsize: int = int(llm_model.get("pool_maxsize") or 10)
+
+    @classmethod
+    def session(cls, url: str, pool_maxsize: int = 10) -> requests.Session:
+        """Returns the keep-alive session shared by the requests to the server of the url"""
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc, pool_maxsize)
+        with cls.__lock:
+            session = cls.__sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+                session.mount(f"{parts.scheme}://", adapter)
+                cls.__sessions[key] = session
+            return session
+
+    @classmethod
+    def close_sessions(cls):
+        """Closes all the shared sessions (and their connections)"""
+        with cls.__lock:
+            for session in cls.__sessions.values():
+                session.close()
+            cls.__sessions = {}
+
+    def create_async_client(self) -> httpx.AsyncClient:
+        """Creates an async client with the same timeouts and pool size (one per event loop)"""
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            limits=httpx.Limits(max_keepalive_connections=self.pool_maxsize),
+        )
+
+    def __body(self, headers: dict, arguments: dict):
+        headers = dict(headers)
+        data = json.dumps(arguments).encode("utf-8")
+        if self.gzip:
+            data = gzip.compress(data)
+            headers["Content-Encoding"] = "gzip"
+        return (headers, data)
+
+    def post(self, url: str, headers: dict, arguments: dict):
+        """Posts the arguments as json and returns (status_code, text)"""
+        (headers, data) = self.__body(headers, arguments)
+        session = self.session(url, self.pool_maxsize)
+        for attempt in range(self.max_retries + 1):
+            is_last = attempt == self.max_retries
+            try:
+                response = session.post(url, headers=headers, data=data, timeout=(self.connect_timeout, self.read_timeout))
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if is_last:
+                    raise
+                print_warning(f"HttpTransport: {e}, retrying")
+                time.sleep(retry_delay(attempt, self.retry_backoff, None))
+                continue
+            if is_retryable_status(response.status_code) and not is_last:
+                print_warning(f"HttpTransport: status {response.status_code}, retrying")
+                time.sleep(retry_delay(attempt, self.retry_backoff, response.headers.get("retry-after")))
+                continue
+            return (response.status_code, response.text)
+
+    async def apost(self, client: httpx.AsyncClient, url: str, headers: dict, arguments: dict):
+        """Asynchronous version of post, which uses the client returned by create_async_client"""
+        (headers, data) = self.__body(headers, arguments)
+        for attempt in range(self.max_retries + 1):
+            is_last = attempt == self.max_retries
+            try:
+                response = await client.post(url, headers=headers, content=data)
+            except httpx.TransportError as e:
+                if is_last:
+                    raise
+                print_warning(f"HttpTransport: {e}, retrying")
+                await asyncio.sleep(retry_delay(attempt, self.retry_backoff, None))
+                continue
+            if is_retryable_status(response.status_code) and not is_last:
+                print_warning(f"HttpTransport: status {response.status_code}, retrying")
+                await asyncio.sleep(retry_delay(attempt, self.retry_backoff, response.headers.get("retry-after")))
+                continue
+            return (response.status_code, response.text)
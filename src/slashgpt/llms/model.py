@@ -3,8 +3,10 @@ from __future__ import annotations
 import importlib
 import inspect
 import os
-from typing import TYPE_CHECKING, List
+from typing import TYPE_CHECKING, Callable, List
 
+from slashgpt.llms.engine_pool import engine_pool
+from slashgpt.llms.response_cache import response_cache
 from slashgpt.utils.print import print_error
 
 if TYPE_CHECKING:
@@ -37,6 +39,7 @@ class LlmModel:
         self.engine = self.__get_engine(llm_engine_configs)
         """A subclass of LLEngineBase,
         which implements chat_completion method for a particular LLM
+        (shared with other models with the same definition)
         """
 
     def get(self, key: str):
@@ -74,17 +77,29 @@ class LlmModel:
 
         if class_data:
             if inspect.isclass(class_data):
-                return class_data(self)
+                my_class = class_data
             else:
                 module = importlib.import_module(class_data["module_name"])
                 my_class = getattr(module, class_data["class_name"])
-                return my_class(self)
+            # Engines (and their API clients) are shared among models with the same definition
+            return engine_pool.get_engine(my_class, self)
         else:
             print_error("No engine name: " + self.engine_name())
             return None
 
+    def __cache_lookup(self, messages: List[dict], manifest: Manifest):
+        settings = manifest.cache()
+        if settings is None:
+            return (None, None, None)
+        key = response_cache.key(self, messages, manifest)
+        directory = None
+        if settings.get("disk", False):
+            directory = os.path.join(manifest.base_dir, settings.get("dir") or "output/llm_cache")
+        return (key, directory, response_cache.get(key, manifest, settings.get("ttl"), directory))
+
     def generate_response(self, messages: List[dict], manifest: Manifest, verbose: bool):
         """It calls the engine's chat_completion method
+        (or returns the cached response if the manifest enables the cache)
 
         Args:
 
@@ -92,10 +107,61 @@ class LlmModel:
             manifest (Manifest): it specifies the behavior of the LLM agent
             verbose (bool): True if it's in verbose mode.
         """
-        return self.engine.chat_completion(messages, manifest, verbose)
+        (key, directory, cached) = self.__cache_lookup(messages, manifest)
+        if cached:
+            return cached
+        response = self.engine.chat_completion(messages, manifest, verbose)
+        if key:
+            response_cache.set(key, response, directory)
+        return response
+
+    def generate_completions(self, messages: List[dict], manifest: Manifest, verbose: bool):
+        """It calls the engine's chat_completions method, which returns all the completions
+        (manifest.num_completions()) as ([(role, res, function_call)], token_usage), without the cache"""
+        return self.engine.chat_completions(messages, manifest, verbose)
+
+    async def agenerate_response(self, messages: List[dict], manifest: Manifest, verbose: bool):
+        """Asynchronous version of generate_response, which calls the engine's achat_completion method"""
+        (key, directory, cached) = self.__cache_lookup(messages, manifest)
+        if cached:
+            return cached
+        response = await self.engine.achat_completion(messages, manifest, verbose)
+        if key:
+            response_cache.set(key, response, directory)
+        return response
+
+    def generate_response_stream(self, messages: List[dict], manifest: Manifest, verbose: bool, on_token: Callable[[str], None]):
+        """It calls the engine's chat_completion_stream method,
+        and calls on_token for each text delta as it arrives.
+
+        Args:
+
+            messages (list of dict): chat messages
+            manifest (Manifest): it specifies the behavior of the LLM agent
+            verbose (bool): True if it's in verbose mode.
+            on_token (function): called with each text delta (str)
+
+        Returns:
+
+            the same tuple as generate_response, once the stream ends
+        """
+        (key, directory, cached) = self.__cache_lookup(messages, manifest)
+        if cached:
+            if cached[1]:
+                on_token(cached[1])
+            return cached
+        response = self.engine.consume_stream(messages, manifest, verbose, on_token)
+        if key:
+            response_cache.set(key, response, directory)
+        return response
 
     def num_tokens(self, text: str):
+        """Returns the number of tokens of the text (memoized)"""
         return self.engine.num_tokens(text)
 
     def is_within_budget(self, text: str, verbose: bool):
         return self.engine.is_within_budget(text, verbose)
+
+    def is_within_token_budget(self, num_tokens: int):
+        """Same as is_within_budget, but takes the number of tokens counted by the caller"""
+        return self.engine.is_within_token_budget(num_tokens)
@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, List, Optional
+
+from slashgpt.function.function_call import FunctionCall
+from slashgpt.utils.print import print_warning
+
+if TYPE_CHECKING:
+    from slashgpt.llms.model import LlmModel
+    from slashgpt.manifest import Manifest
+
+MAX_DISK_BYTES = 100 * 1024 * 1024
+
+
+class LlmResponseCache:
+    """
+    Exact-match cache of LLM responses. Recently used entries are kept in memory (LRU),
+    and entries can also be written to a directory on disk so that they survive restarts.
+    Expired entries are deleted from the disk when they are read, and the oldest entries are deleted
+    when the directory exceeds max_disk_bytes.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_disk_bytes: int = MAX_DISK_BYTES):
+        """
+        Args:
+
+            max_entries (int): maximum number of entries kept in memory
+            max_disk_bytes (int): maximum total size of the entries in each disk cache directory
+        """
+        self.max_entries = max_entries
+        """Maximum number of entries kept in memory (int)"""
+        self.max_disk_bytes = max_disk_bytes
+        """Maximum total size of the entries in each disk cache directory (int)"""
+        self.__entries: OrderedDict = OrderedDict()
+        self.__disk_bytes: dict = {}  # directory -> estimated total size of the entries
+        self.__lock = threading.Lock()
+        self.hits = 0
+        """Number of lookups served from memory or disk (int)"""
+        self.disk_hits = 0
+        """Number of lookups served from disk (int)"""
+        self.misses = 0
+        """Number of lookups which were not found or expired (int)"""
+
+    @classmethod
+    def key(cls, llm_model: LlmModel, messages: List[dict], manifest: Manifest):
+        """Returns the hash of everything which affects the response (str)"""
+        data = {
+            "engine": llm_model.engine_name(),
+            "model": llm_model.name(),
+            "api_base": llm_model.get_api_base(),
+            # Engines read other properties (such as url or replicate_model) through llm_model
+            "llm_model": llm_model.llm_model_data,
+            "messages": messages,
+            "functions": manifest.functions(),
+            "function_call": manifest.get("function_call"),
+            "temperature": manifest.temperature(),
+            "n": manifest.num_completions(),
+            "completion_strategy": manifest.completion_strategy(),
+            "logprobs": manifest.logprobs(),
+        }
+        text = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def __path(cls, directory: str, key: str):
+        return f"{directory}/{key[:2]}/{key}.json"
+
+    @classmethod
+    def __is_expired(cls, entry: dict, ttl: Optional[float]):
+        return ttl is not None and time.time() - entry["created_at"] >= ttl
+
+    def get(self, key: str, manifest: Manifest, ttl: Optional[float] = None, directory: Optional[str] = None):
+        """Returns the cached (role, res, function_call, token_usage) tuple, or None
+
+        Args:
+
+            key (str): the key returned by key()
+            manifest (Manifest): the manifest to bind the function call with
+            ttl (float, optional): time to live in seconds (None: no expiration)
+            directory (str, optional): location of the disk cache
+        """
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and self.__is_expired(entry, ttl):
+                del self.__entries[key]
+                entry = None
+            elif entry is not None:
+                self.__entries.move_to_end(key)
+        from_disk = False
+        if entry is None and directory:
+            entry = self.__read(directory, key)
+            if entry is not None and self.__is_expired(entry, ttl):
+                self.__remove(directory, key)
+                entry = None
+            from_disk = entry is not None
+        with self.__lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if from_disk:
+                self.disk_hits += 1
+                self.__store(key, entry)
+
+        function_call_data = entry.get("function_call")
+        function_call = FunctionCall(function_call_data, manifest) if function_call_data else None
+        return (entry.get("role"), entry.get("res"), function_call, entry.get("token_usage"))
+
+    def set(self, key: str, response: tuple, directory: Optional[str] = None):
+        """Stores the (role, res, function_call, token_usage) tuple
+
+        Args:
+
+            key (str): the key returned by key()
+            response (tuple): the response from the LLM
+            directory (str, optional): location of the disk cache
+        """
+        (role, res, function_call, token_usage) = response
+        if res is None and function_call is None:
+            return
+        entry = {
+            "role": role,
+            "res": res,
+            "function_call": self.__function_call_data(function_call) if function_call else None,
+            "token_usage": token_usage,
+            "created_at": time.time(),
+        }
+        with self.__lock:
+            self.__store(key, entry)
+        if directory:
+            self.__write(directory, key, entry)
+
+    @classmethod
+    def __function_call_data(cls, function_call: FunctionCall):
+        data = function_call.data()
+        if isinstance(data, dict):
+            return {"name": data.get("name"), "arguments": data.get("arguments")}
+        # The function_call object of OpenAI's response
+        return {"name": data.name, "arguments": data.arguments}
+
+    def __store(self, key: str, entry: dict):
+        self.__entries[key] = entry
+        self.__entries.move_to_end(key)
+        while len(self.__entries) > self.max_entries:
+            self.__entries.popitem(last=False)
+
+    def __read(self, directory: str, key: str):
+        try:
+            with open(self.__path(directory, key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError) as e:
+            print_warning(f"LlmResponseCache: failed to read {key}: {e}")
+            return None
+
+    def __write(self, directory: str, key: str, entry: dict):
+        path = self.__path(directory, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so that readers never see a partial entry
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+        self.__add_disk_bytes(directory, os.path.getsize(path))
+
+    def __remove(self, directory: str, key: str):
+        try:
+            os.remove(self.__path(directory, key))
+        except FileNotFoundError:
+            pass
+
+    def __add_disk_bytes(self, directory: str, size: int):
+        with self.__lock:
+            total = self.__disk_bytes.get(directory)
+            if total is not None:
+                total += size
+                self.__disk_bytes[directory] = total
+        # Measured on the first write (previous runs may have left entries), and again each time it is pruned.
+        # Overwritten entries are counted twice, which only makes it pruned (and measured) earlier.
+        if total is None or total > self.max_disk_bytes:
+            total = self.__prune(directory)
+            with self.__lock:
+                self.__disk_bytes[directory] = total
+
+    def __prune(self, directory: str) -> int:
+        """Deletes the oldest entries down to 3/4 of max_disk_bytes (so that it is not pruned on every write)
+        if the directory exceeds max_disk_bytes. Returns the total size of the remaining entries."""
+        files = []
+        try:
+            for shard in os.scandir(directory):
+                if shard.is_dir():
+                    for file in os.scandir(shard.path):
+                        if file.name.endswith(".json"):
+                            try:
+                                stat = file.stat()
+                            except FileNotFoundError:
+                                continue  # deleted by another process meanwhile
+                            files.append((stat.st_mtime, stat.st_size, file.path))
+        except FileNotFoundError:
+            pass
+        total = sum(size for (_, size, _) in files)
+        if total > self.max_disk_bytes:
+            for _, size, path in sorted(files):
+                if total <= self.max_disk_bytes * 3 // 4:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+        return total
+
+    def stats(self):
+        """Returns the statistics of the cache (dict)"""
+        with self.__lock:
+            return {
+                "entries": len(self.__entries),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
+
+    def clear(self):
+        """Discards the in-memory entries and resets the statistics (the disk cache is kept)"""
+        with self.__lock:
+            self.__entries = OrderedDict()
+            self.hits = 0
+            self.disk_hits = 0
+            self.misses = 0
+
+
+response_cache = LlmResponseCache()
+"""The process-wide response cache used by LlmModel"""
@@ -0,0 +1,41 @@
+import random
+from typing import Optional
+
+# Timeouts, conflicts, rate limits and transient server errors. Other statuses (e.g. 400, 401 and 501) fail at once.
+RETRYABLE_STATUS_CODES = frozenset((408, 409, 429, 500, 502, 503, 504))
+
+
+def is_retryable_status(status_code: int) -> bool:
+    """Returns True if a request answered with the status should be retried"""
+    return status_code in RETRYABLE_STATUS_CODES
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """Returns True if the error (of an LLM client) is a retryable status, a connection failure or a timeout"""
+    status_code = getattr(error, "status_code", None)
+    response = getattr(error, "response", None)
+    if status_code is None and response is not None:
+        status_code = getattr(response, "status_code", None)
+    if status_code is not None:
+        return is_retryable_status(status_code)
+    return isinstance(error, (ConnectionError, TimeoutError)) or type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+def retry_after_of(error: Exception) -> Optional[str]:
+    """Returns the Retry-After header of the response of the error, if any"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if headers is None or not hasattr(headers, "get"):
+        return None
+    return headers.get("retry-after")
+
+
+def retry_delay(attempt: int, backoff: float, retry_after: Optional[str] = None) -> float:
+    """Returns the seconds to wait before the retry after the attempt (0 for the first one):
+    the Retry-After header of the server if any, otherwise an exponential backoff with jitter"""
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    delay = backoff * (2**attempt)
+    return delay / 2 + random.uniform(0, delay / 2)  # jitter
@@ -0,0 +1,41 @@
+import functools
+import hashlib
+import threading
+from collections import OrderedDict
+
+import tiktoken  # for counting tokens
+
+default_encoding_name = "cl100k_base"
+
+# Number of memoized counts. They are keyed by a digest of the text, so the texts themselves are not kept.
+COUNT_CACHE_SIZE = 16384
+
+_counts: OrderedDict = OrderedDict()
+_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoding(model_name: str):
+    """Returns the tiktoken encoding for the model (shared across the process).
+    Models unknown to tiktoken fall back to the encoding of gpt-3.5/gpt-4."""
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        return tiktoken.get_encoding(default_encoding_name)
+
+
+def num_tokens(text: str, model_name: str) -> int:
+    """Returns the number of tokens of the text. Counts are memoized (by a digest of the text),
+    so that re-counting the same message (e.g. a long history) costs a hash instead of an encode."""
+    key = (hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest(), model_name)
+    with _lock:
+        count = _counts.get(key)
+        if count is not None:
+            _counts.move_to_end(key)
+            return count
+    count = len(get_encoding(model_name).encode(text))
+    with _lock:
+        _counts[key] = count
+        if len(_counts) > COUNT_CACHE_SIZE:
+            _counts.popitem(last=False)
+    return count
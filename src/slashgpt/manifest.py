@@ -1,14 +1,17 @@
+import copy
 import json
-import random
-import re
 from datetime import datetime
-from typing import List, Optional
+from typing import Optional
 
 from slashgpt.chat_config import ChatConfig
 from slashgpt.dbs.db_chroma import DBChroma
 from slashgpt.dbs.db_pgvector import DBPgVector
 from slashgpt.dbs.db_pinecone import DBPinecone
 from slashgpt.dbs.vector_engine_openai import VectorEngineOpenAI
+from slashgpt.manifest_registry import summary_of
+from slashgpt.prompt_template import PromptTemplate, sample
+from slashgpt.utils.file_cache import read_json, read_text
+from slashgpt.utils.module_cache import load_module
 from slashgpt.utils.print import print_debug, print_info, print_warning
 
 __vector_dbs = {
@@ -75,15 +78,31 @@ class Manifest:
         """Returns the number of desired LLM completions per prompt (int)"""
         return self.get("num_completions") or 1
 
+    def completion_strategy(self):
+        """Returns the strategy to choose one of num_completions completions (str)"""
+        return self.get("completion_strategy") or "first"
+
+    def cache(self):
+        """Returns the settings of the response cache (dict), or None if it is disabled"""
+        value = self.get("cache")
+        if value is True:
+            return {}
+        if isinstance(value, dict):
+            return value
+        return None
+
     def model(self):
         """Returns the specified LLM model (str or dict)"""
         return self.get("model")
 
-    # NOTE: Let's keep it hidden until we implement it.
-    def __history_type(self):
-        """Returns the history type, which controls the behavior of history"""
+    def history_type(self):
+        """Returns the history type, which controls which messages of the history are sent to the LLM (str)"""
         return self.get("history_type") or "all"
 
+    def retention(self):
+        """Returns the retention policy of the stored sessions (dict), or None"""
+        return self.get("retention")
+
     def manifest(self):
         """Returns the manifest definition (dict)"""
         return self.__manifest
@@ -97,17 +116,18 @@ class Manifest:
         if value:
             # load a file if the location is specified
             if isinstance(value, str):
-                with open(self.base_dir + "/" + value, "r") as f:
-                    value = json.load(f)
+                value = read_json(self.base_dir + "/" + value)
             # validation
             if value and isinstance(value, list) and len(value) > 0 and isinstance(value[0], dict):
                 agents = self.get("agents")
                 # If agents are specified, inject their keys into the definition of categorize function.
                 if agents:
                     # WARNING: It assumes that categorize(category, ...) function
+                    # The definitions are copied, since manifests are shared (read-only) by the sessions.
+                    value = [copy.deepcopy(function) if function.get("name") == "categorize" else function for function in value]
                     for function in value:
                         if function.get("name") == "categorize":
-                            function["parameters"]["properties"]["category"]["enum"] = agents
+                            function["parameters"]["properties"]["category"]["enum"] = list(agents)
                 return value
             else:
                 print_debug("Invalid functions", value)
@@ -122,15 +142,12 @@ class Manifest:
     def __read_module(self):
         module = self.get("module")
         if module:
-            with open(f"{self.base_dir}/{module}", "r") as f:
-                try:
-                    code = f.read()
-                    namespace = {}
-                    exec(code, namespace)
-                    print(f" {module}")
-                    return namespace
-                except ImportError:
-                    print(f"Failed to import module: {module}")
+            try:
+                namespace = load_module(f"{self.base_dir}/{module}")
+                print(f" {module}")
+                return namespace
+            except ImportError:
+                print(f"Failed to import module: {module}")
 
         return None
 
@@ -142,60 +159,27 @@ class Manifest:
         prompt = self.get("prompt")
         if isinstance(prompt, list):
             prompt = "\n".join(prompt)
-        if prompt:
-            if re.search("\\{now\\}", prompt):
-                time = datetime.now()
-                prompt = re.sub("\\{now\\}", time.strftime("%Y%m%dT%H%M%SZ"), prompt, 1)
-        return prompt
-
-    """
-    Read manifest data and shuffle data
-    """
-
-    def __get_random_manifest_data(self):
-        list_data = self.get("list")
-        if list_data:
-            # Shuffle
-            for i in range(len(list_data)):
-                j = random.randrange(0, len(list_data))
-                temp = list_data[i]
-                list_data[i] = list_data[j]
-                list_data[j] = temp
-            return list_data
-
-    def __replace_random(self, prompt, data):
-        j = 0
-        # TODO: fix array bounds bug
-        while re.search("\\{random\\}", prompt):
-            prompt = re.sub("\\{random\\}", data[j], prompt, 1)
-            j += 1
         return prompt
 
-    def __replace_from_resource_file(self, prompt, resource_file_name):
-        with open(f"{self.base_dir}/{resource_file_name}", "r") as f:
-            contents = f.read()
-            return re.sub("\\{resource\\}", contents, prompt, 1)
-
     def prompt_data(self, manifests: dict = {}, memory: Optional[dict] = None):
         """Generate an appropriate prompt for a ChatSession (str)"""
         prompt = self.__read_prompt()
-        agents = self.get("agents")
         if prompt:
-            data = self.__get_random_manifest_data()
-            if data:
-                prompt = self.__replace_random(prompt, data)
+            template = PromptTemplate.compile(prompt)
+            values = {}
+            if template.has("now"):
+                values["now"] = datetime.now().strftime("%Y%m%dT%H%M%SZ")
             resource = self.get("resource")
-            if resource:
-                prompt = self.__replace_from_resource_file(prompt, resource)
-            if agents:
-                prompt = self.__apply_agent(prompt, agents, manifests)
+            if resource and template.has("resource"):
+                values["resource"] = read_text(f"{self.base_dir}/{resource}")
+            agents = self.get("agents")
+            if agents and template.has("agents"):
+                values["agents"] = "\n".join(f"{agent}: {summary_of(manifests, agent).get('description')}" for agent in agents)
             if memory is not None:
-                prompt = re.sub("\\{memory\\}", json.dumps(memory, ensure_ascii=False), prompt, 1)
-            return prompt
-
-    def __apply_agent(self, prompt: str, agents: List[str], manifests: dict = {}):
-        descriptions = [f"{agent}: {manifests[agent].get('description')}" for agent in agents]
-        return re.sub("\\{agents\\}", "\n".join(descriptions), prompt, 1)
+                values["memory"] = json.dumps(memory, ensure_ascii=False)
+            # Picks items from the "list" without shuffling it (it is shared by the sessions)
+            random_items = sample(self.get("list") or [], template.count("random"))
+            return template.render(values, random_items)
 
     def format_question(self, question: str):
         """Format the question if the "form" property is specified in the manifest (str)"""
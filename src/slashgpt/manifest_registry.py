@@ -0,0 +1,252 @@
+import copy
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections.abc import Mapping
+from typing import Optional
+
+import yaml
+
+from slashgpt.utils.print import print_error, print_warning
+
+CHECK_INTERVAL = 2.0
+CACHE_VERSION = 2
+# Fields of the manifests kept in the index (the others are loaded when a manifest is used)
+SUMMARY_FIELDS = ("title", "description")
+BROKEN = object()
+
+
+class FrozenDict(dict):
+    """A dict which cannot be modified, so that it can be shared across threads.
+    copy.copy and copy.deepcopy return (mutable) dicts."""
+
+    def __readonly(self, *args, **kwargs):
+        raise TypeError("Manifests are read-only. Copy them (copy.deepcopy) to modify.")
+
+    __setitem__ = __delitem__ = __ior__ = __readonly
+    clear = pop = popitem = setdefault = update = __readonly
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return {key: copy.deepcopy(value, memo) for key, value in self.items()}
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+def freeze(value):
+    """Returns the value with all the dicts in it replaced with FrozenDict"""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return [freeze(item) for item in value]
+    return value
+
+
+class ManifestEntry:
+    """A manifest file. The summary is kept in the index, and the manifest is decoded from the cache (or parsed) on first use."""
+
+    def __init__(self, key: str, mtime_ns: int, size: int, summary: Optional[FrozenDict], data: Optional[str], manifest=None):
+        self.key = key
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.summary = summary
+        """Fields of SUMMARY_FIELDS (FrozenDict), or None if the file is broken"""
+        self.data = data
+        """Manifest encoded as json (str), or None if it is not cached"""
+        self.__manifest = manifest
+
+    def manifest(self):
+        if self.__manifest is None and self.data is not None:
+            self.__manifest = freeze(json.loads(self.data))
+        return self.__manifest
+
+
+class ManifestSet(Mapping):
+    """Read-only mapping from the keys to the manifests, which are loaded when they are accessed (e.g. on activation).
+    The keys and summaries (e.g. for the help and the {agents} descriptions) are available without loading them."""
+
+    def __init__(self, entries: Optional[dict] = None):
+        self.__entries: dict = entries or {}
+
+    def __getitem__(self, key: str):
+        return self.__entries[key].manifest()
+
+    def __contains__(self, key) -> bool:
+        return key in self.__entries
+
+    def __iter__(self):
+        return iter(self.__entries)
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def summary(self, key: str) -> FrozenDict:
+        """Returns the fields of SUMMARY_FIELDS of the manifest (FrozenDict)"""
+        return self.__entries[key].summary
+
+
+def summary_of(manifests, key: str) -> dict:
+    """Returns the summary of the manifest in either a ManifestSet or a dict of manifests"""
+    if isinstance(manifests, ManifestSet):
+        return manifests.summary(key)
+    return manifests[key]
+
+
+def default_cache_dir() -> str:
+    return os.getenv("SLASHGPT_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "slashgpt")
+
+
+class ManifestRegistry:
+    """
+    Set of manifests (json or yaml) in a folder, shared by all the configs of the process.
+    The folder is checked at most once every check_interval seconds, and only the files whose mtime or size
+    changed are parsed again. Each change produces a new snapshot (ManifestSet), so snapshots are never modified.
+
+    The parsed manifests are also saved in a cache file (in cache_dir), so that the files are not parsed again
+    after a restart. A snapshot holds only the summaries of the manifests, and a manifest is decoded from the cache
+    when it is used for the first time. The cache is json (not pickle), so that reading it cannot run code.
+    """
+
+    __registries: dict = {}
+    __lock = threading.Lock()
+
+    def __init__(self, path: str, check_interval: float = CHECK_INTERVAL, cache_dir: Optional[str] = ""):
+        """
+        Args:
+
+            path (str): path to the manifests folder
+            check_interval (float): seconds during which the folder is not checked again
+            cache_dir (str, optional): folder of the cache file (default: $SLASHGPT_CACHE_DIR or ~/.cache/slashgpt).
+                None disables the cache file.
+        """
+        self.path = path
+        self.check_interval = check_interval
+        self.cache_path: Optional[str] = None
+        """Location of the cache file (str)"""
+        if cache_dir is not None:
+            digest = hashlib.md5(os.path.abspath(path).encode("utf-8")).hexdigest()
+            self.cache_path = os.path.join(cache_dir or default_cache_dir(), f"manifests-{digest}.json")
+        self.parsed = 0
+        """Number of parsed files (int)"""
+        self.__files: Optional[dict] = None  # file name -> ManifestEntry
+        self.__snapshot = ManifestSet()
+        self.__checked_at: Optional[float] = None
+        self.__lock = threading.Lock()
+
+    @classmethod
+    def get(cls, path: str):
+        """Returns the shared registry of the folder"""
+        key = os.path.abspath(path)
+        with cls.__lock:
+            registry = cls.__registries.get(key)
+            if registry is None:
+                registry = ManifestRegistry(path)
+                cls.__registries[key] = registry
+            return registry
+
+    def snapshot(self, force: bool = False) -> ManifestSet:
+        """Returns the manifests (key: file name without the extension), checking the folder if it is due or forced"""
+        checked_at = self.__checked_at
+        if not force and checked_at is not None and time.monotonic() - checked_at < self.check_interval:
+            return self.__snapshot
+        with self.__lock:
+            if force or self.__checked_at is None or time.monotonic() - self.__checked_at >= self.check_interval:
+                self.__scan()
+                self.__checked_at = time.monotonic()
+            return self.__snapshot
+
+    def __scan(self):
+        previous = self.__files if self.__files is not None else self.__read_cache()
+        files = {}
+        changed = False
+        with os.scandir(self.path) as entries:
+            for entry in entries:
+                if not re.search(r"\.(json|yml)$", entry.name):
+                    continue
+                stat = entry.stat()
+                cached = previous.get(entry.name)
+                if cached and (cached.mtime_ns, cached.size) == (stat.st_mtime_ns, stat.st_size):
+                    files[entry.name] = cached
+                    continue
+                changed = True
+                # Broken files are kept as well, so that they are not parsed (and reported) again until they change
+                files[entry.name] = self.__parse(entry.name, stat)
+        if changed or self.__files is None or files.keys() != previous.keys():
+            self.__snapshot = ManifestSet({entry.key: entry for entry in files.values() if entry.summary is not None})
+            if changed or files.keys() != previous.keys():
+                self.__write_cache(files)
+        self.__files = files
+
+    def __parse(self, file: str, stat: os.stat_result) -> ManifestEntry:
+        self.parsed += 1
+        key = file.split(".")[0]
+        manifest = BROKEN
+        with open(f"{self.path}/{file}", "r", encoding="utf-8") as f:  # encoding add for Win
+            if file.endswith(".json"):
+                try:
+                    manifest = freeze(json.load(f))
+                except json.JSONDecodeError:
+                    print_error(file + " is broken")
+            else:
+                try:
+                    manifest = freeze(yaml.safe_load(f))
+                except Exception:
+                    print_error(file + " is broken")
+        if manifest is BROKEN:
+            return ManifestEntry(key, stat.st_mtime_ns, stat.st_size, None, None)
+        summary = FrozenDict((field, manifest[field]) for field in SUMMARY_FIELDS if isinstance(manifest, dict) and field in manifest)
+        data = None
+        if self.cache_path:
+            # Manifests which json cannot represent (e.g. dates or numeric keys in yaml) are parsed again after a restart
+            try:
+                data = json.dumps(manifest, ensure_ascii=False)
+                if json.loads(data) != manifest:
+                    data = None
+            except (TypeError, ValueError):
+                pass
+        return ManifestEntry(key, stat.st_mtime_ns, stat.st_size, summary, data, manifest)
+
+    def __read_cache(self) -> dict:
+        if not self.cache_path:
+            return {}
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+            if cache.get("version") != CACHE_VERSION:
+                return {}
+            files = {}
+            for name, (key, mtime_ns, size, summary, data) in cache["files"].items():
+                files[name] = ManifestEntry(key, mtime_ns, size, None if summary is None else freeze(summary), data)
+            return files
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print_warning(f"Ignoring the manifest cache {self.cache_path}: {e}")
+            return {}
+
+    def __write_cache(self, files: dict):
+        if not self.cache_path:
+            return
+        cache = {
+            "version": CACHE_VERSION,
+            # Broken files are cached as well (without the summary). Those which cannot be encoded are not.
+            "files": {
+                name: (entry.key, entry.mtime_ns, entry.size, entry.summary, entry.data)
+                for name, entry in files.items()
+                if entry.summary is None or entry.data is not None
+            },
+        }
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            temp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(cache, f, ensure_ascii=False)
+            os.replace(temp_path, self.cache_path)
+        except OSError as e:
+            print_warning(f"Failed to write the manifest cache {self.cache_path}: {e}")
@@ -0,0 +1,83 @@
+import random
+import re
+from functools import lru_cache
+from typing import List, Optional
+
+PLACEHOLDER = re.compile(r"\{(now|random|resource|agents|memory)\}")
+# {random} is replaced at every occurrence (with a different item each), the others only at the first one
+REPEATED = {"random"}
+
+
+class PromptTemplate:
+    """
+    Prompt of a manifest split into static text and placeholders ({now}, {random}, {resource}, {agents} and {memory}),
+    so that a prompt is built by joining the parts once instead of scanning the text for each placeholder.
+    The values are inserted as they are (they are not scanned for placeholders).
+    """
+
+    def __init__(self, text: str):
+        """
+        Args:
+
+            text (str): prompt with placeholders
+        """
+        self.__static: List[str] = []
+        """Text before, between and after the placeholders (one more than the placeholders)"""
+        self.__names: List[str] = []
+        """Names of the placeholders"""
+        static = ""
+        tokens = PLACEHOLDER.split(text)
+        for i, token in enumerate(tokens):
+            if i % 2 == 0:
+                static += token
+            elif token in REPEATED or token not in self.__names:
+                self.__static.append(static)
+                self.__names.append(token)
+                static = ""
+            else:
+                static += "{" + token + "}"
+        self.__static.append(static)
+
+    @classmethod
+    @lru_cache(maxsize=256)
+    def compile(cls, text: str):
+        """Returns the template of the text (templates are shared, since they are never modified)"""
+        return cls(text)
+
+    def has(self, name: str) -> bool:
+        """Returns True if the template has the placeholder"""
+        return name in self.__names
+
+    def count(self, name: str) -> int:
+        """Returns the number of the placeholders with the name"""
+        return self.__names.count(name)
+
+    def render(self, values: dict, random_items: Optional[List[str]] = None) -> str:
+        """Returns the prompt. The placeholders without values (and {random} without random_items) are left as they are.
+
+        Args:
+
+            values (dict): values of the placeholders (str)
+            random_items (list, optional): values of the {random} placeholders in order
+        """
+        parts = [self.__static[0]]
+        j = 0
+        for name, static in zip(self.__names, self.__static[1:]):
+            if name == "random" and random_items:
+                parts.append(random_items[j])
+                j += 1
+            elif name != "random" and name in values:
+                parts.append(values[name])
+            else:
+                parts.append("{" + name + "}")
+            parts.append(static)
+        return "".join(parts)
+
+
+def sample(items: list, count: int) -> List[str]:
+    """Returns count items picked at random (without repetition as long as there are enough items).
+    The list is not modified (it may be shared by sessions)."""
+    if not items or count == 0:
+        return []
+    picks = random.sample(items, min(count, len(items)))
+    return [picks[i % len(picks)] for i in range(count)]
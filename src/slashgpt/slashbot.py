@@ -32,7 +32,7 @@ def run_bot(base_dir: str = ""):
     if args.list:
         print("Manifest list")
         for manifest_key in config.manifests.keys():
-            manifest = config.manifests[manifest_key]
+            manifest = config.manifests.summary(manifest_key)
             print(manifest_key + ": " + manifest.get("title", "") + " - " + manifest.get("description", ""))
         return
 
@@ -0,0 +1,83 @@
+import copy
+import json
+import os
+import threading
+from collections import OrderedDict
+
+MAX_BYTES = 32 * 1024 * 1024
+
+
+class FileCache:
+    """
+    Contents of the files referenced by manifests (functions, resources, templates), shared by the sessions.
+    An entry is read again when the mtime or size of its file changes. The least recently used entries are dropped
+    when the total size of the cached files exceeds max_bytes (larger files are not cached).
+    """
+
+    def __init__(self, max_bytes: int = MAX_BYTES):
+        """
+        Args:
+
+            max_bytes (int): total size of the cached files
+        """
+        self.max_bytes = max_bytes
+        self.size = 0
+        """Total size of the cached files (int)"""
+        self.__entries: OrderedDict = OrderedDict()  # (abspath, kind) -> (mtime_ns, size, value)
+        self.__lock = threading.Lock()
+
+    def read_text(self, path: str) -> str:
+        """Returns the contents of the file"""
+        return self.__get(path, "text", lambda f: f.read())
+
+    def read_json(self, path: str):
+        """Returns the parsed contents of the JSON file (a copy, which the caller may modify)"""
+        return copy.deepcopy(self.__get(path, "json", json.load))
+
+    def __get(self, path: str, kind: str, parse):
+        key = (os.path.abspath(path), kind)
+        stat = os.stat(key[0])
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self.__lock:
+            cached = self.__entries.get(key)
+            if cached and cached[:2] == version:
+                self.__entries.move_to_end(key)
+                return cached[2]
+        with open(key[0], "r", encoding="utf-8") as f:
+            value = parse(f)
+        with self.__lock:
+            self.__remove(key)
+            if stat.st_size <= self.max_bytes:
+                self.__entries[key] = (*version, value)
+                self.size += stat.st_size
+                while self.size > self.max_bytes:
+                    self.__remove(next(iter(self.__entries)))
+        return value
+
+    def __remove(self, key):
+        cached = self.__entries.pop(key, None)
+        if cached:
+            self.size -= cached[1]
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.size = 0
+
+
+_cache = FileCache()
+
+
+def read_text(path: str) -> str:
+    """Returns the contents of the file, from the shared cache"""
+    return _cache.read_text(path)
+
+
+def read_json(path: str):
+    """Returns a copy of the parsed contents of the JSON file, from the shared cache"""
+    return _cache.read_json(path)
+
+
+def clear():
+    """Empties the shared cache"""
+    _cache.clear()
@@ -0,0 +1,44 @@
+import os
+import threading
+
+# A module setting this to True at its top level only defines functions (and constants), so that its namespace
+# can be shared by all the manifests using it, instead of running the module again for each of them.
+STATELESS = "__stateless__"
+
+_lock = threading.Lock()
+_code: dict = {}  # abspath -> (mtime_ns, size, code object)
+_namespaces: dict = {}  # abspath -> (mtime_ns, size, namespace)
+
+
+def load_module(path: str) -> dict:
+    """Runs the Python file and returns its namespace (dict).
+    The file is compiled again only when its mtime or size changes, and the namespace of a stateless module
+    (see STATELESS) is reused as well. ImportError and SyntaxError are raised to the caller."""
+    key = os.path.abspath(path)
+    stat = os.stat(key)
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        cached = _namespaces.get(key)
+        if cached and cached[:2] == version:
+            return cached[2]
+        cached = _code.get(key)
+    if cached and cached[:2] == version:
+        code = cached[2]
+    else:
+        with open(key, "r", encoding="utf-8") as f:
+            code = compile(f.read(), key, "exec")
+        with _lock:
+            _code[key] = (*version, code)
+    namespace: dict = {"__file__": key}
+    exec(code, namespace)
+    if namespace.get(STATELESS) is True:
+        with _lock:
+            _namespaces[key] = (*version, namespace)
+    return namespace
+
+
+def clear():
+    """Forgets all the compiled modules"""
+    with _lock:
+        _code.clear()
+        _namespaces.clear()
@@ -19,8 +19,8 @@ def print_warning(text: str):
     print(colored(text, COLOR_WARNING))
 
 
-def print_bot(botName: str, message: str):
-    print(f"\033[92m\033[1m{botName}\033[95m\033[0m: {message}")
+def print_bot(botName: str, message: str, end: str = "\n"):
+    print(f"\033[92m\033[1m{botName}\033[95m\033[0m: {message}", end=end)
 
 
 def print_function(function_name: str, message: str):
@@ -0,0 +1,99 @@
+import glob
+import os
+import sqlite3
+import sys
+import time
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.history.storage.archive import SessionArchive  # noqa: E402
+from slashgpt.history.storage.file import ChatHistoryFileStorage  # noqa: E402
+from slashgpt.history.storage.memory import ChatHistoryMemoryStorage  # noqa: E402
+
+pytestmark = pytest.mark.usefixtures("chdir")
+
+
+def create_sessions(count: int):
+    storages = []
+    for i in range(count):
+        storage = ChatHistoryFileStorage("123", "key")
+        storage.append({"role": "user", "content": f"session {i}"})
+        storage.append({"role": "assistant", "content": "The weather is sunny. " * 20})
+        storages.append(storage)
+    return storages
+
+
+def test_archive_idle_sessions():
+    storages = create_sessions(2)
+    journal_size = sum(os.path.getsize(path) for path in glob.glob("filememory/key/*.jsonl"))
+    time.sleep(0.01)
+    cutoff = time.time()
+    time.sleep(0.01)
+    storages += create_sessions(1)
+
+    # Only the sessions idle past the age are archived
+    assert storages[0].archive(60) == 0
+    assert storages[0].catalog.archive(0, ChatHistoryFileStorage.read_session, now=cutoff) == 2
+    assert [os.path.basename(path) for path in glob.glob("filememory/key/*.jsonl")] == [f"{storages[2].session_id}.jsonl"]
+
+    # The archived sessions are listed and read back
+    sessions = storages[0].session_list()
+    assert [entry["title"] for entry in sessions] == ["session 0", "session 1", "session 0"]
+    assert sessions[0]["archive_segment"] and sessions[2]["archive_segment"] is None
+    assert storages[0].get_session_data("2")["messages"][0] == {"role": "user", "content": "session 1"}
+    assert storages[0].get_session_data(storages[0].session_id)["messages"] == storages[0].messages()
+
+    # The archive is much smaller than the journals
+    assert os.path.getsize(glob.glob("filememory/key/.archive/segment-*.z")[0]) * 4 < journal_size
+
+
+def test_reactivate():
+    (storage,) = create_sessions(1)
+    assert storage.archive(-1) == 1
+    assert not os.path.exists(f"filememory/key/{storage.session_id}.jsonl")
+
+    # A loaded session is written again from the archive
+    loaded = ChatHistoryFileStorage("123", "key", storage.session_id)
+    assert loaded.len() == 2
+    loaded.append({"role": "user", "content": "again"})
+    entry = loaded.catalog.find(storage.session_id)
+    assert entry["archive_segment"] is None and entry["message_count"] == 3
+    assert ChatHistoryFileStorage.read_session(entry["path"])[0] == {"role": "user", "content": "session 0"}
+
+    # So is a session archived while it is open (including the message written through the other storage)
+    assert storage.archive(-1) == 1
+    storage.append({"role": "user", "content": "still open"})
+    assert [message["content"] for message in ChatHistoryFileStorage.replay(entry["path"])][2:] == ["again", "still open"]
+
+
+def test_memory_storage():
+    storage = ChatHistoryMemoryStorage("123", "key")
+    storage.append({"role": "user", "content": "Hi"})
+    assert storage.archive(-1) == 1
+    assert glob.glob("output/key/*.json") == []
+    assert storage.get_session_data("1") == {"messages": [{"role": "user", "content": "Hi"}]}
+
+
+def test_segments():
+    archive = SessionArchive("archive", segment_size=100)
+    locations = archive.write([{"messages": [{"role": "user", "content": f"message {i}" * 20}]} for i in range(5)])
+    assert len({segment for (segment, _, _) in locations}) > 1
+    locations += archive.write([{"messages": []}])
+    assert archive.read(*locations[3]) == {"messages": [{"role": "user", "content": "message 3" * 20}]}
+    assert archive.read(*locations[-1]) == {"messages": []}
+
+
+def test_migrate_catalog():
+    os.makedirs("filememory/key")
+    connection = sqlite3.connect("filememory/key/.catalog.sqlite3")
+    connection.execute(
+        "CREATE TABLE catalog (id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL UNIQUE, uid TEXT, path TEXT NOT NULL,"
+        " created_at REAL NOT NULL, updated_at REAL NOT NULL, message_count INTEGER NOT NULL DEFAULT 0, size INTEGER NOT NULL DEFAULT 0, title TEXT)"
+    )
+    connection.commit()
+    connection.close()
+    (storage,) = create_sessions(1)
+    assert storage.archive(-1) == 1
+    assert storage.get_session_data("1")["messages"][0]["content"] == "session 0"
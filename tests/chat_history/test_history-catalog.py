@@ -0,0 +1,105 @@
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.history.storage.catalog import SessionCatalog  # noqa: E402
+from slashgpt.history.storage.file import ChatHistoryFileStorage  # noqa: E402
+from slashgpt.history.storage.memory import ChatHistoryMemoryStorage  # noqa: E402
+
+pytestmark = pytest.mark.usefixtures("chdir")
+
+
+def test_file_storage():
+    first = ChatHistoryFileStorage("123", "key")
+    first.append({"role": "system", "content": "You are a bot"})
+    first.append({"role": "user", "content": "What is\nthe weather?"})
+    first.append({"role": "user", "content": "And tomorrow?"})
+    second = ChatHistoryFileStorage("123", "key")
+    second.append({"role": "user", "content": "Hello"})
+
+    sessions = first.session_list()
+    assert [(entry["id"], entry["session_id"], entry["title"], entry["message_count"]) for entry in sessions] == [
+        (1, first.session_id, "What is the weather?", 3),
+        (2, second.session_id, "Hello", 1),
+    ]
+    assert sessions[0]["updated_at"] >= sessions[0]["created_at"]
+
+    # Ids do not shift when sessions are added
+    ChatHistoryFileStorage("123", "key").append({"role": "user", "content": "Third"})
+    assert first.get_session_data("2") == {"messages": [{"role": "user", "content": "Hello"}]}
+    assert first.get_session_data(first.session_id)["messages"][1]["content"] == "What is\nthe weather?"
+    assert first.get_session_data("4") is None
+
+
+def test_pagination():
+    storages = []
+    for i in range(5):
+        storage = ChatHistoryFileStorage("123", "key")
+        storage.append({"role": "user", "content": f"session {i}"})
+        storages.append(storage)
+    storages[1].append({"role": "assistant", "content": "updated"})
+
+    catalog = storages[0].catalog
+    assert catalog.count() == 5
+    assert [entry["title"] for entry in storages[0].session_list(1, 2)] == ["session 1", "session 2"]
+    assert [entry["title"] for entry in catalog.list(limit=2, order="updated_at", descending=True)] == ["session 1", "session 4"]
+    with pytest.raises(ValueError):
+        catalog.list(order="title")
+
+
+def test_index_existing_files():
+    os.makedirs("filememory/key")
+    with open("filememory/key/old.json", "w") as f:
+        json.dump({"messages": [{"role": "user", "content": "old session"}]}, f)
+    with open("filememory/key/new.jsonl", "w") as f:
+        f.write(json.dumps({"op": "append", "data": {"role": "user", "content": "new session"}}) + "\n")
+    os.utime("filememory/key/old.json", (time.time() - 100, time.time() - 100))
+
+    storage = ChatHistoryFileStorage("123", "key")
+    assert [(entry["session_id"], entry["title"]) for entry in storage.session_list()] == [("old", "old session"), ("new", "new session")]
+    assert storage.get_session_data("new") == {"messages": [{"role": "user", "content": "new session"}]}
+
+
+def test_index_in_background():
+    os.makedirs("filememory/key")
+    with open("filememory/key/old.json", "w") as f:
+        json.dump({"messages": [{"role": "user", "content": "old session"}]}, f)
+    os.utime("filememory/key/old.json", (time.time() - 100, time.time() - 100))
+    loading = threading.Event()
+
+    def load(path):
+        loading.wait(10)
+        return ChatHistoryFileStorage.read_session(path)
+
+    # New sessions are not blocked by the indexing of the existing files
+    catalog = SessionCatalog.get("filememory", "key", load)
+    storage = ChatHistoryFileStorage("123", "key")
+    storage.append({"role": "user", "content": "new session"})
+    # Neither are the existing sessions, which are looked up in the layout
+    assert ChatHistoryFileStorage("123", "key", "old").messages() == [{"role": "user", "content": "old session"}]
+    assert not catalog.wait_indexed(0)
+    loading.set()
+    assert [(entry["session_id"], entry["title"]) for entry in catalog.list()] == [("old", "old session"), (storage.session_id, "new session")]
+    assert catalog.wait_indexed(0)
+
+
+def test_memory_storage():
+    storage = ChatHistoryMemoryStorage("123", "key")
+    storage.append({"role": "user", "content": "Hi"})
+    storage.append({"role": "assistant", "content": "Hello"})
+    sessions = storage.session_list()
+    assert len(sessions) == 1
+    assert (sessions[0]["title"], sessions[0]["message_count"]) == ("Hi", 2)
+    assert storage.get_session_data("1") == {"messages": [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Hello"}]}
+
+
+def test_shared():
+    assert SessionCatalog.get("filememory", "key", ChatHistoryFileStorage.read_session) is SessionCatalog.get(
+        "filememory", "key", ChatHistoryFileStorage.read_session
+    )
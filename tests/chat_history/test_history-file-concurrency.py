@@ -0,0 +1,148 @@
+import multiprocessing
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.chat_history import ChatHistory  # noqa: E402
+from slashgpt.history.storage import file  # noqa: E402
+from slashgpt.history.storage.file import ChatHistoryFileStorage  # noqa: E402
+
+WORKERS = 6
+APPENDS = 40
+
+
+pytestmark = pytest.mark.usefixtures("chdir")
+
+
+def append_per_request(session_id: str, worker: int):
+    # Like server.py, which creates a storage for each request
+    for i in range(APPENDS):
+        ChatHistoryFileStorage("sample", "key", session_id=session_id).append({"role": "user", "content": f"{worker}-{i}"})
+
+
+def request_per_append(directory: str, session_id: str, worker: int, compaction_threshold: int):
+    # Runs in a spawned process, so the working directory and the threshold are those of the worker
+    os.chdir(directory)
+    file.COMPACTION_THRESHOLD = compaction_threshold
+    append_per_request(session_id, worker)
+
+
+def long_lived(directory: str, session_id: str, worker: int, compaction_threshold: int):
+    os.chdir(directory)
+    file.COMPACTION_THRESHOLD = compaction_threshold
+    storage = ChatHistoryFileStorage("sample", "key", session_id=session_id)
+    for i in range(APPENDS):
+        storage.append({"role": "user", "content": f"{worker}-{i}"})
+        if i % 10 == 9:
+            # Others may have appended since, so the index is fixed here
+            storage.set(storage.len() - 1, {"role": "user", "content": f"{worker}-{i}", "edited": True})
+    # The storage sees the messages written by the others
+    assert storage.len() >= APPENDS
+
+
+def check_messages(session_id: str):
+    messages = ChatHistoryFileStorage("sample", "key", session_id=session_id).messages()
+    assert len(messages) == WORKERS * APPENDS
+    for worker in range(WORKERS):
+        # No message is lost, and the messages of each worker are in order
+        contents = [message["content"] for message in messages if message["content"].startswith(f"{worker}-")]
+        assert contents == [f"{worker}-{i}" for i in range(APPENDS)]
+    return messages
+
+
+@pytest.mark.parametrize("target, compaction_threshold", [(request_per_append, 1024 * 1024), (long_lived, 512)])
+def test_processes(tmp_path, target, compaction_threshold):
+    storage = ChatHistoryFileStorage("sample", "key")
+    storage.append({"role": "system", "content": "shared"})
+    storage.pop()
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=target, args=(str(tmp_path), storage.session_id, worker, compaction_threshold)) for worker in range(WORKERS)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+    messages = check_messages(storage.session_id)
+    if target is long_lived:
+        assert sum(1 for message in messages if message.get("edited")) == WORKERS * APPENDS // 10
+    assert storage.catalog.find(storage.session_id)["message_count"] == WORKERS * APPENDS
+
+
+def test_threads(monkeypatch):
+    monkeypatch.setattr(file, "COMPACTION_THRESHOLD", 512)
+    storage = ChatHistoryFileStorage("sample", "key")
+    storage.append({"role": "system", "content": "shared"})
+    storage.pop()
+    # The threads share the working directory (tmp_path) of the test
+    threads = [threading.Thread(target=append_per_request, args=(storage.session_id, worker)) for worker in range(WORKERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    check_messages(storage.session_id)
+
+
+def test_history_caches():
+    storage = ChatHistoryFileStorage("sample", "key")
+    history = ChatHistory(storage, lambda text: len(text))
+    history.append_message({"role": "user", "content": "first"})
+    assert history.num_tokens() == 8
+
+    other = ChatHistoryFileStorage("sample", "key", session_id=storage.session_id)
+    other.set(0, {"role": "user", "content": "replaced"})
+    other.append({"role": "assistant", "content": "second"})
+
+    # The next write brings the storage (and the caches of the history) up to date
+    history.append_message({"role": "user", "content": "third"})
+    assert [message["content"] for message in history.messages()] == ["replaced", "second", "third"]
+    assert history.num_tokens() == 11 + 9 + 8
+
+
+@pytest.mark.parametrize("edit", ["restore", "compaction"])
+def test_history_replaced(monkeypatch, edit):
+    storage = ChatHistoryFileStorage("sample", "key")
+    history = ChatHistory(storage, lambda text: len(text))
+    history.append_message({"role": "user", "content": "one"})
+    history.append_message({"role": "assistant", "content": "two"})
+    assert [message["content"] for message in history.messages()] == ["one", "two"]
+    assert history.num_tokens() == 6 + 6
+
+    # Another writer replaces the journal
+    other = ChatHistory(ChatHistoryFileStorage("sample", "key", session_id=storage.session_id), lambda text: len(text))
+    if edit == "restore":
+        other.repository.restore([{"role": "user", "content": "EDITED"}, {"role": "assistant", "content": "two"}])
+    else:
+        monkeypatch.setattr(file, "COMPACTION_THRESHOLD", 0)
+        for _ in range(3):
+            other.set_message(0, {"role": "user", "content": "EDITED"})
+        with file.session_lock(storage.catalog.directory, storage.session_id) as fd:
+            assert file.read_generation(fd) > 0
+    assert [message["content"] for message in other.messages()] == ["EDITED", "two"]
+
+    history.append_message({"role": "user", "content": "three"})
+    assert [message["content"] for message in history.messages()] == ["EDITED", "two", "three"]
+    assert history.num_tokens() == 9 + 6 + 8
+
+
+@pytest.mark.skipif(file.fcntl is None, reason="no flock")
+def test_lock_removed_while_waiting(tmp_path):
+    path = f"{tmp_path}/.locks/{file.shard_of('session')}/session.lock"
+    acquired = threading.Event()
+    inodes = []
+
+    def wait():
+        with file.session_lock(str(tmp_path), "session") as fd:
+            inodes.append((os.fstat(fd).st_ino, os.stat(path).st_ino))
+        acquired.set()
+
+    with file.session_lock(str(tmp_path), "session", remove=True):
+        thread = threading.Thread(target=wait)
+        thread.start()
+        assert not acquired.wait(0.2)
+    thread.join()
+    # The waiting thread holds the lock of the file at the path, not the deleted one
+    assert inodes[0][0] == inodes[0][1]
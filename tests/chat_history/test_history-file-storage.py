@@ -1,3 +1,4 @@
+import json
 import os
 import sys
 
@@ -5,6 +6,7 @@ import pytest
 
 sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
 
+import slashgpt.history.storage.file as file_storage  # noqa: E402
 from slashgpt.chat_history import ChatHistory  # noqa: E402
 from slashgpt.history.storage.file import ChatHistoryFileStorage  # noqa: E402
 
@@ -51,3 +53,61 @@ def test_messages(history):
         {"name": "4", "content": "4", "role": None},
         {"name": "5", "content": "5", "role": None},
     ]
+
+
+def test_reload(history):
+    session_id = history.repository.session_id
+    history.set_message(1, {"name": "set", "content": "set_data"})
+    history.pop_message()
+    reloaded = ChatHistory(ChatHistoryFileStorage("123", "key", session_id))
+    assert reloaded.messages() == history.messages()
+    assert reloaded.len_messages() == 4
+    assert reloaded.get_message_prop(1, "name") == "set"
+
+
+def test_journal(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    storage = ChatHistoryFileStorage("123", "key")
+    storage.append({"role": "user", "content": "1"})
+    storage.append({"role": "user", "content": "2"})
+    storage.pop()
+    lines = (tmp_path / "filememory" / "key" / f"{storage.session_id}.jsonl").read_text().splitlines()
+    assert [json.loads(line)["op"] for line in lines] == ["append", "append", "pop"]
+
+
+def test_broken_record(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    storage = ChatHistoryFileStorage("123", "key")
+    storage.append({"role": "user", "content": "1"})
+    with open(f"filememory/key/{storage.session_id}.jsonl", "a") as f:
+        f.write('{"op": "append", "data": {"ro')  # crashed while writing
+    assert ChatHistoryFileStorage("123", "key", storage.session_id).messages() == [{"role": "user", "content": "1"}]
+
+
+def test_compaction(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(file_storage, "COMPACTION_THRESHOLD", 1000)
+    storage = ChatHistoryFileStorage("123", "key")
+    for i in range(100):
+        storage.append({"role": "user", "content": str(i)})
+        storage.set(-1, {"role": "user", "content": f"message {i}"})
+    path = tmp_path / "filememory" / "key" / f"{storage.session_id}.jsonl"
+    assert json.loads(path.read_text().splitlines()[0])["op"] == "restore"
+    assert len(path.read_text().splitlines()) < 200
+    assert ChatHistoryFileStorage("123", "key", storage.session_id).messages() == storage.messages()
+
+
+def test_legacy(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("filememory/key")
+    with open("filememory/key/legacy.json", "w") as f:
+        json.dump({"messages": [{"role": "user", "content": "old"}]}, f)
+    storage = ChatHistoryFileStorage("123", "key", "legacy")
+    assert storage.messages() == [{"role": "user", "content": "old"}]
+    assert storage.get_session_data("1") == {"messages": [{"role": "user", "content": "old"}]}
+
+    storage.append({"role": "user", "content": "new"})
+    assert not os.path.exists("filememory/key/legacy.json")
+    reloaded = ChatHistoryFileStorage("123", "key", "legacy")
+    assert reloaded.messages() == [{"role": "user", "content": "old"}, {"role": "user", "content": "new"}]
+    assert reloaded.get_session_data("legacy") == {"messages": reloaded.messages()}
@@ -0,0 +1,79 @@
+import glob
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.history.storage.file import ChatHistoryFileStorage  # noqa: E402
+from slashgpt.history.storage.layout import shard_of  # noqa: E402
+from slashgpt.history.storage.memory import ChatHistoryMemoryStorage  # noqa: E402
+
+pytestmark = pytest.mark.usefixtures("chdir")
+
+
+def test_shard_of():
+    assert shard_of("123") == "20"
+    assert len({shard_of(str(i)) for i in range(10000)}) == 256
+
+
+def test_file_storage():
+    storage = ChatHistoryFileStorage("123", "key", sharded=True)
+    storage.append({"role": "user", "content": "Hello"})
+    assert os.path.exists(f"filememory/key/{shard_of(storage.session_id)}/{storage.session_id}.jsonl")
+    # The layout is recorded, so that the other storages of the agent follow it
+    other = ChatHistoryFileStorage("123", "key")
+    other.append({"role": "user", "content": "Other"})
+    assert os.path.exists(f"filememory/key/{shard_of(other.session_id)}/{other.session_id}.jsonl")
+    assert glob.glob("filememory/key/*.jsonl") == []
+
+    assert [entry["title"] for entry in storage.session_list()] == ["Hello", "Other"]
+    assert storage.get_session_data("2") == {"messages": [{"role": "user", "content": "Other"}]}
+    assert ChatHistoryFileStorage("123", "key", storage.session_id).messages() == [{"role": "user", "content": "Hello"}]
+
+
+def test_relayout():
+    storages = [ChatHistoryFileStorage("123", "key") for _ in range(3)]
+    for i, storage in enumerate(storages):
+        storage.append({"role": "user", "content": f"session {i}"})
+    assert len(glob.glob("filememory/key/*.jsonl")) == 3
+
+    assert storages[0].relayout(True) == 3
+    assert glob.glob("filememory/key/*.jsonl") == []
+    for storage in storages:
+        entry = storage.catalog.find(storage.session_id)
+        assert entry["path"].endswith(f"/key/{shard_of(storage.session_id)}/{storage.session_id}.jsonl")
+        assert os.path.exists(entry["path"])
+    assert ChatHistoryFileStorage("123", "key", storages[1].session_id).messages() == [{"role": "user", "content": "session 1"}]
+
+    # An open session follows its file
+    storages[2].append({"role": "assistant", "content": "moved"})
+    assert storages[2].get_session_data(storages[2].session_id)["messages"][1] == {"role": "assistant", "content": "moved"}
+
+    assert storages[0].relayout(False) == 3
+    assert len(glob.glob("filememory/key/*.jsonl")) == 3
+    assert storages[0].get_session_data("3")["messages"][1] == {"role": "assistant", "content": "moved"}
+
+
+def test_memory_storage():
+    storage = ChatHistoryMemoryStorage("123", "key")
+    storage.append({"role": "user", "content": "flat"})
+    assert storage.relayout(True) == 1
+    sharded = ChatHistoryMemoryStorage("123", "key")
+    sharded.append({"role": "user", "content": "sharded"})
+    assert [entry["title"] for entry in sharded.session_list()] == ["flat", "sharded"]
+    assert glob.glob("output/key/*.json") == []
+    assert len(glob.glob("output/key/[0-9a-f][0-9a-f]/*.json")) == 2
+    assert sharded.get_session_data("1") == {"messages": [{"role": "user", "content": "flat"}]}
+
+
+def test_index_sharded_files():
+    os.makedirs(f"filememory/key/{shard_of('old')}")
+    with open(f"filememory/key/{shard_of('old')}/old.jsonl", "w") as f:
+        f.write(json.dumps({"op": "append", "data": {"role": "user", "content": "Hello"}}) + "\n")
+    storage = ChatHistoryFileStorage("123", "key", "old")
+    assert storage.messages() == [{"role": "user", "content": "Hello"}]
+    storage.catalog.wait_indexed()
+    assert storage.catalog.find("old")["title"] == "Hello"
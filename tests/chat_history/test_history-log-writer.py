@@ -0,0 +1,78 @@
+import json
+import os
+import sys
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.history.storage.log import LogWriter  # noqa: E402
+from slashgpt.history.storage.memory import ChatHistoryMemoryStorage  # noqa: E402
+
+
+class BlockingLogWriter(LogWriter):
+    def __init__(self, max_pending: int = 256):
+        super().__init__(max_pending)
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def _write(self, path: str, context: dict):
+        self.started.set()
+        self.release.wait()
+        super()._write(path, context)
+
+
+def read(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def test_coalesce(tmp_path):
+    writer = BlockingLogWriter()
+    path = str(tmp_path / "log.json")
+    writer.write(path, {"messages": [0]})
+    writer.started.wait()
+    # The first write is in progress. The following ones are coalesced into one.
+    for i in range(1, 100):
+        writer.write(path, {"messages": list(range(i + 1))})
+    writer.release.set()
+    writer.flush()
+    assert writer.writes == 2
+    assert read(path) == {"messages": list(range(100))}
+    writer.close()
+
+
+def test_close(tmp_path):
+    writer = LogWriter()
+    paths = [str(tmp_path / f"{i}.json") for i in range(10)]
+    for i, path in enumerate(paths):
+        writer.write(path, {"messages": [i]})
+    writer.close()
+    assert [read(path) for path in paths] == [{"messages": [i]} for i in range(10)]
+
+    # Written synchronously after close
+    writer.write(paths[0], {"messages": []})
+    assert read(paths[0]) == {"messages": []}
+
+
+def test_bounded(tmp_path):
+    writer = BlockingLogWriter(max_pending=1)
+    writer.write(str(tmp_path / "0.json"), {})
+    writer.started.wait()
+    writer.write(str(tmp_path / "1.json"), {})
+    blocked = threading.Thread(target=writer.write, args=(str(tmp_path / "2.json"), {}))
+    blocked.start()
+    blocked.join(0.1)
+    assert blocked.is_alive()
+    writer.release.set()
+    blocked.join()
+    writer.close()
+    assert writer.writes == 3
+
+
+def test_memory_storage(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    storage = ChatHistoryMemoryStorage("123", "key")
+    storage.append({"role": "user", "content": "1"})
+    storage.append({"role": "assistant", "content": "2"})
+    storage.flush()
+    assert read(storage.log_path) == {"messages": [{"role": "user", "content": "1"}, {"role": "assistant", "content": "2"}]}
@@ -0,0 +1,141 @@
+import glob
+import json
+import os
+import sys
+import time
+from typing import List
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.chat_app import ChatApplication  # noqa: E402
+from slashgpt.chat_config_with_manifests import ChatConfigWithManifests  # noqa: E402
+from slashgpt.history.storage.file import ChatHistoryFileStorage  # noqa: E402
+from slashgpt.history.storage.memory import ChatHistoryMemoryStorage  # noqa: E402
+from slashgpt.history.storage.retention import RetentionPolicy, RetentionSweeper  # noqa: E402
+from slashgpt.llms.engine.base import LLMEngineBase  # noqa: E402
+from slashgpt.manifest import Manifest  # noqa: E402
+
+pytestmark = pytest.mark.usefixtures("chdir")
+
+
+def create_session(uid: str, content: str):
+    storage = ChatHistoryFileStorage(uid, "key")
+    storage.append({"role": "user", "content": content})
+    return storage
+
+
+def titles(storage):
+    return [entry["title"] for entry in storage.session_list()]
+
+
+def test_from_dict():
+    assert RetentionPolicy.from_dict(None) is None
+    assert RetentionPolicy.from_dict({"max_age_days": None}) is None
+    assert RetentionPolicy.from_dict({"max_age_days": 2, "max_bytes": 100}) == RetentionPolicy(max_age=2 * 24 * 60 * 60, max_bytes=100)
+
+
+def test_max_age():
+    storage = create_session("a", "old")
+    cutoff = time.time()
+    create_session("a", "new")
+    assert storage.sweep(RetentionPolicy(max_age=60)) == 0
+    assert [entry["title"] for entry in storage.catalog.sweep(RetentionPolicy(max_age=0), now=cutoff)] == ["old"]
+    assert titles(storage) == ["new"]
+    assert not os.path.exists(f"filememory/key/{storage.session_id}.jsonl")
+
+
+def test_max_sessions_per_user():
+    storages = [create_session(uid, f"{uid}{i}") for i in range(3) for uid in ("a", "b", "c")[: 3 - i]]
+    storage = storages[0]
+    assert titles(storage) == ["a0", "b0", "c0", "a1", "b1", "a2"]
+    assert storage.sweep(RetentionPolicy(max_sessions_per_user=2), limit=1) == 1
+    assert storage.sweep(RetentionPolicy(max_sessions_per_user=1)) == 2
+    assert storage.sweep(RetentionPolicy(max_sessions_per_user=1)) == 0
+    assert titles(storage) == ["c0", "b1", "a2"]
+    assert len(glob.glob("filememory/key/*.jsonl")) == 3
+    assert len(glob.glob("filememory/key/.locks/*/*.lock")) == 3
+
+
+def test_max_bytes():
+    storages = [create_session("a", f"session {i}") for i in range(4)]
+    size = storages[0].catalog.find(storages[0].session_id)["size"]
+    assert storages[0].sweep(RetentionPolicy(max_bytes=size * 4)) == 0
+    assert storages[0].sweep(RetentionPolicy(max_bytes=size * 2 + 1)) == 2
+    assert titles(storages[0]) == ["session 2", "session 3"]
+
+
+def test_archived():
+    storages = [create_session("a", f"session {i}") for i in range(3)]
+    storages[0].catalog.archive_storage.segment_size = 1
+    assert storages[0].archive(-1) == 3
+    assert len(glob.glob("filememory/key/.archive/segment-*.z")) == 3
+    assert storages[0].sweep(RetentionPolicy(max_sessions_per_user=1)) == 2
+    # The segments no longer referenced are removed
+    assert len(glob.glob("filememory/key/.archive/segment-*.z")) == 1
+    assert storages[0].get_session_data("3")["messages"] == [{"role": "user", "content": "session 2"}]
+    # New segments do not overwrite the remaining one
+    storages[1].append({"role": "user", "content": "again"})
+    assert storages[1].archive(-1) == 1
+    assert storages[0].get_session_data("3")["messages"] == [{"role": "user", "content": "session 2"}]
+
+
+def test_sweeper():
+    storage = ChatHistoryMemoryStorage("a", "key")
+    storage.append({"role": "user", "content": "first"})
+    for i in range(3):
+        ChatHistoryMemoryStorage("a", "key").append({"role": "user", "content": f"session {i}"})
+    storage.flush()
+    sweeper = RetentionSweeper.start_for(ChatHistoryMemoryStorage, "key", RetentionPolicy(max_sessions_per_user=2), interval=60)
+    assert RetentionSweeper.start_for(ChatHistoryMemoryStorage, "key", RetentionPolicy(max_sessions_per_user=2)) is sweeper
+    deadline = time.time() + 10
+    while sweeper.deleted < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    sweeper.stop()
+    assert titles(storage) == ["session 1", "session 2"]
+    assert len(glob.glob("output/key/*.json")) == 2
+
+
+def test_start_for_manifest():
+    # As server.py does for the file storages it creates for each request
+    for i in range(3):
+        create_session("a", f"session {i}")
+    manifest = {"retention": {"max_sessions_per_user": 1}}
+    sweeper = RetentionSweeper.start_for_manifest(ChatHistoryFileStorage, "key", manifest, interval=60)
+    assert sweeper and RetentionSweeper.start_for_manifest(ChatHistoryFileStorage, "key", manifest) is sweeper
+    deadline = time.time() + 10
+    while sweeper.deleted < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    assert titles(ChatHistoryFileStorage("a", "key")) == ["session 2"]
+    # Without limits, the sweeper is stopped
+    assert RetentionSweeper.start_for_manifest(ChatHistoryFileStorage, "key", {}) is None
+    assert not sweeper.is_running()
+
+
+class MockLlmEngine(LLMEngineBase):
+    def chat_completion(self, messages: List[dict], manifest: Manifest, verbose: bool):
+        return ("assistant", "Hi", None, 0)
+
+
+def test_application(tmp_path):
+    os.makedirs("manifests")
+    model = {"engine_name": "mock_engine", "model_name": "mock_model"}
+    with open("manifests/limited.json", "w") as f:
+        json.dump({"model": model, "retention": {"max_sessions_per_user": 2}}, f)
+    with open("manifests/unlimited.json", "w") as f:
+        json.dump({"model": model}, f)
+    config = ChatConfigWithManifests(str(tmp_path), "manifests", llm_engine_configs={"mock_engine": MockLlmEngine})
+    app = ChatApplication(config, model=config.get_llm_model_from_manifest(Manifest({"model": model})))
+
+    # The sweeper is started once per agent, and does not keep the storage of the session
+    app.switch_session("limited")
+    sweeper = app.sweepers["limited"]
+    app.switch_session("limited")
+    app.switch_session("unlimited")
+    try:
+        assert app.sweepers == {"limited": sweeper, "unlimited": None}
+        assert (sweeper.storage_class, sweeper.agent_name) == (ChatHistoryMemoryStorage, "limited")
+        assert sweeper.is_running() and not hasattr(sweeper, "storage")
+    finally:
+        sweeper.stop()
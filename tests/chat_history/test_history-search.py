@@ -0,0 +1,158 @@
+import json
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.chat_history import ChatHistory  # noqa: E402
+from slashgpt.history.storage.file import ChatHistoryFileStorage  # noqa: E402
+from slashgpt.history.storage.memory import ChatHistoryMemoryStorage  # noqa: E402
+from slashgpt.history.storage.retention import RetentionPolicy  # noqa: E402
+from slashgpt.history.storage.search import RANKED_CANDIDATES, SessionSearchIndex  # noqa: E402
+
+pytestmark = pytest.mark.usefixtures("chdir")
+
+
+def create_session(messages):
+    storage = ChatHistoryFileStorage("123", "key")
+    for message in messages:
+        storage.append(message)
+    return storage
+
+
+def test_search():
+    first = create_session(
+        [
+            {"role": "system", "content": "You are a weather bot", "preset": True},
+            {"role": "user", "content": "What is the weather in Tokyo?"},
+            {"role": "assistant", "content": "It is sunny in Tokyo."},
+        ]
+    )
+    second = create_session([{"role": "user", "content": "Tell me about the weather of Osaka"}])
+    history = ChatHistory(first)
+
+    hits = history.search("tokyo")
+    assert sorted((hit["session_id"], hit["seq"], hit["role"], hit["id"], hit["title"]) for hit in hits) == [
+        (first.session_id, 1, "user", 1, "What is the weather in Tokyo?"),
+        (first.session_id, 2, "assistant", 1, "What is the weather in Tokyo?"),
+    ]
+    assert hits[0]["score"] <= hits[1]["score"]
+    assert "[Tokyo]" in hits[0]["snippet"]
+    assert {hit["session_id"] for hit in history.search("weather")} == {first.session_id, second.session_id}
+    # All the terms must match
+    assert [hit["session_id"] for hit in history.search("weather osaka")] == [second.session_id]
+    # Preset messages are not indexed
+    assert history.search("bot") == []
+    assert history.search("") == []
+    assert history.search('"unbalanced OR') == []
+
+
+def test_ranking():
+    # The best match is found even if it is older than many other matches
+    best = create_session([{"role": "user", "content": "apple apple apple"}])
+    create_session([{"role": "user", "content": f"an apple in a long message number {i} about something else"} for i in range(300)])
+    hits = best.search("apple", 3)
+    assert [(hit["session_id"], hit["seq"]) for hit in hits][0] == (best.session_id, 0)
+    assert len(hits) == 3 and hits[0]["score"] < hits[1]["score"]
+
+
+def test_document_frequency():
+    # The document frequencies are those in the whole index, estimated for the terms with many matches
+    storage = create_session([{"role": "user", "content": "apple banana banana"}, {"role": "user", "content": "apple apple banana"}])
+    storage.catalog.search_index.index("other", 0, [{"role": "user", "content": f"apple {i}"} for i in range(RANKED_CANDIDATES + 100)])
+    hits = storage.search("apple banana")
+    assert [(hit["session_id"], hit["seq"]) for hit in hits] == [(storage.session_id, 0), (storage.session_id, 1)]
+
+
+def test_without_fts5(monkeypatch, capsys):
+    def create(self):
+        raise sqlite3.OperationalError("no such tokenizer: trigram")
+
+    monkeypatch.setattr(SessionSearchIndex, "create", create)
+    storage = ChatHistoryMemoryStorage("123", "key")
+    storage.append({"role": "user", "content": "apple"})
+    assert storage.search("apple") == []
+    assert "full-text search is disabled" in capsys.readouterr().out
+
+
+def test_japanese():
+    storage = create_session([{"role": "user", "content": "今日の東京の天気は晴れです"}])
+    assert [hit["seq"] for hit in storage.search("東京の天気")] == [0]
+    # Terms too short for the index are matched as substrings
+    assert [hit["seq"] for hit in storage.search("天気")] == [0]
+    assert storage.search("大阪") == []
+
+
+def test_updates():
+    storage = create_session([{"role": "user", "content": "apple"}, {"role": "user", "content": "banana"}])
+    storage.set(0, {"role": "user", "content": "cherry"})
+    assert storage.search("apple") == []
+    assert [hit["seq"] for hit in storage.search("cherry")] == [0]
+    storage.pop()
+    assert storage.search("banana") == []
+    storage.append({"role": "user", "content": "durian"})
+    assert [hit["seq"] for hit in storage.search("durian")] == [1]
+    storage.restore([{"role": "user", "content": "elderberry"}])
+    assert storage.search("cherry") == [] and storage.search("durian") == []
+    assert [hit["seq"] for hit in storage.search("elderberry")] == [0]
+
+    # Deleted sessions are removed from the index
+    assert storage.sweep(RetentionPolicy(max_sessions_per_user=0)) == 1
+    assert storage.search("elderberry") == []
+
+
+def test_memory_storage():
+    storage = ChatHistoryMemoryStorage("123", "key")
+    storage.append({"role": "user", "content": "apple"})
+    storage.append({"role": "assistant", "content": "banana"})
+    storage.pop()
+    storage.append({"role": "assistant", "content": "cherry"})
+    assert [hit["seq"] for hit in storage.search("apple")] == [0]
+    assert storage.search("banana") == []
+    assert [hit["seq"] for hit in storage.search("cherry")] == [1]
+    storage.set(0, {"role": "user", "content": "durian"})
+    storage.append({"role": "user", "content": "elderberry"})
+    assert storage.search("apple") == []
+    assert [hit["seq"] for hit in storage.search("durian")] == [0]
+
+
+def test_memory_storage_behind():
+    # The changes are queued for the writer thread, so none is lost if they are made while it indexes
+    storage = ChatHistoryMemoryStorage("123", "key")
+    for i in range(200):
+        storage.append({"role": "user", "content": f"kept {i}"})
+        storage.append({"role": "assistant", "content": f"popped {i}"})
+        storage.pop()
+    storage.append({"role": "user", "content": "last"})
+    assert storage.search("popped") == []
+    assert sorted(hit["seq"] for hit in storage.search("kept", 1000)) == list(range(200))
+
+
+def test_existing_sessions():
+    os.makedirs("filememory/key")
+    with open("filememory/key/old.json", "w") as f:
+        json.dump({"messages": [{"role": "user", "content": "legacy session"}]}, f)
+    storage = ChatHistoryFileStorage("123", "key")
+    assert [hit["session_id"] for hit in storage.search("legacy")] == ["old"]
+
+
+def test_catalog_without_index():
+    # A catalog created by an older version gets the index when it is opened
+    os.makedirs("filememory/key")
+    with open("filememory/key/old.jsonl", "w") as f:
+        f.write(json.dumps({"op": "append", "data": {"role": "user", "content": "indexed later"}}) + "\n")
+    connection = sqlite3.connect("filememory/key/.catalog.sqlite3")
+    connection.execute(
+        "CREATE TABLE catalog (id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL UNIQUE, uid TEXT, path TEXT NOT NULL,"
+        " created_at REAL NOT NULL, updated_at REAL NOT NULL, message_count INTEGER NOT NULL DEFAULT 0, size INTEGER NOT NULL DEFAULT 0, title TEXT)"
+    )
+    connection.execute(
+        "INSERT INTO catalog (session_id, path, created_at, updated_at) VALUES ('old', ?, 0, 0)", (os.path.abspath("filememory/key/old.jsonl"),)
+    )
+    connection.commit()
+    connection.close()
+    storage = ChatHistoryFileStorage("123", "key")
+    assert [hit["session_id"] for hit in storage.search("indexed")] == ["old"]
@@ -0,0 +1,97 @@
+import multiprocessing
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.chat_history import ChatHistory  # noqa: E402
+from slashgpt.history.storage.sqlite import ChatHistorySQLiteStorage  # noqa: E402
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "history.sqlite3")
+
+
+@pytest.fixture
+def history(db_path):
+    history = ChatHistory(ChatHistorySQLiteStorage("123", "key", db_path=db_path))
+    for i in range(1, 6):
+        history.append_message({"name": str(i), "content": str(i)})
+    return history
+
+
+def test_get1(history):
+    assert history.get_message(0).get("name") == "1"
+
+
+def test_set(history):
+    data = {"name": "set", "content": "set_data", "role": None}
+    history.set_message(2, data)
+    assert history.get_message(2) == data
+
+
+def test_last(history):
+    assert history.last_message() == {"name": "5", "content": "5", "role": None}
+
+
+def test_reload(history, db_path):
+    history.set_message(1, {"name": "set", "content": "set_data"})
+    history.pop_message()
+    reloaded = ChatHistory(ChatHistorySQLiteStorage("123", "key", history.repository.session_id, db_path))
+    assert reloaded.len_messages() == 4
+    assert reloaded.messages() == history.messages()
+    assert reloaded.get_message_prop(1, "name") == "set"
+
+
+def test_restore(history, db_path):
+    history.restore([{"role": "user", "content": "restored"}])
+    reloaded = ChatHistorySQLiteStorage("123", "key", history.repository.session_id, db_path)
+    assert reloaded.messages() == [{"role": "user", "content": "restored"}]
+
+
+def test_sessions(history, db_path):
+    other = ChatHistorySQLiteStorage("123", "key", db_path=db_path)
+    other.append({"role": "user", "content": "other"})
+    ChatHistorySQLiteStorage("456", "key", db_path=db_path).append({"role": "user", "content": "another user"})
+
+    sessions = other.session_list()
+    assert sessions == [{"name": history.repository.session_id, "id": 1}, {"name": other.session_id, "id": 2}]
+    assert other.session_list(1, 5) == sessions[1:]
+    assert other.get_session_data("2") == {"messages": [{"role": "user", "content": "other"}]}
+    assert other.get_session_data(history.repository.session_id)["messages"][0]["name"] == "1"
+    assert other.get_session_data("3") is None  # the session of the other user
+
+
+def test_concurrent_append(history, db_path):
+    # Another process appends to the same session
+    other = ChatHistorySQLiteStorage("123", "key", history.repository.session_id, db_path)
+    other.append({"role": "user", "content": "other"})
+    history.append_message({"role": "user", "content": "this"})
+    history.pop_message()
+    history.set_message(4, {"role": "user", "content": "set"})
+    reloaded = ChatHistorySQLiteStorage("123", "key", history.repository.session_id, db_path)
+    assert [m["content"] for m in reloaded.messages()] == ["1", "2", "3", "4", "set", "other"]
+
+
+def write_session(db_path: str, worker: int):
+    for session in range(10):
+        storage = ChatHistorySQLiteStorage("123", "key", db_path=db_path)
+        for i in range(10):
+            storage.append({"role": "user", "content": f"{worker}-{session}-{i}"})
+
+
+def test_processes(db_path):
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=write_session, args=(db_path, worker)) for worker in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+    storage = ChatHistorySQLiteStorage("123", "key", db_path=db_path)
+    sessions = storage.session_list()
+    assert len(sessions) == 40
+    assert all(len(storage.get_session_data(session["name"])["messages"]) == 10 for session in sessions)
@@ -0,0 +1,69 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.chat_history import ChatHistory  # noqa: E402
+from slashgpt.history.storage.memory import ChatHistoryMemoryStorage  # noqa: E402
+
+
+class WordCounter:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, text: str):
+        self.calls += 1
+        return len(text.split())
+
+
+@pytest.fixture
+def counter():
+    return WordCounter()
+
+
+@pytest.fixture
+def history(counter):
+    history = ChatHistory(ChatHistoryMemoryStorage("123", "key"), counter)
+    history.append_message({"role": "system", "content": "one two three"})
+    history.append_message({"role": "user", "content": "four five"})
+    return history
+
+
+def recount(history):
+    return sum(3 + len((m.get("content") or "").split()) + (1 + len(m["name"].split()) if m.get("name") else 0) for m in history.messages())
+
+
+def test_num_tokens(history):
+    assert history.num_tokens() == 3 + 3 + 3 + 2
+    assert history.message_tokens(1) == 3 + 2
+
+
+def test_incremental(history, counter):
+    history.num_tokens()
+    calls = counter.calls
+    history.append_message({"role": "assistant", "content": "six"})
+    assert history.num_tokens() == recount(history)
+    assert counter.calls == calls + 1
+    assert history.num_tokens() == recount(history)
+    assert counter.calls == calls + 1
+
+
+def test_set_pop(history):
+    history.num_tokens()
+    history.set_message(0, {"role": "system", "content": "one"})
+    assert history.num_tokens() == recount(history)
+    history.append_message({"role": "function", "content": "result", "name": "play"})
+    assert history.num_tokens() == recount(history)
+    history.pop_message()
+    assert history.num_tokens() == recount(history)
+    history.pop_message()
+    history.set_message(-1, {"role": "system", "content": "a b c d"})
+    assert history.num_tokens() == recount(history)
+
+
+def test_restore(history):
+    history.num_tokens()
+    history.restore([{"role": "user", "content": "a b"}])
+    assert history.num_tokens() == recount(history)
@@ -0,0 +1,74 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.chat_history import ChatHistory  # noqa: E402
+from slashgpt.history.storage.memory import ChatHistoryMemoryStorage  # noqa: E402
+
+
+class CountingStorage(ChatHistoryMemoryStorage):
+    def __init__(self, uid: str, agent_name: str):
+        super().__init__(uid, agent_name)
+        self.gets = 0
+
+    def get(self, index: int):
+        self.gets += 1
+        return super().get(index)
+
+
+@pytest.fixture
+def history():
+    history = ChatHistory(CountingStorage("123", "key"))
+    history.append_message({"role": "system", "content": "prompt", "preset": True})
+    history.append_message({"role": "user", "content": "1", "name": "you", "preset": False})
+    history.append_message({"role": "assistant", "content": "2", "preset": False})
+    return history
+
+
+def test_view(history):
+    view = history.messages_view()
+    assert view == [{"role": "system", "content": "prompt"}, {"role": "user", "content": "1", "name": "you"}, {"role": "assistant", "content": "2"}]
+    assert history.messages() == view
+    assert history.messages() is not view
+    assert history.messages_view() is view
+
+
+def test_incremental(history):
+    history.messages_view()
+    gets = history.repository.gets
+    history.append_message({"role": "user", "content": "3"})
+    assert history.messages_view()[-1] == {"role": "user", "content": "3"}
+    # Only the new message is mapped
+    assert history.repository.gets == gets + 1
+    history.messages_view()
+    assert history.repository.gets == gets + 1
+
+
+def test_set_and_pop(history):
+    history.messages_view()
+    history.set_message(1, {"role": "user", "content": "one", "preset": True})
+    assert history.messages_view()[1] == {"role": "user", "content": "one"}
+    assert history.preset_messages() == [{"role": "system", "content": "prompt"}, {"role": "user", "content": "one"}]
+    assert history.nonpreset_messages() == [{"role": "assistant", "content": "2"}]
+
+    history.pop_message()
+    history.pop_message()
+    assert history.messages_view() == [{"role": "system", "content": "prompt"}]
+    assert history.preset_messages() == [{"role": "system", "content": "prompt"}]
+
+
+def test_restore(history):
+    history.messages_view()
+    history.restore([{"role": "user", "content": "restored"}])
+    assert history.messages_view() == [{"role": "user", "content": "restored"}]
+    assert history.preset_messages() == []
+
+
+def test_repository_modified_directly(history):
+    history.messages_view()
+    history.repository.pop()
+    history.repository.pop()
+    assert history.messages_view() == [{"role": "system", "content": "prompt"}]
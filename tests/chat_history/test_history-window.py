@@ -0,0 +1,102 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.chat_history import ChatHistory  # noqa: E402
+from slashgpt.history.storage.memory import ChatHistoryMemoryStorage  # noqa: E402
+from slashgpt.history.window import SUMMARY_PREFIX, HistoryWindow  # noqa: E402
+from slashgpt.manifest import Manifest  # noqa: E402
+
+
+class MockLlmModel:
+    def __init__(self):
+        self.summaries = 0
+
+    def max_token(self):
+        return 4096
+
+    def num_tokens(self, text: str):
+        return len(text.split())
+
+    def generate_response(self, messages, manifest, verbose):
+        self.summaries += 1
+        return ("assistant", f"summary {self.summaries}", None, 10)
+
+    async def agenerate_response(self, messages, manifest, verbose):
+        return self.generate_response(messages, manifest, verbose)
+
+
+@pytest.fixture
+def llm_model():
+    return MockLlmModel()
+
+
+@pytest.fixture
+def history(llm_model):
+    history = ChatHistory(ChatHistoryMemoryStorage("123", "key"), llm_model.num_tokens)
+    history.append_message({"role": "system", "content": "you are a bot", "preset": True})
+    for i in range(10):
+        history.append_message({"role": "user", "content": f"question {i}"})
+        history.append_message({"role": "assistant", "content": f"answer {i}"})
+    return history
+
+
+def contents(messages):
+    return [message.get("content") for message in messages]
+
+
+def test_all(history, llm_model):
+    window = HistoryWindow.factory(Manifest({}))
+    assert window.messages(history, llm_model) == history.messages()
+
+
+def test_invalid():
+    with pytest.raises(ValueError):
+        HistoryWindow.factory(Manifest({"history_type": "unknown"}))
+
+
+def test_turns(history, llm_model):
+    window = HistoryWindow.factory(Manifest({"history_type": "turns", "history_turns": 2}))
+    assert contents(window.messages(history, llm_model)) == ["you are a bot", "question 8", "answer 8", "question 9", "answer 9"]
+
+
+def test_tokens(history, llm_model):
+    # Each message is 3 + 2 tokens, and the system message is 3 + 4 tokens
+    window = HistoryWindow.factory(Manifest({"history_type": "tokens", "history_max_tokens": 7 + 5 * 3}))
+    assert contents(window.messages(history, llm_model)) == ["you are a bot", "answer 8", "question 9", "answer 9"]
+
+
+def test_tokens_keeps_last_message(history, llm_model):
+    window = HistoryWindow.factory(Manifest({"history_type": "tokens", "history_max_tokens": 1}))
+    assert contents(window.messages(history, llm_model)) == ["you are a bot", "answer 9"]
+
+
+def test_tokens_preset(history, llm_model):
+    history.set_message(1, {"role": "user", "content": "question 0", "preset": True})
+    window = HistoryWindow.factory(Manifest({"history_type": "tokens", "history_max_tokens": 7 + 5 * 2}))
+    assert contents(window.messages(history, llm_model)) == ["you are a bot", "question 0", "answer 9"]
+
+
+def test_summary(history, llm_model):
+    window = HistoryWindow.factory(Manifest({"history_type": "summary", "history_max_tokens": 7 + 5 * 4 + 3}))
+    messages = window.messages(history, llm_model)
+    assert contents(messages) == ["you are a bot", SUMMARY_PREFIX + "summary 1", "question 8", "answer 8", "question 9", "answer 9"]
+    assert llm_model.summaries == 1
+
+    # The summary is reused while no more messages drop out of the window
+    assert window.messages(history, llm_model) == messages
+    assert llm_model.summaries == 1
+
+    history.append_message({"role": "user", "content": "question 10"})
+    assert contents(window.messages(history, llm_model))[1] == SUMMARY_PREFIX + "summary 2"
+    assert llm_model.summaries == 2
+
+
+def test_summary_async(history, llm_model):
+    window = HistoryWindow.factory(Manifest({"history_type": "summary", "history_max_tokens": 7 + 5 * 4 + 3}))
+    messages = asyncio.run(window.amessages(history, llm_model))
+    assert contents(messages)[1] == SUMMARY_PREFIX + "summary 1"
@@ -0,0 +1,15 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Keeps the caches (e.g. that of the manifests) of every test in tmp_path/cache, instead of ~/.cache/slashgpt"""
+    monkeypatch.setenv("SLASHGPT_CACHE_DIR", str(tmp_path / "cache"))
+    return tmp_path / "cache"
+
+
+@pytest.fixture
+def chdir(tmp_path, monkeypatch):
+    """Runs the test in tmp_path, for the storages writing under the current directory (e.g. filememory/ and output/).
+    Use it with pytestmark = pytest.mark.usefixtures("chdir")."""
+    monkeypatch.chdir(tmp_path)
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import os
+import sys
+from typing import List
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.chat_app import ChatApplication  # noqa: E402
+from slashgpt.chat_config import ChatConfig  # noqa: E402
+from slashgpt.chat_config_with_manifests import ChatConfigWithManifests  # noqa: E402
+from slashgpt.chat_session import ChatSession  # noqa: E402
+from slashgpt.llms.engine.base import LLMEngineBase  # noqa: E402
+from slashgpt.manifest import Manifest  # noqa: E402
+
+current_dir = os.path.dirname(__file__)
+
+
+class MockLlmEngine(LLMEngineBase):
+    def chat_completion(self, messages: List[dict], manifest: Manifest, verbose: bool):
+        return ("assistant", f"sync: {messages[-1].get('content')}", None, 0)
+
+
+class MockAsyncLlmEngine(MockLlmEngine):
+    async def achat_completion(self, messages: List[dict], manifest: Manifest, verbose: bool):
+        await asyncio.sleep(0.01)
+        return ("assistant", f"async: {messages[-1].get('content')}", None, 0)
+
+
+config = ChatConfig(
+    current_dir,
+    llm_engine_configs={
+        "mock_engine": MockLlmEngine,
+        "mock_async_engine": MockAsyncLlmEngine,
+    },
+)
+
+
+def manifest(engine_name: str):
+    return {"model": {"engine_name": engine_name, "model_name": "mock_model"}}
+
+
+def test_acall_llm():
+    session = ChatSession(config, manifest=manifest("mock_async_engine"))
+    session.append_user_question("Hi")
+    (message, _function_call, _) = asyncio.run(session.acall_llm())
+    assert message == "async: Hi"
+    assert session.history.last_message() == {"role": "assistant", "content": "async: Hi"}
+
+
+def test_acall_llm_fallback():
+    # Engines without a native async client run chat_completion in a worker thread
+    session = ChatSession(config, manifest=manifest("mock_engine"))
+    session.append_user_question("Hi")
+    (message, _function_call, _) = asyncio.run(session.acall_llm())
+    assert message == "sync: Hi"
+
+
+def test_acall_loop_concurrent():
+    sessions = [ChatSession(config, manifest=manifest("mock_async_engine")) for _ in range(100)]
+    events: List[tuple] = []
+
+    async def callback(callback_type, data):
+        events.append((callback_type, data))
+
+    async def run():
+        for i, session in enumerate(sessions):
+            session.append_user_question(str(i))
+        await asyncio.gather(*(session.acall_loop(callback) for session in sessions))
+
+    asyncio.run(run())
+    assert sorted(events) == sorted(("bot", f"async: {i}") for i in range(100))
+
+
+def test_aprocess_llm():
+    events: List[tuple] = []
+    model = config.get_llm_model_from_manifest(Manifest(manifest("mock_async_engine")))
+    app = ChatApplication(config, lambda callback_type, data: events.append((callback_type, data)), model=model)
+    app.session = ChatSession(config, manifest=manifest("mock_async_engine"))
+    app.session.append_user_question("Hi")
+    asyncio.run(app.aprocess_llm())
+    assert events == [("bot", "async: Hi")]
+
+
+def test_process_event(tmp_path, monkeypatch):
+    # Both paths share the handling of the emitted actions, and call the LLM in their own way
+    monkeypatch.setenv("SLASHGPT_CACHE_DIR", str(tmp_path / "cache"))
+    os.makedirs(tmp_path / "manifests")
+    for name, engine_name in [("sync_agent", "mock_engine"), ("async_agent", "mock_async_engine")]:
+        with open(tmp_path / "manifests" / f"{name}.json", "w") as f:
+            json.dump(manifest(engine_name), f)
+    app_config = ChatConfigWithManifests(current_dir, str(tmp_path / "manifests"), llm_engine_configs=config.llm_engine_configs)
+    events: List[tuple] = []
+    model = app_config.get_llm_model_from_manifest(Manifest(manifest("mock_engine")))
+    app = ChatApplication(app_config, lambda callback_type, data: events.append((callback_type, data)), model=model)
+
+    app._process_event("emit", ("switch_session", {"agent": "sync_agent", "message": "Hi"}))
+    asyncio.run(app._aprocess_event("emit", ("switch_session", {"agent": "async_agent", "message": "Hello"})))
+    asyncio.run(app._aprocess_event("emit", ("switch_session", {"agent": "async_agent"})))
+    assert [data for (callback_type, data) in events if callback_type == "bot"] == ["sync: Hi", "async: Hello"]
+    assert app.session.agent_name == "async_agent"
@@ -0,0 +1,85 @@
+import asyncio
+import os
+import sys
+import time
+from typing import List
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.chat_batch import ChatBatchRunner  # noqa: E402
+from slashgpt.chat_config import ChatConfig  # noqa: E402
+from slashgpt.llms.engine.base import LLMEngineBase  # noqa: E402
+from slashgpt.manifest import Manifest  # noqa: E402
+
+current_dir = os.path.dirname(__file__)
+
+
+class StatusError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+class MockLlmEngine(LLMEngineBase):
+    in_flight = 0
+    max_in_flight = 0
+    failures: dict = {}
+
+    def chat_completion(self, messages: List[dict], manifest: Manifest, verbose: bool):
+        raise NotImplementedError
+
+    async def achat_completion(self, messages: List[dict], manifest: Manifest, verbose: bool):
+        MockLlmEngine.in_flight += 1
+        MockLlmEngine.max_in_flight = max(MockLlmEngine.max_in_flight, MockLlmEngine.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            question = messages[-1]["content"]
+            status_codes = MockLlmEngine.failures.get(question)
+            if status_codes:
+                raise StatusError(status_codes.pop(0))
+            return ("assistant", f"{messages[0]['content']}: {question}", None, 5)
+        finally:
+            MockLlmEngine.in_flight -= 1
+
+
+config = ChatConfig(current_dir, llm_engine_configs={"mock_engine": MockLlmEngine})
+manifest = {"model": {"engine_name": "mock_engine", "model_name": "mock_model"}, "prompt": "prompt"}
+
+
+def jobs(count: int):
+    return [(manifest, [{"role": "user", "content": str(i)}]) for i in range(count)]
+
+
+def test_order():
+    MockLlmEngine.max_in_flight = 0
+    results = ChatBatchRunner(config, limits={"mock_engine": {"concurrency": 4}}).run(jobs(20))
+    assert [result.res for result in results] == [f"prompt: {i}" for i in range(20)]
+    assert all(result.token_usage == 5 and result.attempts == 1 and result.latency > 0 for result in results)
+    assert MockLlmEngine.max_in_flight == 4
+
+
+def test_retry():
+    MockLlmEngine.failures = {"1": [429, 503], "2": [400]}
+    results = ChatBatchRunner(config, backoff=0.001).run(jobs(3))
+    assert results[0].res == "prompt: 0"
+    assert results[1].res == "prompt: 1"
+    assert results[1].attempts == 3
+    assert results[2].res is None
+    assert results[2].attempts == 1
+    assert isinstance(results[2].error, StatusError)
+
+
+def test_rate_limit():
+    limits = {"mock_engine": {"rpm": 5, "period": 0.2}}
+    start = time.perf_counter()
+    results = ChatBatchRunner(config, limits=limits).run(jobs(10))
+    assert time.perf_counter() - start >= 0.2
+    assert all(result.error is None for result in results)
+
+
+def test_token_limit():
+    limits = {"mock_engine": {"tpm": 10, "period": 0.2}}
+    start = time.perf_counter()
+    results = ChatBatchRunner(config, limits=limits, token_estimator=lambda llm_model, messages: 5).run(jobs(4))
+    assert time.perf_counter() - start >= 0.2
+    assert all(result.error is None for result in results)
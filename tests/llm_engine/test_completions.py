@@ -0,0 +1,99 @@
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.chat_config import ChatConfig  # noqa: E402
+from slashgpt.chat_session import ChatSession  # noqa: E402
+from slashgpt.llms.completion import completion_scorers  # noqa: E402
+from slashgpt.llms.engine.openai_gpt import LLMEngineOpenAIGPT  # noqa: E402
+
+current_dir = os.path.dirname(__file__)
+
+
+def choice(index, content=None, name=None, arguments=None):
+    function_call = {"name": name, "arguments": arguments} if name else None
+    message = SimpleNamespace(role="assistant", content=content, function_call=function_call)
+    return SimpleNamespace(index=index, message=message)
+
+
+class MockCompletions:
+    def create(self, **params):
+        assert params["n"] == len(LLMEngineOpenAIGPTMock.choices)
+        usage = SimpleNamespace(total_tokens=100)
+        return SimpleNamespace(choices=LLMEngineOpenAIGPTMock.choices, usage=usage)
+
+
+class LLMEngineOpenAIGPTMock(LLMEngineOpenAIGPT):
+    choices: list = []
+
+    def __init__(self, llm_model):
+        os.environ.setdefault("SLASHGPT_TEST_API_KEY", "TEST")
+        super().__init__(llm_model)
+        self.client = SimpleNamespace(chat=SimpleNamespace(completions=MockCompletions()))
+
+
+config = ChatConfig(current_dir, llm_engine_configs={"openai-gpt-mock": LLMEngineOpenAIGPTMock})
+
+mock_model = {
+    "engine_name": "openai-gpt-mock",
+    "model_name": "gpt-3.5-turbo-0613",
+    "api_key": "SLASHGPT_TEST_API_KEY",
+}
+
+functions = [{"name": "play", "parameters": {"type": "object", "properties": {"title": {"type": "string"}}}}]
+
+
+def call(strategy=None):
+    manifest = {"model": mock_model, "num_completions": len(LLMEngineOpenAIGPTMock.choices), "functions": functions}
+    if strategy:
+        manifest["completion_strategy"] = strategy
+    session = ChatSession(config, manifest=manifest)
+    session.append_user_question("Hi")
+    return session.call_llm()
+
+
+def test_all_candidates():
+    LLMEngineOpenAIGPTMock.choices = [choice(1, "World"), choice(0, "Hello")]
+    session = ChatSession(config, manifest={"model": mock_model, "num_completions": 2})
+    session.append_user_question("Hi")
+    (candidates, token_usage) = session.llm_model.generate_completions(session.history.messages(), session.manifest, False)
+    assert [res for (_, res, _) in candidates] == ["Hello", "World"]
+    assert token_usage == 100
+
+
+def test_first():
+    LLMEngineOpenAIGPTMock.choices = [choice(0, "short"), choice(1, "much longer")]
+    assert call() == ("short", None, 100)
+
+
+def test_longest():
+    LLMEngineOpenAIGPTMock.choices = [choice(0, "short"), choice(1, "much longer"), choice(2, "tiny")]
+    assert call("longest") == ("much longer", None, 100)
+
+
+def test_function_call():
+    LLMEngineOpenAIGPTMock.choices = [
+        choice(0, "I can't"),
+        choice(1, name="play", arguments='{"title": '),  # broken json
+        choice(2, name="unknown", arguments="{}"),
+        choice(3, name="play", arguments='{"title": "Yesterday"}'),
+    ]
+    (res, function_call, _) = call("function_call")
+    assert res is None
+    assert function_call.data()["arguments"] == '{"title": "Yesterday"}'
+
+
+def test_function_call_fallback():
+    LLMEngineOpenAIGPTMock.choices = [choice(0, "I can't"), choice(1, "No")]
+    assert call("function_call") == ("I can't", None, 100)
+
+
+def test_custom_scorer():
+    completion_scorers["shortest"] = lambda candidate, manifest: -len(candidate[1] or "")
+    try:
+        LLMEngineOpenAIGPTMock.choices = [choice(0, "short"), choice(1, "much longer"), choice(2, "tiny")]
+        assert call("shortest") == ("tiny", None, 100)
+    finally:
+        del completion_scorers["shortest"]
@@ -0,0 +1,67 @@
+import os
+import sys
+import threading
+from typing import List
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.chat_config import ChatConfig  # noqa: E402
+from slashgpt.chat_session import ChatSession  # noqa: E402
+from slashgpt.llms.engine.base import LLMEngineBase  # noqa: E402
+from slashgpt.llms.engine_pool import LlmEnginePool, engine_pool  # noqa: E402
+from slashgpt.llms.model import LlmModel  # noqa: E402
+from slashgpt.manifest import Manifest  # noqa: E402
+
+current_dir = os.path.dirname(__file__)
+
+
+class MockLlmEngine(LLMEngineBase):
+    instances = 0
+
+    def __init__(self, llm_model):
+        super().__init__(llm_model)
+        MockLlmEngine.instances += 1
+
+    def chat_completion(self, messages: List[dict], manifest: Manifest, verbose: bool):
+        return ("assistant", self.llm_model.name(), None, 0)
+
+
+config = ChatConfig(current_dir, llm_engine_configs={"mock_engine": MockLlmEngine})
+
+mock_model = {"engine_name": "mock_engine", "model_name": "mock_model"}
+
+
+def test_shared_engine():
+    session1 = ChatSession(config, manifest={"model": mock_model})
+    session2 = ChatSession(config, manifest={"model": dict(mock_model)})
+    assert session1.llm_model is not session2.llm_model
+    assert session1.llm_model.engine is session2.llm_model.engine
+
+
+def test_different_models():
+    session1 = ChatSession(config, manifest={"model": mock_model})
+    session2 = ChatSession(config, manifest={"model": {**mock_model, "model_name": "mock_model2"}})
+    assert session1.llm_model.engine is not session2.llm_model.engine
+    session2.append_user_question("Hi")
+    (message, _function_call, _) = session2.call_llm()
+    assert message == "mock_model2"
+
+
+def test_stats():
+    pool = LlmEnginePool()
+    MockLlmEngine.instances = 0
+    model = LlmModel(mock_model, config.llm_engine_configs)
+
+    def get_engines():
+        for _ in range(100):
+            pool.get_engine(MockLlmEngine, model)
+
+    threads = [threading.Thread(target=get_engines) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert MockLlmEngine.instances == 1
+    assert pool.stats() == {"engines": 1, "hits": 799, "misses": 1, "hit_rate": 799 / 800}
+    assert engine_pool.stats()["engines"] > 0
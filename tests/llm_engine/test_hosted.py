@@ -0,0 +1,136 @@
+import asyncio
+import gzip
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.llms.engine.hosted import LLMEngineHosted  # noqa: E402
+from slashgpt.llms.http_transport import HttpTransport  # noqa: E402
+from slashgpt.llms.model import LlmModel  # noqa: E402
+from slashgpt.manifest import Manifest  # noqa: E402
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_POST(self):
+        data = self.rfile.read(int(self.headers["Content-Length"]))
+        if self.headers.get("Content-Encoding") == "gzip":
+            data = gzip.decompress(data)
+        prompt = json.loads(data)["inputs"][0]["data"][0]
+        self.server.requests.append((self.headers.get("X-Api-Key"), prompt))
+        if self.server.failures > 0:
+            self.server.failures -= 1
+            self.reply(503, b"busy")
+            return
+        message = json.dumps({"message": ["Hello"]})
+        self.reply(200, json.dumps({"outputs": [{"name": "output-0", "datatype": "BYTES", "data": [message]}]}).encode())
+
+    def reply(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.connections = 0
+    server.requests = []
+    server.failures = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    HttpTransport.close_sessions()
+
+
+def engine(port, **options):
+    os.environ.setdefault("SLASHGPT_TEST_API_KEY", "TEST")
+    model_data = {
+        "engine_name": "hosted",
+        "model_name": "llama",
+        "api_key": "SLASHGPT_TEST_API_KEY",
+        "header_api_key": "X-Api-Key",
+        "url": f"http://127.0.0.1:{port}/v2/models/llama/infer",
+        "retry_backoff": 0.01,
+        **options,
+    }
+    return LlmModel(model_data, {"hosted": LLMEngineHosted}).engine
+
+
+messages = [{"role": "user", "content": "Hi"}]
+
+
+def test_keep_alive(server):
+    hosted = engine(server.server_port)
+    for _ in range(3):
+        assert hosted.chat_completion(messages, Manifest({}), False) == ("assistant", "\nHello", None, None)
+    assert len(server.requests) == 3
+    assert server.requests[0] == ("TEST", "user:Hi\nassistant:")
+    assert server.connections == 1
+
+
+def test_retry(server):
+    server.failures = 2
+    assert engine(server.server_port).chat_completion(messages, Manifest({}), False)[1] == "\nHello"
+    assert len(server.requests) == 3
+
+
+def test_gzip(server):
+    assert engine(server.server_port, gzip=True).chat_completion(messages, Manifest({}), False)[1] == "\nHello"
+    assert server.requests[0][1] == "user:Hi\nassistant:"
+
+
+def test_timeout():
+    listener = ThreadingHTTPServer(("127.0.0.1", 0), Handler)  # accepts connections, but never serves them
+    try:
+        hosted = engine(listener.server_port, timeout={"connect": 1, "read": 0.2}, max_retries=1)
+        with pytest.raises(Exception) as e:
+            hosted.chat_completion(messages, Manifest({}), False)
+        assert "timed out" in str(e.value)
+    finally:
+        listener.server_close()
+        HttpTransport.close_sessions()
+
+
+def test_async(server):
+    hosted = engine(server.server_port, gzip=True)
+
+    async def main():
+        return await asyncio.gather(*(hosted.achat_completion(messages, Manifest({}), False) for _ in range(5)))
+
+    assert [res for (_, res, _, _) in asyncio.run(main())] == ["\nHello"] * 5
+    assert len(server.requests) == 5
+
+
+def test_async_client_closed_with_loop(server):
+    hosted = engine(server.server_port)
+    clients = []
+
+    async def main():
+        await hosted.achat_completion(messages, Manifest({}), False)
+        await hosted.achat_completion(messages, Manifest({}), False)
+        clients.append(await hosted._get_async_client(hosted.transport.create_async_client))
+
+    for _ in range(3):
+        asyncio.run(main())
+    # One client per loop, closed (and forgotten) when the loop ends
+    assert len(set(map(id, clients))) == 3
+    assert all(client.is_closed for client in clients)
+    assert hosted._async_clients == {}
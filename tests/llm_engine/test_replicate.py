@@ -0,0 +1,93 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+import slashgpt.llms.engine.replicate as replicate_engine  # noqa: E402
+from slashgpt.chat_config import ChatConfig  # noqa: E402
+from slashgpt.chat_session import ChatSession  # noqa: E402
+from slashgpt.llms.engine.replicate import LLMEngineReplicate  # noqa: E402
+
+current_dir = os.path.dirname(__file__)
+
+
+class MockPrediction:
+    def __init__(self, replicate):
+        self.replicate = replicate
+
+    def output_iterator(self):
+        for chunk in self.replicate.chunks:
+            self.replicate.consumed += 1
+            yield chunk
+
+    def cancel(self):
+        self.replicate.cancelled = True
+
+
+class MockReplicate:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.consumed = 0
+        self.cancelled = False
+        self.models = self
+        self.versions = self
+        self.predictions = self
+
+    def get(self, name):
+        return self
+
+    def create(self, version, input, temperature):
+        assert "prompt" in input
+        return MockPrediction(self)
+
+
+config = ChatConfig(current_dir, llm_engine_configs={"replicate": LLMEngineReplicate})
+
+model = {"engine_name": "replicate", "model_name": "llama2"}
+
+notebook = {"notebook": True, "functions": [{"name": "run_python_code", "parameters": {"type": "object", "properties": {}}}]}
+
+
+def run(monkeypatch, chunks, manifest):
+    mock = MockReplicate(chunks)
+    monkeypatch.setattr(replicate_engine, "replicate", mock, raising=False)
+    events = []
+    session = ChatSession(config, manifest={"model": model, "stream": True, **manifest})
+    session.append_user_question("Hi")
+    (res, function_call, _) = session.call_llm(lambda token: events.append(token))
+    return (mock, events, res, function_call)
+
+
+def test_stream(monkeypatch):
+    (mock, events, res, function_call) = run(monkeypatch, ["Hello", " ", "World"], {})
+    assert events == ["Hello", " ", "World"]
+    assert res == "Hello World"
+    assert function_call is None
+    assert not mock.cancelled
+
+
+def test_without_callback(monkeypatch):
+    monkeypatch.setattr(replicate_engine, "replicate", MockReplicate(["Hello", " World"]), raising=False)
+    session = ChatSession(config, manifest={"model": model})
+    session.append_user_question("Hi")
+    assert session.call_llm()[0] == "Hello World"
+
+
+def test_code_block(monkeypatch):
+    # The closing fence arrives in two chunks
+    chunks = ["Here you are\n``", "`python\nprint(", "'hi')\n", "``", "`\n", "I hope", " it helps\n"]
+    (mock, events, res, function_call) = run(monkeypatch, chunks, notebook)
+    assert res is None
+    assert function_call.data()["arguments"]["code"] == ["print('hi')"]
+    # The rest of the output is not read, and the prediction is cancelled
+    assert mock.consumed == 5
+    assert events == chunks[:5]
+    assert mock.cancelled
+
+
+def test_unclosed_code_block(monkeypatch):
+    chunks = ["```python\n", "print('hi')\n", "print('bye')"]
+    (mock, events, res, function_call) = run(monkeypatch, chunks, notebook)
+    assert function_call.data()["arguments"]["code"] == ["print('hi')", "print('bye')"]
+    assert mock.consumed == 3
+    assert not mock.cancelled
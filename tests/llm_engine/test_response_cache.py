@@ -0,0 +1,124 @@
+import json
+import os
+import sys
+from typing import List
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.chat_config import ChatConfig  # noqa: E402
+from slashgpt.chat_session import ChatSession  # noqa: E402
+from slashgpt.function.function_call import FunctionCall  # noqa: E402
+from slashgpt.llms.engine.base import LLMEngineBase  # noqa: E402
+from slashgpt.llms.response_cache import LlmResponseCache, response_cache  # noqa: E402
+from slashgpt.manifest import Manifest  # noqa: E402
+
+
+class MockLlmEngine(LLMEngineBase):
+    calls = 0
+
+    def chat_completion(self, messages: List[dict], manifest: Manifest, verbose: bool):
+        MockLlmEngine.calls += 1
+        last_message = messages[-1].get("content")
+        if last_message == "play":
+            return ("assistant", None, FunctionCall({"name": "play", "arguments": '{"title": "Yesterday"}'}, manifest), 10)
+        return ("assistant", f"answer to {last_message}", None, 10)
+
+
+@pytest.fixture
+def config(tmp_path):
+    response_cache.clear()
+    MockLlmEngine.calls = 0
+    return ChatConfig(str(tmp_path), llm_engine_configs={"mock_engine": MockLlmEngine})
+
+
+def ask(config, question, cache, temperature=0, url=None):
+    manifest = {
+        "model": {"engine_name": "mock_engine", "model_name": "mock_model", "url": url},
+        "temperature": temperature,
+        "cache": cache,
+        "functions": [{"name": "play", "parameters": {"type": "object", "properties": {"title": {"type": "string"}}}}],
+    }
+    session = ChatSession(config, manifest=manifest)
+    session.append_user_question(question)
+    return session.call_llm()
+
+
+def test_hit(config):
+    assert ask(config, "Hi", {"ttl": 3600}) == ("answer to Hi", None, 10)
+    assert ask(config, "Hi", {"ttl": 3600}) == ("answer to Hi", None, 10)
+    assert MockLlmEngine.calls == 1
+    assert response_cache.stats()["hits"] == 1
+    assert response_cache.stats()["misses"] == 1
+
+
+def test_key(config):
+    ask(config, "Hi", True)
+    ask(config, "Bye", True)
+    ask(config, "Hi", True, temperature=0.5)
+    # Models differing in other properties than the name
+    ask(config, "Hi", True, url="http://localhost:8000")
+    assert MockLlmEngine.calls == 4
+
+
+def test_disabled(config):
+    ask(config, "Hi", None)
+    ask(config, "Hi", None)
+    assert MockLlmEngine.calls == 2
+    assert response_cache.stats()["entries"] == 0
+
+
+def test_ttl(config):
+    ask(config, "Hi", {"ttl": 0})
+    ask(config, "Hi", {"ttl": 0})
+    assert MockLlmEngine.calls == 2
+
+
+def test_function_call(config):
+    ask(config, "play", True)
+    (message, function_call, _) = ask(config, "play", True)
+    assert MockLlmEngine.calls == 1
+    assert message is None
+    assert function_call.data() == {"name": "play", "arguments": '{"title": "Yesterday"}'}
+
+
+def test_disk(config, tmp_path):
+    ask(config, "Hi", {"disk": True, "dir": "cache"})
+    files = list((tmp_path / "cache").glob("*/*.json"))
+    assert len(files) == 1
+    assert json.loads(files[0].read_text())["res"] == "answer to Hi"
+
+    response_cache.clear()  # simulate a restart
+    assert ask(config, "Hi", {"disk": True, "dir": "cache"}) == ("answer to Hi", None, 10)
+    assert MockLlmEngine.calls == 1
+    assert response_cache.stats()["disk_hits"] == 1
+
+
+def test_memory_only(config, tmp_path):
+    # The disk cache is off by default
+    ask(config, "Hi", True)
+    assert not (tmp_path / "output").exists()
+    ask(config, "Hi", {"disk": False})
+    assert MockLlmEngine.calls == 1
+
+
+def test_disk_expired(tmp_path):
+    cache = LlmResponseCache()
+    cache.set("key", ("assistant", "Hi", None, 10), str(tmp_path))
+    cache.clear()  # simulate a restart
+    assert cache.get("key", Manifest({}), ttl=0, directory=str(tmp_path)) is None
+    assert list(tmp_path.glob("*/*.json")) == []
+
+
+def test_disk_size(tmp_path):
+    cache = LlmResponseCache(max_disk_bytes=1000)
+    for i in range(30):
+        key = f"{i:02d}" + "0" * 62
+        cache.set(key, ("assistant", "x" * 50, None, 10), str(tmp_path))
+        os.utime(tmp_path / key[:2] / f"{key}.json", (i, i))
+    files = list(tmp_path.glob("*/*.json"))
+    assert 0 < sum(file.stat().st_size for file in files) <= 1000
+    # The oldest ones are deleted
+    assert (tmp_path / "29" / f"29{'0' * 62}.json") in files
+    assert not (tmp_path / "00" / f"00{'0' * 62}.json").exists()
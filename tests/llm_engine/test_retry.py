@@ -0,0 +1,35 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.chat_batch import ChatBatchRunner  # noqa: E402
+from slashgpt.llms.retry import is_retryable_error, is_retryable_status, retry_after_of, retry_delay  # noqa: E402
+
+
+class Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class ResponseError(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+def test_statuses():
+    # The batch runner and the HTTP transport classify the statuses the same way
+    for status_code in [400, 401, 404, 408, 409, 429, 500, 501, 502, 503, 504]:
+        error = ResponseError(Response(status_code))
+        assert ChatBatchRunner.is_retryable(error) == is_retryable_error(error) == is_retryable_status(status_code)
+    assert is_retryable_status(503) and not is_retryable_status(501)
+    assert is_retryable_error(ConnectionError()) and not is_retryable_error(ValueError())
+
+
+def test_retry_delay():
+    assert retry_after_of(ResponseError(Response(429, {"retry-after": "3"}))) == "3"
+    assert retry_after_of(ValueError()) is None
+    assert retry_delay(5, 1.0, "3") == 3.0
+    for attempt in range(4):
+        assert 2**attempt / 2 <= retry_delay(attempt, 1.0, "invalid") <= 2**attempt
@@ -0,0 +1,106 @@
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.chat_config import ChatConfig  # noqa: E402
+from slashgpt.chat_session import ChatSession  # noqa: E402
+from slashgpt.llms.engine.openai_gpt import LLMEngineOpenAIGPT  # noqa: E402
+from slashgpt.SlashGPT import SlashGPT  # noqa: E402
+
+current_dir = os.path.dirname(__file__)
+
+
+def chunk(index=0, role=None, content=None, name=None, arguments=None):
+    function_call = SimpleNamespace(name=name, arguments=arguments) if name or arguments else None
+    delta = SimpleNamespace(role=role, content=content, function_call=function_call)
+    return SimpleNamespace(choices=[SimpleNamespace(index=index, delta=delta)])
+
+
+class MockCompletions:
+    def create(self, **params):
+        assert params["stream"]
+        return iter(LLMEngineOpenAIGPTMock.chunks)
+
+
+class LLMEngineOpenAIGPTMock(LLMEngineOpenAIGPT):
+    chunks: list = []
+
+    def __init__(self, llm_model):
+        os.environ.setdefault("SLASHGPT_TEST_API_KEY", "TEST")
+        super().__init__(llm_model)
+        self.client = SimpleNamespace(chat=SimpleNamespace(completions=MockCompletions()))
+
+
+config = ChatConfig(current_dir, llm_engine_configs={"openai-gpt-mock": LLMEngineOpenAIGPTMock})
+
+mock_model = {
+    "engine_name": "openai-gpt-mock",
+    "model_name": "gpt-3.5-turbo-0613",
+    "api_key": "SLASHGPT_TEST_API_KEY",
+}
+
+
+class TestStream:
+    def process_event(self, callback_type, data):
+        self.events.append((callback_type, data))
+
+    def test_tokens(self):
+        LLMEngineOpenAIGPTMock.chunks = [
+            chunk(role="assistant"),
+            chunk(content="Hello"),
+            chunk(index=1, content="Ignored"),
+            chunk(content=" World"),
+        ]
+        session = ChatSession(config, manifest={"model": mock_model, "stream": True})
+        session.append_user_question("Hi")
+        self.events = []
+        session.call_loop(self.process_event)
+        assert self.events == [("token", "Hello"), ("token", " World"), ("bot", "Hello World")]
+        assert session.history.last_message() == {"role": "assistant", "content": "Hello World"}
+
+    def test_function_call(self):
+        LLMEngineOpenAIGPTMock.chunks = [
+            chunk(role="assistant", name="play", arguments=""),
+            chunk(arguments='{"title": '),
+            chunk(arguments='"Bohemian Rhapsody"}'),
+        ]
+        manifest = {
+            "model": mock_model,
+            "stream": True,
+            "functions": [{"name": "play", "parameters": {"type": "object", "properties": {"title": {"type": "string"}}}}],
+        }
+        session = ChatSession(config, manifest=manifest)
+        session.append_user_question("Play Bohemian Rhapsody")
+        tokens = []
+        (message, function_call, _) = session.call_llm(tokens.append)
+        assert message is None
+        assert tokens == []
+        data = function_call.data()
+        assert data["name"] == "play"
+        assert json.loads(data["arguments"]) == {"title": "Bohemian Rhapsody"}
+
+    def test_without_callback(self):
+        LLMEngineOpenAIGPTMock.chunks = [chunk(role="assistant"), chunk(content="Hello"), chunk(content=" World")]
+        session = ChatSession(config, manifest={"model": mock_model, "stream": True})
+        session.append_user_question("Hi")
+        (message, _function_call, _) = session.call_llm()
+        assert message == "Hello World"
+
+
+def test_cli_streaming(capsys):
+    # A streamed message ends with the next event which is not a token, e.g. the function call following it
+    cli = SlashGPT.__new__(SlashGPT)
+    cli.streaming = False
+    cli.app = SimpleNamespace(session=SimpleNamespace(botname=lambda: "Bot"), config=SimpleNamespace(audio=None))
+    cli._callback("token", "Let me check")
+    cli._callback("function", ("weather", "sunny"))
+    cli._callback("token", "It is sunny")
+    cli._callback("bot", "It is sunny")
+    cli._callback("bot", "Bye")
+    lines = capsys.readouterr().out.splitlines()
+    expected = ["Bot\033[95m\033[0m: Let me check", "sunny", "Bot\033[95m\033[0m: It is sunny", "Bot\033[95m\033[0m: Bye"]
+    assert len(lines) == len(expected) and all(line.endswith(text) for (line, text) in zip(lines, expected))
+    assert not cli.streaming
@@ -0,0 +1,33 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.llms import tokenizer  # noqa: E402
+
+
+class Encoding:
+    def __init__(self):
+        self.encoded = 0
+
+    def encode(self, text):
+        self.encoded += 1
+        return text.split()
+
+
+def test_num_tokens(monkeypatch):
+    encoding = Encoding()
+    monkeypatch.setattr(tokenizer, "get_encoding", lambda model_name: encoding)
+    monkeypatch.setattr(tokenizer, "COUNT_CACHE_SIZE", 2)
+    monkeypatch.setattr(tokenizer, "_counts", type(tokenizer._counts)())
+    text = "Hello world " * 100
+    assert tokenizer.num_tokens(text, "model") == 200
+    assert tokenizer.num_tokens(text, "model") == 200
+    assert encoding.encoded == 1
+    # The counts are kept by the digests of the texts, not by the texts
+    assert all(text not in key for key in tokenizer._counts)
+    for i in range(3):
+        tokenizer.num_tokens(f"text {i}", "model")
+    assert len(tokenizer._counts) == 2
+    tokenizer.num_tokens(text, "model")
+    assert encoding.encoded == 5
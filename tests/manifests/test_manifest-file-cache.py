@@ -0,0 +1,83 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.manifest import Manifest  # noqa: E402
+from slashgpt.utils import file_cache  # noqa: E402
+from slashgpt.utils.file_cache import FileCache  # noqa: E402
+
+
+def write_file(path, text, mtime):
+    with open(path, "w") as f:
+        f.write(text)
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    file_cache.clear()
+    yield
+    file_cache.clear()
+
+
+def test_invalidation(tmp_path, monkeypatch):
+    path = tmp_path / "resource.txt"
+    write_file(path, "first", 1000)
+    cache = FileCache()
+    assert cache.read_text(str(path)) == "first"
+
+    opened = []
+    original = open
+    monkeypatch.setattr("builtins.open", lambda *args, **kwargs: opened.append(args[0]) or original(*args, **kwargs))
+    assert cache.read_text(str(path)) == "first"
+    assert opened == []
+
+    write_file(path, "second", 2000)
+    assert cache.read_text(str(path)) == "second"
+    assert len(opened) == 2  # the test itself, and the cache
+    assert cache.size == len("second")
+
+
+def test_max_bytes(tmp_path):
+    cache = FileCache(max_bytes=10)
+    for name in ["a", "b", "c"]:
+        write_file(tmp_path / name, name * 4, 1000)
+    cache.read_text(str(tmp_path / "a"))
+    cache.read_text(str(tmp_path / "b"))
+    assert cache.size == 8
+    cache.read_text(str(tmp_path / "a"))  # b is now the least recently used
+    cache.read_text(str(tmp_path / "c"))
+    assert cache.size == 8
+
+    write_file(tmp_path / "large", "x" * 11, 1000)
+    assert cache.read_text(str(tmp_path / "large")) == "x" * 11
+    assert cache.size == 8
+
+
+def test_json_copy(tmp_path):
+    write_file(tmp_path / "data.json", json.dumps({"list": [1, 2]}), 1000)
+    data = file_cache.read_json(str(tmp_path / "data.json"))
+    data["list"].append(3)
+    assert file_cache.read_json(str(tmp_path / "data.json")) == {"list": [1, 2]}
+
+
+def test_manifest_functions(tmp_path):
+    functions = [{"name": "categorize", "parameters": {"properties": {"category": {"type": "string"}}}}]
+    write_file(tmp_path / "functions.json", json.dumps(functions), 1000)
+    first = Manifest({"functions": "functions.json", "agents": ["a", "b"]}, str(tmp_path), "agent")
+    second = Manifest({"functions": "functions.json", "agents": ["c"]}, str(tmp_path), "agent")
+    assert first.functions()[0]["parameters"]["properties"]["category"]["enum"] == ["a", "b"]
+    assert second.functions()[0]["parameters"]["properties"]["category"]["enum"] == ["c"]
+    assert Manifest({"functions": "functions.json"}, str(tmp_path), "agent").functions() == functions
+
+
+def test_manifest_resource(tmp_path):
+    write_file(tmp_path / "resource.txt", "schema", 1000)
+    manifest = Manifest({"prompt": "Use {resource}", "resource": "resource.txt"}, str(tmp_path), "agent")
+    assert manifest.prompt_data() == "Use schema"
+    write_file(tmp_path / "resource.txt", "updated schema", 2000)
+    assert manifest.prompt_data() == "Use updated schema"
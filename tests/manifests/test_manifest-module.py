@@ -0,0 +1,70 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.manifest import Manifest  # noqa: E402
+from slashgpt.utils import module_cache  # noqa: E402
+
+
+def write_module(path, code, mtime):
+    with open(path, "w") as f:
+        f.write(code)
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    module_cache.clear()
+    yield
+    module_cache.clear()
+
+
+def test_compiled_once(tmp_path, monkeypatch):
+    path = tmp_path / "module.py"
+    write_module(path, "RUNS.append(1)\ndef hello():\n    return 'hello'\n", 1000)
+    compiled = []
+    original = compile
+    monkeypatch.setattr("builtins.compile", lambda *args: compiled.append(args[1]) or original(*args))
+    runs: list = []
+    monkeypatch.setattr("builtins.RUNS", runs, raising=False)
+
+    first = module_cache.load_module(str(path))
+    second = module_cache.load_module(str(path))
+    assert first["hello"]() == "hello"
+    assert first is not second  # not stateless, so it is run for each load
+    assert len(runs) == 2
+    assert len(compiled) == 1
+
+    write_module(path, "def hello():\n    return 'updated'\n", 2000)
+    assert module_cache.load_module(str(path))["hello"]() == "updated"
+    assert len(compiled) == 2
+
+
+def test_stateless(tmp_path):
+    path = tmp_path / "module.py"
+    write_module(path, "__stateless__ = True\ndef hello():\n    return 'hello'\n", 1000)
+    first = module_cache.load_module(str(path))
+    assert module_cache.load_module(str(path)) is first
+
+    write_module(path, "__stateless__ = True\ndef hello():\n    return 'hi'\n", 2000)
+    second = module_cache.load_module(str(path))
+    assert second is not first
+    assert second["hello"]() == "hi"
+
+
+def test_manifest(tmp_path):
+    write_module(tmp_path / "module.py", "__stateless__ = True\ndef hello():\n    return 'hello'\n", 1000)
+    manifests = [Manifest({"module": "module.py"}, str(tmp_path), "agent") for _ in range(2)]
+    assert manifests[0].get_module("hello")() == "hello"
+    assert manifests[0].get_module("hello") is manifests[1].get_module("hello")
+    assert manifests[0].get_module("missing") is None
+
+
+def test_import_error(tmp_path, capsys):
+    write_module(tmp_path / "module.py", "import slashgpt_missing_module\n", 1000)
+    manifest = Manifest({"module": "module.py"}, str(tmp_path), "agent")
+    assert manifest.get_module("hello") is None
+    assert "Failed to import module: module.py" in capsys.readouterr().out
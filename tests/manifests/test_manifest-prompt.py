@@ -0,0 +1,60 @@
+import json
+import os
+import re
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.manifest import Manifest  # noqa: E402
+from slashgpt.prompt_template import PromptTemplate, sample  # noqa: E402
+
+
+def test_render():
+    template = PromptTemplate("{memory} and {memory}, {random} {random}, {unknown} {agents}")
+    assert template.count("random") == 2
+    assert template.has("memory") and not template.has("resource")
+    # Only the first {memory} is replaced, and values are not scanned for placeholders
+    assert template.render({"memory": "{agents}", "agents": "A"}, ["x", "y"]) == "{agents} and {memory}, x y, {unknown} A"
+    assert template.render({}) == "{memory} and {memory}, {random} {random}, {unknown} {agents}"
+
+
+def test_compile():
+    assert PromptTemplate.compile("Hello {now}") is PromptTemplate.compile("Hello {now}")
+
+
+def test_sample():
+    items = ["a", "b", "c"]
+    picks = sample(items, 3)
+    assert sorted(picks) == items
+    assert items == ["a", "b", "c"]
+    assert len(set(sample(items, 2))) == 2
+    assert sorted(sample(items, 6)) == ["a", "a", "b", "b", "c", "c"]
+    assert sample([], 2) == []
+
+
+def test_prompt_data(tmp_path):
+    with open(tmp_path / "resource.txt", "w") as f:
+        f.write("resource \\1 {random}")
+    manifest = Manifest(
+        {
+            "prompt": ["Now: {now}", "Pick: {random}, {random}", "Resource: {resource}", "Agents: {agents}", "Memory: {memory}"],
+            "list": ["x", "y"],
+            "resource": "resource.txt",
+            "agents": ["a"],
+        },
+        str(tmp_path),
+        "agent",
+    )
+    prompt = manifest.prompt_data({"a": {"description": "Agent A"}}, {"name": "太郎"})
+    lines = prompt.split("\n")
+    assert re.fullmatch(r"Now: \d{8}T\d{6}Z", lines[0])
+    assert lines[1] in ["Pick: x, y", "Pick: y, x"]
+    assert lines[2] == "Resource: resource \\1 {random}"
+    assert lines[3] == "Agents: a: Agent A"
+    assert lines[4] == "Memory: " + json.dumps({"name": "太郎"}, ensure_ascii=False)
+
+
+def test_prompt_data_without_values():
+    manifest = Manifest({"prompt": "{random} {memory}"}, ".", "agent")
+    assert manifest.prompt_data() == "{random} {memory}"
+    assert Manifest({}, ".", "agent").prompt_data() is None
@@ -0,0 +1,158 @@
+import copy
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.manifest import Manifest  # noqa: E402
+from slashgpt.manifest_registry import ManifestRegistry, summary_of  # noqa: E402
+
+
+def write_manifest(path, data, mtime=None):
+    with open(path, "w") as f:
+        json.dump(data, f)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def manifests_dir(tmp_path):
+    path = tmp_path / "manifests"
+    path.mkdir()
+    write_manifest(path / "a.json", {"title": "A"}, 1000)
+    with open(path / "b.yml", "w") as f:
+        f.write("title: B\nlist:\n  - x\n  - y\n")
+    with open(path / "README.md", "w") as f:
+        f.write("not a manifest")
+    return path
+
+
+def test_snapshot(manifests_dir):
+    registry = ManifestRegistry(str(manifests_dir), check_interval=0)
+    snapshot = registry.snapshot()
+    assert snapshot == {"a": {"title": "A"}, "b": {"title": "B", "list": ["x", "y"]}}
+    # Nothing changed, so the same snapshot is returned
+    assert registry.snapshot() is snapshot
+
+
+def test_changes(manifests_dir):
+    registry = ManifestRegistry(str(manifests_dir), check_interval=0)
+    snapshot = registry.snapshot()
+
+    write_manifest(manifests_dir / "a.json", {"title": "A2"}, 2000)
+    updated = registry.snapshot()
+    assert updated["a"] == {"title": "A2"}
+    assert updated["b"] is snapshot["b"]  # not parsed again
+    assert snapshot["a"] == {"title": "A"}  # the previous snapshot is not modified
+
+    write_manifest(manifests_dir / "c.json", {"title": "C"})
+    os.remove(manifests_dir / "b.yml")
+    assert sorted(registry.snapshot().keys()) == ["a", "c"]
+
+
+def test_check_interval(manifests_dir):
+    registry = ManifestRegistry(str(manifests_dir), check_interval=60)
+    snapshot = registry.snapshot()
+    write_manifest(manifests_dir / "c.json", {"title": "C"})
+    assert registry.snapshot() is snapshot
+    assert "c" in registry.snapshot(force=True)
+
+
+def test_broken(manifests_dir, capsys):
+    with open(manifests_dir / "broken.json", "w") as f:
+        f.write("{")
+    registry = ManifestRegistry(str(manifests_dir), check_interval=0)
+    assert "broken" not in registry.snapshot()
+    assert "broken.json is broken" in capsys.readouterr().out
+    registry.snapshot()
+    assert capsys.readouterr().out == ""  # not parsed again until it changes
+
+
+def test_read_only(manifests_dir):
+    snapshot = ManifestRegistry(str(manifests_dir)).snapshot()
+    with pytest.raises(TypeError):
+        snapshot["a"] = {}
+    with pytest.raises(TypeError):
+        snapshot["a"]["title"] = "X"
+    with pytest.raises(TypeError):
+        snapshot["b"].update({"title": "X"})
+    copied = copy.deepcopy(snapshot["a"])
+    copied["title"] = "X"
+    assert snapshot["a"]["title"] == "A"
+
+
+def test_shared(manifests_dir):
+    assert ManifestRegistry.get(str(manifests_dir)) is ManifestRegistry.get(f"{manifests_dir}/.")
+
+
+def test_manifest_does_not_modify_snapshot(manifests_dir):
+    categorize = {"name": "categorize", "parameters": {"properties": {"category": {"type": "string"}}}}
+    write_manifest(manifests_dir / "d.json", {"prompt": "{random}", "list": ["x", "y", "z"], "agents": ["a", "b"], "functions": [categorize]})
+    snapshot = ManifestRegistry(str(manifests_dir)).snapshot()
+    manifest = Manifest(snapshot["d"], str(manifests_dir), "d")
+    assert manifest.functions()[0]["parameters"]["properties"]["category"]["enum"] == ["a", "b"]
+    for _ in range(10):
+        manifest.prompt_data(snapshot)
+    assert snapshot["d"]["list"] == ["x", "y", "z"]
+    assert "enum" not in snapshot["d"]["functions"][0]["parameters"]["properties"]["category"]
+
+
+def test_summary(manifests_dir):
+    write_manifest(manifests_dir / "c.json", {"title": "C", "description": "Agent C", "prompt": "..."})
+    snapshot = ManifestRegistry(str(manifests_dir)).snapshot()
+    assert snapshot.summary("c") == {"title": "C", "description": "Agent C"}
+    assert summary_of(snapshot, "a") == {"title": "A"}
+    assert summary_of({"a": {"title": "A", "prompt": "..."}}, "a")["title"] == "A"
+    assert "c" in snapshot and "d" not in snapshot
+    with pytest.raises(KeyError):
+        snapshot.summary("d")
+
+
+def test_persistent_cache(manifests_dir, cache_dir):
+    registry = ManifestRegistry(str(manifests_dir), check_interval=0)
+    snapshot = registry.snapshot()
+    assert registry.parsed == 2
+    assert len(list(cache_dir.iterdir())) == 1
+
+    # After a restart, the manifests are loaded from the cache
+    restarted = ManifestRegistry(str(manifests_dir), check_interval=0)
+    assert restarted.snapshot() == snapshot
+    assert restarted.snapshot().summary("b") == {"title": "B"}
+    assert restarted.parsed == 0
+
+    write_manifest(manifests_dir / "a.json", {"title": "A2"}, 2000)
+    restarted = ManifestRegistry(str(manifests_dir), check_interval=0)
+    assert restarted.snapshot()["a"] == {"title": "A2"}
+    assert restarted.parsed == 1
+
+
+def test_cache_format(manifests_dir, cache_dir):
+    # The cache is json, and the manifests json cannot represent are parsed again instead
+    with open(manifests_dir / "c.yml", "w") as f:
+        f.write("title: C\ndate: 2024-01-01\n1: one\n")
+    ManifestRegistry(str(manifests_dir)).snapshot()
+    with open(next(cache_dir.iterdir()), encoding="utf-8") as f:
+        assert sorted(json.load(f)["files"]) == ["a.json", "b.yml"]
+    restarted = ManifestRegistry(str(manifests_dir))
+    assert restarted.snapshot()["c"][1] == "one"
+    assert restarted.parsed == 1
+
+
+def test_broken_cache(manifests_dir, cache_dir, capsys):
+    registry = ManifestRegistry(str(manifests_dir))
+    registry.snapshot()
+    for path in cache_dir.iterdir():
+        path.write_bytes(b"broken")
+    restarted = ManifestRegistry(str(manifests_dir))
+    assert restarted.snapshot()["a"] == {"title": "A"}
+    assert restarted.parsed == 2
+    assert "Ignoring the manifest cache" in capsys.readouterr().out
+
+
+def test_without_cache(manifests_dir, cache_dir):
+    registry = ManifestRegistry(str(manifests_dir), cache_dir=None)
+    assert registry.snapshot()["b"]["title"] == "B"
+    assert not cache_dir.exists()
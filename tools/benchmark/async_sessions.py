@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# Multiplexes many chat sessions on one event loop against a mock engine.
+#  python tools/benchmark/async_sessions.py --sessions 500 --turns 3 --latency 0.2
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import List
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.chat_config import ChatConfig  # noqa: E402
+from slashgpt.chat_session import ChatSession  # noqa: E402
+from slashgpt.llms.engine.base import LLMEngineBase  # noqa: E402
+from slashgpt.manifest import Manifest  # noqa: E402
+
+latency = 0.2
+
+
+class MockLlmEngine(LLMEngineBase):
+    """Simulates an LLM whose response takes a fixed latency"""
+
+    def chat_completion(self, messages: List[dict], manifest: Manifest, verbose: bool):
+        time.sleep(latency)
+        return ("assistant", f"echo: {messages[-1].get('content')}", None, 0)
+
+    async def achat_completion(self, messages: List[dict], manifest: Manifest, verbose: bool):
+        await asyncio.sleep(latency)
+        return ("assistant", f"echo: {messages[-1].get('content')}", None, 0)
+
+
+config = ChatConfig(os.path.dirname(__file__), llm_engine_configs={"mock_engine": MockLlmEngine})
+manifest = {"model": {"engine_name": "mock_engine", "model_name": "mock_model"}, "prompt": "You are a benchmark."}
+
+
+async def converse(session: ChatSession, turns: int):
+    for turn in range(turns):
+        session.append_user_question(f"question {turn}")
+        await session.acall_loop(lambda callback_type, data: None)
+
+
+async def run_async(num_sessions: int, turns: int):
+    sessions = [ChatSession(config, manifest=manifest) for _ in range(num_sessions)]
+    start = time.perf_counter()
+    await asyncio.gather(*(converse(session, turns) for session in sessions))
+    return time.perf_counter() - start
+
+
+def run_sync(num_sessions: int, turns: int):
+    sessions = [ChatSession(config, manifest=manifest) for _ in range(num_sessions)]
+    start = time.perf_counter()
+    for session in sessions:
+        for turn in range(turns):
+            session.append_user_question(f"question {turn}")
+            session.call_loop(lambda callback_type, data: None)
+    return time.perf_counter() - start
+
+
+def main():
+    global latency
+    parser = argparse.ArgumentParser(description="Benchmark: async chat sessions on one event loop")
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.2, help="simulated LLM latency in seconds")
+    parser.add_argument("--sync-sessions", type=int, default=5, help="sessions to run with the blocking API for comparison")
+    args = parser.parse_args()
+    latency = args.latency
+
+    calls = args.sessions * args.turns
+    elapsed = asyncio.run(run_async(args.sessions, args.turns))
+    print(f"async: {args.sessions} sessions x {args.turns} turns = {calls} calls in {elapsed:.2f}s ({calls / elapsed:.1f} calls/s)")
+
+    sync_calls = args.sync_sessions * args.turns
+    elapsed = run_sync(args.sync_sessions, args.turns)
+    print(f"sync:  {args.sync_sessions} sessions x {args.turns} turns = {sync_calls} calls in {elapsed:.2f}s ({sync_calls / elapsed:.1f} calls/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# Measures the cost of appending a message to ChatHistoryFileStorage as sessions grow,
+# compared with rewriting the whole session file per message (the previous format).
+#  python tools/benchmark/file_storage.py --messages 2000 --size 500
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.history.storage.file import ChatHistoryFileStorage  # noqa: E402
+
+
+def rewrite_per_message(messages: int, message: dict, checkpoints: list):
+    """The previous format: json.dump of all the messages on every append"""
+    data: list = []
+    written = 0
+    results = []
+    start = time.perf_counter()
+    for i in range(1, messages + 1):
+        data.append(message)
+        with open("rewrite.json", "w") as f:
+            text = json.dumps({"messages": data}, ensure_ascii=False, indent=2)
+            f.write(text)
+            written += len(text)
+        if i in checkpoints:
+            results.append((i, (time.perf_counter() - start) / i * 1e6, written))
+    return results
+
+
+def journal(messages: int, message: dict, checkpoints: list):
+    storage = ChatHistoryFileStorage("benchmark", "benchmark")
+    results = []
+    start = time.perf_counter()
+    last = (start, 0)
+    for i in range(1, messages + 1):
+        storage.append(message)
+        if i in checkpoints:
+            now = time.perf_counter()
+            results.append((i, (now - last[0]) / (i - last[1]) * 1e6))
+            last = (now, i)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--size", type=int, default=500, help="characters per message")
+    args = parser.parse_args()
+
+    message = {"role": "user", "content": "x" * args.size}
+    checkpoints = [n for n in (10, 100, 500, 1000, 2000, 5000, 10000) if n <= args.messages]
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        print("journal (us per append, over the interval ending at n messages)")
+        for n, us in journal(args.messages, message, checkpoints):
+            print(f"  n={n:6d}: {us:8.1f}")
+        print("full rewrite (us per append, average over the first n messages; bytes written)")
+        for n, us, written in rewrite_per_message(args.messages, message, checkpoints):
+            print(f"  n={n:6d}: {us:8.1f} ({written / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
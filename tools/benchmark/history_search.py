@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# Measures full-text search over the session catalog with many messages.
+# The messages are put into the search index directly (as the storages do on each write).
+#  python tools/benchmark/history_search.py --messages 1000000
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.history.storage.catalog import SessionCatalog  # noqa: E402
+
+WORDS = ["weather", "tokyo", "osaka", "python", "function", "manifest", "agent", "history", "summary", "token", "model", "prompt"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=1000000)
+    parser.add_argument("--session-length", type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as directory:
+        catalog = SessionCatalog.get(directory, "benchmark", lambda path: [])
+        start = time.perf_counter()
+        for session in range(args.messages // args.session_length):
+            messages = [
+                {"role": "user", "content": " ".join(random.choices(WORDS, k=12)) + f" session{session} message{i}"}
+                for i in range(args.session_length)
+            ]
+            catalog.search_index.index(f"session-{session}", 0, messages)
+        print(f"indexed {args.messages} messages in {time.perf_counter() - start:.1f}s")
+
+        for query in ["tokyo", "weather osaka", "session12345", "message7 session4242", "no-such-term"]:
+            elapsed = []
+            for _ in range(5):
+                start = time.perf_counter()
+                hits = catalog.search(query)
+                elapsed.append(time.perf_counter() - start)
+            print(f"{query!r:28s} {len(hits):3d} hits {min(elapsed) * 1e3:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# Compares the history storage backends with many sessions:
+# writing the sessions, listing them, and loading one of them.
+#  python tools/benchmark/history_storage.py --sessions 10000 --messages 4
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.history.storage.file import ChatHistoryFileStorage  # noqa: E402
+from slashgpt.history.storage.log import log_writer  # noqa: E402
+from slashgpt.history.storage.memory import ChatHistoryMemoryStorage  # noqa: E402
+from slashgpt.history.storage.sqlite import ChatHistorySQLiteStorage  # noqa: E402
+
+backends = {
+    "memory": lambda: ChatHistoryMemoryStorage("benchmark", "benchmark"),
+    "file": lambda: ChatHistoryFileStorage("benchmark", "benchmark"),
+    "sqlite": lambda: ChatHistorySQLiteStorage("benchmark", "benchmark"),
+}
+
+
+def measure(create, sessions: int, messages: int):
+    start = time.perf_counter()
+    for session in range(sessions):
+        storage = create()
+        for i in range(messages):
+            storage.append({"role": "user", "content": f"message {i} of session {session}"})
+    log_writer.flush()
+    write = time.perf_counter() - start
+
+    # Another storage of the agent lists the sessions (like another process would)
+    reader = create()
+    start = time.perf_counter()
+    listed = reader.session_list()
+    list_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    reader.get_session_data(str(listed[len(listed) // 2]["id"]))
+    load_time = time.perf_counter() - start
+    return (write, list_time, load_time, len(listed))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--messages", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{args.sessions} sessions x {args.messages} messages")
+    print(f"{'backend':8s} {'us/append':>10s} {'list (ms)':>10s} {'load (ms)':>10s} {'sessions':>9s}")
+    for name, create in backends.items():
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            (write, list_time, load_time, listed) = measure(create, args.sessions, args.messages)
+            per_append = write / (args.sessions * args.messages) * 1e6
+            print(f"{name:8s} {per_append:10.1f} {list_time * 1e3:10.2f} {load_time * 1e3:10.2f} {listed:9d}")
+
+
+if __name__ == "__main__":
+    main()
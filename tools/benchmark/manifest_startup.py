@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# Measures loading a folder with many YAML manifests: parsing them (cold), loading the index from the cache file
+# after a restart (warm), and activating one agent.
+#  python tools/benchmark/manifest_startup.py --manifests 500
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import yaml
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.manifest_registry import ManifestRegistry  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--manifests", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        manifests_dir = f"{directory}/manifests"
+        os.makedirs(manifests_dir)
+        for i in range(args.manifests):
+            manifest = {
+                "title": f"Agent {i}",
+                "description": f"Description of agent {i}",
+                "prompt": [f"You are agent {i}. Line {j}." for j in range(50)],
+                "functions": [
+                    {"name": f"function{j}", "parameters": {"type": "object", "properties": {"value": {"type": "string"}}}} for j in range(10)
+                ],
+                "sample": "Hello",
+            }
+            with open(f"{manifests_dir}/agent{i}.yml", "w") as f:
+                yaml.safe_dump(manifest, f)
+
+        for label in ["cold (parse)", "warm (cache file)"]:
+            start = time.perf_counter()
+            registry = ManifestRegistry(manifests_dir, cache_dir=f"{directory}/cache")
+            snapshot = registry.snapshot()
+            titles = [snapshot.summary(key)["title"] for key in snapshot]
+            loaded = time.perf_counter()
+            snapshot["agent0"]
+            activated = time.perf_counter()
+            print(
+                f"{label:18s} {len(titles)} manifests, {registry.parsed:4d} parsed: "
+                f"index {(loaded - start) * 1e3:8.2f} ms, activation {(activated - loaded) * 1e3:6.3f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
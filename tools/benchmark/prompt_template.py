@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# Measures Manifest.prompt_data for a prompt with a large resource and many {random} placeholders,
+# compared with replacing the placeholders one by one with re.sub (as prompt_data used to).
+#  python tools/benchmark/prompt_template.py --resource-kb 512 --randoms 50
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.manifest import Manifest  # noqa: E402
+
+
+def sequential(prompt: str, items: list, resource: str, agents: str, memory: dict) -> str:
+    # The previous implementation (without reading the resource file)
+    items = list(items)
+    random.shuffle(items)
+    j = 0
+    while re.search("\\{random\\}", prompt):
+        prompt = re.sub("\\{random\\}", items[j], prompt, 1)
+        j += 1
+    prompt = re.sub("\\{resource\\}", resource.replace("\\", "\\\\"), prompt, 1)
+    prompt = re.sub("\\{agents\\}", agents, prompt, 1)
+    return re.sub("\\{memory\\}", json.dumps(memory, ensure_ascii=False), prompt, 1)
+
+
+def measure(function, repeat: int) -> float:
+    elapsed = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed.append(time.perf_counter() - start)
+    return min(elapsed) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--resource-kb", type=int, default=512)
+    parser.add_argument("--randoms", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(0)
+    resource = "".join(random.choices("abcdefghijklmnopqrstuvwxyz {}\n", k=args.resource_kb * 1024))
+    items = [f"item {i}" for i in range(args.randoms)]
+    prompt = "\n".join(
+        ["Today is {now}."]
+        + [f"Example {i}: {{random}}" for i in range(args.randoms)]
+        + ["Schema:", "{resource}", "Agents:", "{agents}", "Memory: {memory}"]
+    )
+    manifests = {"a": {"description": "Agent A"}, "b": {"description": "Agent B"}}
+    memory = {"name": "benchmark"}
+
+    with tempfile.TemporaryDirectory() as directory:
+        with open(f"{directory}/resource.txt", "w") as f:
+            f.write(resource)
+        manifest = Manifest({"prompt": prompt, "list": items, "resource": "resource.txt", "agents": ["a", "b"]}, directory, "benchmark")
+        agents = "\n".join(f"{agent}: {manifests[agent]['description']}" for agent in manifests)
+        print(f"resource {args.resource_kb} KB, {args.randoms} {{random}}")
+        print(f"  re.sub per placeholder: {measure(lambda: sequential(prompt, items, resource, agents, memory), args.repeat):8.3f} ms")
+        print(f"  Manifest.prompt_data:   {measure(lambda: manifest.prompt_data(manifests, memory), args.repeat):8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
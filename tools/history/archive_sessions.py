@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# Moves the sessions not updated for the given number of days into the compressed archive
+# ({base_dir}/{agent}/.archive). Archived sessions are still listed and imported with /import.
+#  python tools/history/archive_sessions.py --storage memory --days 30 GPT
+#  python tools/history/archive_sessions.py --storage file --days 7 agent1 agent2
+
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.history.storage.file import ChatHistoryFileStorage  # noqa: E402
+from slashgpt.history.storage.memory import ChatHistoryMemoryStorage  # noqa: E402
+
+storages = {
+    "memory": ChatHistoryMemoryStorage,  # output/{agent}
+    "file": ChatHistoryFileStorage,  # filememory/{agent}
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--storage", choices=storages.keys(), default="memory")
+    parser.add_argument("--days", type=float, default=30)
+    parser.add_argument("agents", nargs="+")
+    args = parser.parse_args()
+
+    for agent_name in args.agents:
+        storage = storages[args.storage]("archive", agent_name)
+        archived = storage.archive(args.days * 24 * 60 * 60)
+        print(f"{agent_name}: archived {archived} sessions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# Moves the existing sessions of agents into the sharded layout ({base_dir}/{agent}/{shard}/{session}),
+# or back into the flat one with --flat. New sessions of the agents follow the layout afterwards.
+# Run it while the app is stopped.
+#  python tools/history/migrate_layout.py --storage memory GPT
+#  python tools/history/migrate_layout.py --storage file --flat agent1 agent2
+
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.history.storage.file import ChatHistoryFileStorage  # noqa: E402
+from slashgpt.history.storage.memory import ChatHistoryMemoryStorage  # noqa: E402
+
+storages = {
+    "memory": ChatHistoryMemoryStorage,  # output/{agent}
+    "file": ChatHistoryFileStorage,  # filememory/{agent}
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--storage", choices=storages.keys(), default="memory")
+    parser.add_argument("--flat", action="store_true", help="move the sessions back into the flat layout")
+    parser.add_argument("agents", nargs="+")
+    args = parser.parse_args()
+
+    for agent_name in args.agents:
+        storage = storages[args.storage]("migrate", agent_name)
+        moved = storage.relayout(not args.flat)
+        print(f"{agent_name}: moved {moved} files")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# Deletes the stored sessions of agents exceeding the retention limits (the oldest first).
+# Agents with "retention" in their manifests are swept in the background as well.
+#  python tools/history/sweep_sessions.py --storage memory --max-age-days 90 GPT
+#  python tools/history/sweep_sessions.py --storage file --max-sessions-per-user 100 --max-bytes 1000000000 agent1
+
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.history.storage.file import ChatHistoryFileStorage  # noqa: E402
+from slashgpt.history.storage.memory import ChatHistoryMemoryStorage  # noqa: E402
+from slashgpt.history.storage.retention import RetentionPolicy  # noqa: E402
+
+storages = {
+    "memory": ChatHistoryMemoryStorage,  # output/{agent}
+    "file": ChatHistoryFileStorage,  # filememory/{agent}
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--storage", choices=storages.keys(), default="memory")
+    parser.add_argument("--max-age-days", type=float)
+    parser.add_argument("--max-sessions-per-user", type=int)
+    parser.add_argument("--max-bytes", type=int)
+    parser.add_argument("agents", nargs="+")
+    args = parser.parse_args()
+
+    policy = RetentionPolicy.from_dict(
+        {"max_age_days": args.max_age_days, "max_sessions_per_user": args.max_sessions_per_user, "max_bytes": args.max_bytes}
+    )
+    if policy is None:
+        parser.error("specify at least one of the limits")
+    for agent_name in args.agents:
+        storage = storages[args.storage]("sweep", agent_name)
+        deleted = 0
+        while True:
+            count = storage.sweep(policy)
+            if count == 0:
+                break
+            deleted += count
+        print(f"{agent_name}: deleted {deleted} sessions")
+
+
+if __name__ == "__main__":
+    main()